@@ -1,23 +1,24 @@
 """
 This module defines the Flask application routes and logic for the MovieWeb app.
 """
-import os
+import hmac
 import logging
+import time
 import traceback
-import requests
+from concurrent.futures import ThreadPoolExecutor
+import click
 from flask import Flask, request, render_template, redirect, url_for, jsonify
-from datamanager import create_app
-from datamanager.sqlite_data_manager import SQLiteDataManager
-from dotenv import load_dotenv
-import sqlite3
-
-# Load environment variables
-load_dotenv()
-
-# Konstanten aus Umgebungsvariablen laden
-RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
-RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST")
-OMDB_API_KEY = os.getenv("OMDB_API_KEY")  # OMDB API Key aus .env laden
+from werkzeug.local import LocalProxy
+from datamanager import create_app, get_data_manager, get_group_commit_writer
+from datamanager.backup import create_snapshot, list_snapshots, prune_snapshots, restore_snapshot
+from datamanager.movie_filters import MovieFilters, SORT_OPTIONS
+from upstream.flow_control import SingleFlight, TokenBucket, TTLCache, RateLimitExceeded
+from upstream.circuit_breaker import CircuitBreaker, CircuitOpenError
+from upstream.metadata import CallableProvider, FallbackProvider
+from upstream.title_index import OfflineMetadataProvider, build_title_index
+from upstream.recommendation_prompt import build_prompt, parse_suggestions, resolve_suggestions
+from recommendation_batch import run_recommendation_batch
+from static_assets import build_assets, DIST_DIR
 
 
 def get_chatgpt_response(prompt):
@@ -30,7 +31,9 @@ def get_chatgpt_response(prompt):
     Returns:
         str: Die Antwort von ChatGPT oder None im Fehlerfall.
     """
-    url = "https://open-ai21.p.rapidapi.com/conversationllama"
+    import requests  # Deferred: only needed once an upstream call is made
+
+    url = app.config['RAPIDAPI_URL']
 
     payload = {
         "messages": [
@@ -42,13 +45,13 @@ def get_chatgpt_response(prompt):
     }
     headers = {
         "content-type": "application/json",
-        "X-RapidAPI-Key": RAPIDAPI_KEY,
-        "X-RapidAPI-Host": RAPIDAPI_HOST
+        "X-RapidAPI-Key": app.config['RAPIDAPI_KEY'],
+        "X-RapidAPI-Host": app.config['RAPIDAPI_HOST']
     }
 
     try:
         print(f"Sending request to: {url}")
-        response = requests.post(url, json=payload, headers=headers)
+        response = requests.post(url, json=payload, headers=headers, timeout=app.config['RAPIDAPI_TIMEOUT'])
         response.raise_for_status()  # Wirf einen Fehler für HTTP-Fehlercodes
 
         data = response.json()
@@ -70,55 +73,314 @@ def get_chatgpt_response(prompt):
         return None
 
 
-DATABASE_FILE = 'instance/moviweb_app.db'
-
-# Initialize Flask application and data manager
+# Initialize Flask application; the data manager is created on first use
 app = create_app()
-data_manager = SQLiteDataManager(DATABASE_FILE)
+data_manager = LocalProxy(get_data_manager)
 
 # Configure logging
 logging.basicConfig(level=logging.ERROR)
 app.logger.setLevel(logging.ERROR)
 
+# Concurrent lookups of the same title share one OMDb call, and all calls share the quota
+omdb_flight = SingleFlight()
+omdb_limiter = TokenBucket(rate=app.config['OMDB_RATE_PER_SECOND'], capacity=app.config['OMDB_BURST'])
+# OMDb answers by imdbID and search pages, so picking a previewed candidate is a cache hit
+omdb_cache = TTLCache(maxsize=app.config['OMDB_CACHE_SIZE'], ttl=app.config['OMDB_CACHE_TTL'])
+
+# Fail fast while RapidAPI is degraded; a None reply counts as a failure
+recommendation_breaker = CircuitBreaker(
+    failure_threshold=app.config['RAPIDAPI_FAILURE_THRESHOLD'],
+    slow_call_seconds=app.config['RAPIDAPI_SLOW_CALL_SECONDS'],
+    reset_timeout=app.config['RAPIDAPI_RESET_TIMEOUT'],
+    is_failure=lambda result: not result
+)
+
+# Page size of the /movies listing
+MOVIES_PER_PAGE = 24
+
+# Events per page of a user's activity timeline
+TIMELINE_PAGE_SIZE = 20
+
+# Results per page of OMDb's s= search
+OMDB_SEARCH_PAGE_SIZE = 10
+
+
+def get_omdb_pool():
+    """
+    Returns the thread pool bounding the search preview's concurrent OMDb lookups.
+
+    Created on first use rather than at import: with preload_app the module is
+    imported in the gunicorn master, and threads do not survive fork().
+
+    Returns:
+        ThreadPoolExecutor: The app's OMDb pool.
+    """
+    pool = app.extensions.get('omdb_pool')
+    if pool is None:
+        # An executor starts no threads until used, so a pool losing this race is free
+        pool = app.extensions.setdefault('omdb_pool', ThreadPoolExecutor(
+            max_workers=app.config['OMDB_SEARCH_WORKERS'], thread_name_prefix='omdb'))
+    return pool
+
+
+def write_data(method_name, *args, **kwargs):
+    """
+    Runs a data manager write; with GROUP_COMMIT on, it is committed together with
+    the writes of concurrent requests and this call returns once that commit is done.
+
+    Args:
+        method_name (str): The data manager method, e.g. "add_review".
+        *args: Positional arguments for the method.
+        **kwargs: Keyword arguments for the method.
+
+    Returns:
+        The method's result (detached from any session when group-committed).
+    """
+    if app.config['GROUP_COMMIT']:
+        return get_group_commit_writer().submit(method_name, *args, **kwargs).result()
+    return getattr(data_manager, method_name)(*args, **kwargs)
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalizes a movie title for coalescing: collapses whitespace and ignores case.
+
+    Args:
+        title (str): The title as entered by the user.
+
+    Returns:
+        str: The normalized title.
+    """
+    return ' '.join(title.split()).casefold()
+
 
 def fetch_movie_details(title: str) -> dict or None:
+    """
+    Looks up movie details in the local title index, or on OMDb if it does not know the title.
+
+    Args:
+        title (str): The title of the movie.
+
+    Returns:
+        dict or None: A dictionary containing the movie details, or None if the title is unknown.
+    """
+    return metadata_provider.lookup(title)
+
+
+def fetch_omdb_details(title: str) -> dict or None:
     """
     Fetches movie details from the OMDb API.
 
+    Concurrent calls for the same normalized title are coalesced into a single
+    upstream request whose result is shared by all callers.
+
     Args:
         title (str): The title of the movie.
 
     Returns:
         dict or None: A dictionary containing the movie details, or None if an error occurs.
     """
+    return omdb_flight.do(normalize_title(title), _request_movie_details, title)
+
+
+def _request_movie_details(title: str) -> dict or None:
+    """
+    Performs the rate-limited OMDb request behind fetch_omdb_details.
+
+    Args:
+        title (str): The title of the movie.
+
+    Returns:
+        dict or None: A dictionary containing the movie details, or None if an error occurs.
+    """
+    data = _omdb_request({"t": title}, title)
+    return _movie_details(data) if data else None
+
+
+def _omdb_request(params: dict, what: str) -> dict or None:
+    """
+    Performs one rate-limited OMDb request.
+
+    Args:
+        params (dict): The query parameters besides the API key.
+        what (str): What is being fetched, for the log.
+
+    Returns:
+        dict or None: OMDb's response if it found something, None otherwise or on errors.
+    """
+    import requests  # Deferred: only needed once an upstream call is made
+
+    try:
+        omdb_limiter.acquire(max_wait=app.config['OMDB_MAX_WAIT'])
+    except RateLimitExceeded as e:
+        app.logger.warning(f"OMDb rate limit reached, not fetching {what}: {e}")
+        return None
+
     try:
-        url = f"http://www.omdbapi.com/?apikey={OMDB_API_KEY}&t={title}"
-        response = requests.get(url)
+        params = {"apikey": app.config['OMDB_API_KEY'] or "", **params}
+        response = requests.get(app.config['OMDB_URL'], params=params)
 
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
 
         data = response.json()
         if data.get("Response") == "True":
-            return {
-                "title": data.get("Title"),
-                "year": data.get("Year"),
-                "director": data.get("Director"),
-                "rating": data.get("imdbRating"),
-                "plot": data.get("Plot"),
-                "poster": data.get("Poster"),
-                "genre": [genre.strip() for genre in data.get("Genre", "").split(",")]
-            }
+            return data
         else:
             app.logger.warning(f"OMDb API error: {data.get('Error')}")
             return None
     except requests.exceptions.RequestException as e:
-        app.logger.error(f"Error fetching movie details for {title}: {e}")
+        app.logger.error(f"Error fetching movie details for {what}: {e}")
         return None
     except Exception as e:
-        app.logger.error(f"Unexpected error fetching movie details for {title}: {e}")
+        app.logger.error(f"Unexpected error fetching movie details for {what}: {e}")
         return None
 
 
+def _movie_details(data: dict) -> dict:
+    """
+    Converts an OMDb title response into the app's movie details and caches them by imdbID.
+
+    Args:
+        data (dict): OMDb's response.
+
+    Returns:
+        dict: The movie details.
+    """
+    details = {
+        "title": data.get("Title"),
+        "year": data.get("Year"),
+        "director": data.get("Director"),
+        "rating": data.get("imdbRating"),
+        "imdb_id": data.get("imdbID"),
+        "plot": data.get("Plot"),
+        "poster": data.get("Poster"),
+        "votes": data.get("imdbVotes"),
+        "genre": [genre.strip() for genre in data.get("Genre", "").split(",")]
+    }
+    if details["imdb_id"]:
+        omdb_cache.put(('i', details["imdb_id"]), details)
+    return details
+
+
+def fetch_omdb_details_by_id(imdb_id: str) -> dict or None:
+    """
+    Fetches movie details by imdbID, from the OMDb cache if a title lookup or a
+    search preview fetched them recently.
+
+    Args:
+        imdb_id (str): OMDb's imdbID of the movie.
+
+    Returns:
+        dict or None: A dictionary containing the movie details, or None if an error occurs.
+    """
+    details = omdb_cache.get(('i', imdb_id))
+    if details is None:
+        details = omdb_flight.do(('i', imdb_id), _request_movie_details_by_id, imdb_id)
+    return details
+
+
+def _request_movie_details_by_id(imdb_id: str) -> dict or None:
+    """
+    Performs the rate-limited OMDb request behind fetch_omdb_details_by_id.
+    """
+    data = _omdb_request({"i": imdb_id}, imdb_id)
+    return _movie_details(data) if data else None
+
+
+def _search_page(query: str, page: int) -> tuple or None:
+    """
+    Fetches one page of OMDb's title search, from the OMDb cache if possible.
+
+    Returns:
+        tuple or None: (list of search results, total number of results), or None if nothing was found.
+    """
+    key = ('s', normalize_title(query), page)
+    result = omdb_cache.get(key)
+    if result is None:
+        result = omdb_flight.do(key, _request_search_page, query, page)
+    return result
+
+
+def _request_search_page(query: str, page: int) -> tuple or None:
+    """
+    Performs the rate-limited OMDb request behind _search_page.
+    """
+    data = _omdb_request({"s": query, "type": "movie", "page": page}, f"search {query!r} page {page}")
+    if not data:
+        return None
+    result = (data.get("Search", []), int(data.get("totalResults", 0)))
+    omdb_cache.put(('s', normalize_title(query), page), result)
+    return result
+
+
+def _title_match(query: str, title: str) -> int:
+    """
+    Scores how well a result title matches the search: 3 for the same title, 2 if it
+    starts with the query, 1 if it contains all query words, 0 otherwise.
+    """
+    query, title = normalize_title(query), normalize_title(title or '')
+    if title == query:
+        return 3
+    if title.startswith(query):
+        return 2
+    return 1 if set(query.split()) <= set(title.split()) else 0
+
+
+def _votes(details: dict) -> int:
+    """
+    Returns a movie's number of IMDb votes ("1,234,567"), 0 if unknown.
+    """
+    try:
+        return int((details.get("votes") or '').replace(',', ''))
+    except ValueError:
+        return 0
+
+
+def search_omdb(query: str) -> list:
+    """
+    Finds the films a title could mean, for the add-movie form to choose from.
+
+    Fetches the first OMDB_SEARCH_PAGES pages of OMDb's s= search, ranks the results
+    by how well their titles match, and fetches the details of the best
+    OMDB_SEARCH_DETAILS. Pages and details are requested concurrently on a bounded
+    thread pool and cached, so adding a chosen candidate needs no further OMDb call.
+
+    Args:
+        query (str): The title as entered by the user.
+
+    Returns:
+        list: Movie details dicts, best match first; IMDb votes break ties between
+            equally good titles, so the well-known film comes before obscure namesakes.
+    """
+    first = _search_page(query, 1)
+    if not first:
+        return []
+    results, total = list(first[0]), first[1]
+    pages = min(-(-total // OMDB_SEARCH_PAGE_SIZE), app.config['OMDB_SEARCH_PAGES'])
+    omdb_pool = get_omdb_pool()
+    for page in omdb_pool.map(lambda number: _search_page(query, number), range(2, pages + 1)):
+        if page:
+            results.extend(page[0])
+
+    candidates = list({result["imdbID"]: result for result in results if result.get("imdbID")}.values())
+    candidates.sort(key=lambda result: -_title_match(query, result.get("Title")))
+    candidates = candidates[:app.config['OMDB_SEARCH_DETAILS']]
+    details = omdb_pool.map(lambda result: fetch_omdb_details_by_id(result["imdbID"]), candidates)
+    choices = [found or {"title": result.get("Title"), "year": result.get("Year"), "director": None,
+                         "rating": None, "imdb_id": result["imdbID"], "plot": None,
+                         "poster": result.get("Poster"), "votes": None, "genre": []}
+               for result, found in zip(candidates, details)]
+    choices.sort(key=lambda choice: (-_title_match(query, choice["title"]), -_votes(choice)))
+    return choices
+
+
+# Title lookups: the local IMDb title index first (once built), OMDb on a miss
+metadata_provider = FallbackProvider([
+    OfflineMetadataProvider(app.config['TITLE_INDEX_FILE']),
+    CallableProvider(fetch_omdb_details),
+])
+
+
 @app.errorhandler(404)
 def page_not_found(error):
     """
@@ -175,15 +437,16 @@ def delete_movie(movie_id: int):
 @app.route('/')
 def home():
     """
-    Renders the home page with recently added and top-rated movies.
+    Renders the home page with trending, recently added and top-rated movies.
 
     Returns:
         Response: A Flask response rendering the home.html template.
     """
     try:
-        recently_added = data_manager.get_recently_added_movies()
-        top_rated = data_manager.get_top_rated_movies()
-        return render_template('home.html', recently_added=recently_added, top_rated=top_rated)
+        trending = data_manager.get_trending_movies(rows=True)
+        recently_added = data_manager.get_recently_added_movies(rows=True)
+        top_rated = data_manager.get_top_rated_movies(rows=True)
+        return render_template('home.html', trending=trending, recently_added=recently_added, top_rated=top_rated)
     except Exception as e:
         app.logger.error(f"Error occurred on the home page: {str(e)}")
         return render_template('500.html'), 500
@@ -208,7 +471,8 @@ def list_users():
 @app.route('/users/<int:user_id>', methods=['GET'])
 def user_movies(user_id: int):
     """
-    Lists favorite movies for a specific user.
+    Lists favorite movies for a specific user, with their taste profile and a page of
+    their activity timeline.
 
     Args:
         user_id (int): The ID of the user.
@@ -221,29 +485,175 @@ def user_movies(user_id: int):
         if not user:
             return render_template('404.html'), 404
 
-        movies = data_manager.get_favorite_movies_by_user(user_id)
-        return render_template('user_movies.html', user=user, movies=movies)
+        movies = data_manager.get_favorite_movies_by_user(user_id, rows=True)
+        try:
+            events, next_cursor = data_manager.get_user_timeline(
+                user_id, limit=TIMELINE_PAGE_SIZE, cursor=request.args.get('cursor'))
+        except ValueError:
+            events, next_cursor = data_manager.get_user_timeline(user_id, limit=TIMELINE_PAGE_SIZE)
+        stats = data_manager.get_user_stats(user_id)
+        return render_template('user_movies.html', user=user, movies=movies, stats=stats,
+                               events=events, next_cursor=next_cursor)
     except Exception as e:
         app.logger.error(f"Error fetching user {user_id}: {e}")
         return render_template('500.html'), 500
 
 
+@app.route('/users/<int:user_id>/timeline', methods=['GET'])
+def user_timeline(user_id: int):
+    """
+    Returns a page of a user's activity (favorites and reviews, newest first) as JSON.
+
+    Query parameters: ``limit`` (at most 100) and ``cursor`` (from the previous page).
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Response: JSON with the events and the cursor of the next page (null on the last page).
+    """
+    if not data_manager.get_user_by_id(user_id):
+        return jsonify({"error": "User not found"}), 404
+    limit = min(max(request.args.get('limit', TIMELINE_PAGE_SIZE, type=int), 1), 100)
+    try:
+        events, next_cursor = data_manager.get_user_timeline(user_id, limit=limit,
+                                                             cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "events": [dict(event._asdict(), timestamp=event.timestamp.isoformat()) for event in events],
+        "next_cursor": next_cursor
+    })
+
+
+@app.route('/users/<int:user_id>/stats', methods=['GET'])
+def user_stats(user_id: int):
+    """
+    Returns a user's taste profile as JSON.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Response: JSON with favorite and review counts, the average review rating, and
+        the top genres, top directors and decade breakdown of the favorites.
+    """
+    stats = data_manager.get_user_stats(user_id)
+    if stats is None:
+        return jsonify({"error": "User not found"}), 404
+    profile = stats._asdict()
+    for key in ('genres', 'directors', 'decades'):
+        profile[key] = [entry._asdict() for entry in profile[key]]
+    return jsonify(profile)
+
+
+def parse_movie_filters(args):
+    """
+    Reads the /movies filter parameters.
+
+    Args:
+        args (MultiDict): The request's query string or form data.
+
+    Returns:
+        MovieFilters: The filters; parameters that are missing or malformed are left unset.
+    """
+    return MovieFilters(
+        genre_ids=tuple(args.getlist('genre', type=int)),
+        year_min=args.get('year_min', type=int),
+        year_max=args.get('year_max', type=int),
+        rating_min=args.get('rating_min', type=float),
+        rating_max=args.get('rating_max', type=float),
+        community_min=args.get('community_min', type=float)
+    )
+
+
 @app.route('/movies', methods=['GET'])
 def list_movies():
     """
-    Lists all movies from the database.
+    Lists the movies, filtered by genre, year, OMDb rating and community rating,
+    sorted and paginated, together with facet counts for the filter sidebar.
 
     Returns:
         Response: A Flask response rendering the movies.html template.
     """
+    filters = parse_movie_filters(request.args)
+    sort = request.args.get('sort', 'name')
+    if sort not in SORT_OPTIONS:
+        sort = 'name'
+    page = max(request.args.get('page', 1, type=int), 1)
     try:
-        movies = data_manager.get_all_movies()
-        return render_template('movies.html', movies=movies)
+        movies, total = data_manager.filter_movies(filters, sort=sort, page=page, per_page=MOVIES_PER_PAGE,
+                                                   rows=True)
+        facets = data_manager.get_movie_facets(filters)
+        community_ratings = data_manager.get_community_ratings([movie.id for movie in movies])
+        pages = max((total + MOVIES_PER_PAGE - 1) // MOVIES_PER_PAGE, 1)
+        return render_template('movies.html', movies=movies, total=total, page=page, pages=pages,
+                               filters=filters, sort=sort, sort_options=SORT_OPTIONS, facets=facets,
+                               community_ratings=community_ratings)
     except Exception as e:
         app.logger.error(f"Error fetching movies: {e}")
         return render_template('500.html'), 500
 
 
+def is_admin_request():
+    """
+    Checks the request's X-Admin-Token header against the ADMIN_TOKEN config.
+
+    Returns:
+        bool: True if ADMIN_TOKEN is set and the header matches it.
+    """
+    token = app.config['ADMIN_TOKEN']
+    return bool(token) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token)
+
+
+@app.route('/admin/movies/delete', methods=['POST'])
+def bulk_delete_movies():
+    """
+    Deletes many movies with their favorites, reviews and genre links in one transaction.
+
+    Takes either repeated ``id`` parameters or the /movies filter parameters.
+
+    Returns:
+        Response: JSON with the number of deleted movies.
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    try:
+        movie_ids = request.values.getlist('id', type=int)
+        if movie_ids:
+            deleted = data_manager.delete_movies(movie_ids)
+        else:
+            deleted = data_manager.delete_movies_matching(parse_movie_filters(request.values))
+        return jsonify({"deleted": deleted})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error bulk deleting movies: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
+@app.route('/admin/users/delete', methods=['POST'])
+def bulk_delete_users():
+    """
+    Deletes many users with their favorites, reviews and recommendations in one transaction.
+
+    Takes repeated ``id`` parameters.
+
+    Returns:
+        Response: JSON with the number of deleted users.
+    """
+    if not is_admin_request():
+        return jsonify({"error": "Forbidden"}), 403
+    user_ids = request.values.getlist('id', type=int)
+    if not user_ids:
+        return jsonify({"error": "No user IDs given"}), 400
+    try:
+        return jsonify({"deleted": data_manager.delete_users(user_ids)})
+    except Exception as e:
+        app.logger.error(f"Error bulk deleting users: {e}")
+        return jsonify({"error": "Internal server error"}), 500
+
+
 @app.route('/add_user', methods=['GET', 'POST'])
 def add_user():
     """
@@ -297,7 +707,9 @@ def add_movie(user_id: int):
             if not title:
                 raise ValueError("Title is required")
 
-            movie_details = fetch_movie_details(title)
+            # A candidate picked from the search preview is served from the OMDb cache
+            imdb_id = request.form.get('imdb_id')
+            movie_details = fetch_omdb_details_by_id(imdb_id) if imdb_id else fetch_movie_details(title)
 
             if not movie_details:
                 raise ValueError(f"OMDb API error: Unable to fetch movie details")
@@ -315,7 +727,8 @@ def add_movie(user_id: int):
                 year=movie_details["year"],
                 rating=movie_details["rating"],
                 poster=movie_details["poster"],
-                genres=genres
+                genres=genres,
+                imdb_id=movie_details.get("imdb_id")
             )
             data_manager.add_favorite_movie(user_id=user.id, movie_id=new_movie.id)
             return redirect(url_for('user_movies', user_id=user_id))
@@ -324,7 +737,7 @@ def add_movie(user_id: int):
         return render_template('add_movie.html', user=user, genres=genres)
     except ValueError as e:
         app.logger.warning(f"Validation error: {e}")
-        return render_template('add_movie.html', user=user, genres=genres, error=str(e))
+        return render_template('add_movie.html', user=user, genres=data_manager.get_all_genres(), error=str(e))
     except Exception as e:
         app.logger.error(f"Error adding movie for user {user_id}: {e}")
         app.logger.error(traceback.format_exc())
@@ -408,7 +821,7 @@ def genre_movies(genre_id: int):
         if not genre:
             return render_template('404.html'), 404
         # Get movies for the genre
-        movies = genre.movies
+        movies = data_manager.get_movies_by_genre(genre_id, rows=True)
         return render_template('genre_movies.html', genre=genre, movies=movies)
     except Exception as e:
         app.logger.error(f"Error fetching movies for genre {genre_id}: {e}")
@@ -522,7 +935,8 @@ def add_review(movie_id: int):
             if not user:
                 return render_template('404.html'), 404
 
-            data_manager.add_review(
+            write_data(
+                'add_review',
                 movie_id=movie.id,
                 user_id=user.id,
                 text=text,
@@ -555,17 +969,78 @@ def movie_details(movie_id: int):
             return render_template('404.html'), 404
 
         reviews = data_manager.get_reviews_by_movie(movie_id)
-        return render_template('movie_details.html', movie=movie, reviews=reviews)
+        similar_movies = data_manager.get_similar_movies(movie_id)
+        return render_template('movie_details.html', movie=movie, reviews=reviews, similar_movies=similar_movies)
     except Exception as e:
         app.logger.error(f"Error fetching movie {movie_id}: {e}")
         app.logger.error(traceback.format_exc())
         return render_template('500.html'), 500
 
 
+def local_recommendations(user_id, limit=5) -> list:
+    """
+    Computes fallback recommendations without the upstream: movies the user has not
+    favorited yet, ranked by overlap with the user's favorite genres, then by rating.
+    One query, since it runs on every request while the upstream is down.
+
+    Args:
+        user_id (int): The ID of the user.
+        limit (int, optional): The number of recommendations. Defaults to 5.
+
+    Returns:
+        list: Recommendation lines in the same shape as the upstream's.
+    """
+    return [f"{movie.name} ({movie.year})" if movie.year else movie.name
+            for movie in data_manager.get_genre_recommendations(user_id, limit=limit)]
+
+
+def generate_recommendations(favorites) -> list or None:
+    """
+    Asks the recommendation upstream (through its circuit breaker) for suggestions.
+
+    The prompt names a representative subset of the favorites that fits the
+    RECOMMENDATION_PROMPT_TOKENS budget. Touches no database, so the batch job can
+    run it on worker threads.
+
+    Args:
+        favorites (list): The user's FavoriteRow tuples, most recently added first.
+
+    Returns:
+        list or None: The parsed Suggestion tuples, or None if unavailable.
+    """
+    prompt = build_prompt(favorites, token_budget=app.config['RECOMMENDATION_PROMPT_TOKENS'])
+    try:
+        reply = recommendation_breaker.call(get_chatgpt_response, prompt)
+    except CircuitOpenError:
+        return None
+    return parse_suggestions(reply) or None
+
+
+def validate_recommendations(favorites, suggestions) -> list:
+    """
+    Checks suggestions against the catalog with one query: drops the user's own
+    favorites and uses the catalog's spelling for known movies.
+
+    Args:
+        favorites (list): The user's FavoriteRow tuples.
+        suggestions (list): Suggestion tuples from generate_recommendations.
+
+    Returns:
+        list: The recommendations as "Title (Year)" lines.
+    """
+    catalog_movies = data_manager.get_movies_by_names([suggestion.title for suggestion in suggestions])
+    return resolve_suggestions(suggestions, catalog_movies, {favorite.id for favorite in favorites})
+
+
 @app.route('/recommend_movies/<int:user_id>', methods=['GET'])
 def recommend_movies(user_id: int):
     """
-    Generates movie recommendations for a user using ChatGPT via RapidAPI.
+    Shows movie recommendations for a user.
+
+    Recommendations precomputed by the batch job are served with a single lookup.
+    Otherwise they are generated using ChatGPT via RapidAPI and stored; while
+    RapidAPI fails or its circuit breaker is open, locally computed suggestions
+    are shown, marked as stale.
 
     Args:
         user_id (int): The ID of the user.
@@ -578,22 +1053,181 @@ def recommend_movies(user_id: int):
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        favorite_movies = data_manager.get_favorite_movies_by_user(user_id)
-        favorite_titles = [movie.name for movie in favorite_movies]
-
-        prompt = f"Basierend auf diesen Lieblingsfilmen: {', '.join(favorite_titles)}, schlage 5 weitere Filme vor, die dem Benutzer gefallen könnten."
-        recommendations = get_chatgpt_response(prompt)
+        stored = data_manager.get_recommendation(user_id)
+        if stored:
+            return render_template('movie_recommendations.html', user=user, recommendations=stored.items,
+                                   generated_at=stored.generated_at)
 
+        favorites = data_manager.get_favorite_details(user_id)
+        suggestions = generate_recommendations(favorites)
+        recommendations = validate_recommendations(favorites, suggestions) if suggestions else None
         if recommendations:
-            recommendations = recommendations.split('\n')  # Passe dies an das tatsächliche Antwortformat an
+            data_manager.save_recommendation(user_id, recommendations)
             return render_template('movie_recommendations.html', user=user, recommendations=recommendations)
-        else:
-            app.logger.error("Konnte keine Empfehlungen von RapidAPI generieren.")
-            return render_template('500.html'), 500
+
+        app.logger.error("Konnte keine Empfehlungen von RapidAPI generieren, zeige Ersatzempfehlungen.")
+        return render_template('movie_recommendations.html', user=user,
+                               recommendations=local_recommendations(user_id), stale=True)
     except Exception as e:
         app.logger.error(f"Error generating recommendations: {e}")
         return render_template('500.html'), 500
 
+
+@app.cli.command('precompute-recommendations')
+@click.option('--workers', default=4, show_default=True, help='Maximum concurrent upstream calls.')
+@click.option('--every', default=0, help='Repeat every N seconds instead of running once.')
+def precompute_recommendations(workers, every):
+    """
+    Precomputes recommendations for all users whose favorites changed.
+    """
+    while True:
+        run = run_recommendation_batch(data_manager, generate_recommendations, max_workers=workers,
+                                       validate=validate_recommendations)
+        click.echo(f"Run {run.id}: {run.succeeded} succeeded, {run.failed} failed, "
+                   f"{run.users_per_second:.2f} users/s")
+        if not every:
+            break
+        time.sleep(every)
+
+
+@app.cli.command('merge-duplicate-movies')
+def merge_duplicate_movies():
+    """
+    Collapses duplicate movies (same imdbID, or same title and year) into one row each.
+    """
+    merged = data_manager.merge_duplicate_movies()
+    click.echo(f"Merged {merged} duplicate movies")
+
+
+@app.cli.command('refresh-similar-movies')
+def refresh_similar_movies():
+    """
+    Rebuilds the precomputed similar-movie lists of all movies.
+    """
+    started = time.perf_counter()
+    refreshed = data_manager.refresh_similar_movies()
+    click.echo(f"Refreshed similar movies for {refreshed} movies in {time.perf_counter() - started:.1f}s")
+
+
+@app.cli.command('rebuild-trending')
+def rebuild_trending():
+    """
+    Recomputes the trending counters of all movies from their favorites and reviews.
+    """
+    counted = data_manager.rebuild_trending()
+    click.echo(f"Rebuilt trending counters for {counted} movies")
+
+
+@app.cli.command('backup-db')
+@click.option('--keep', type=int, help='Snapshots to keep (default: BACKUP_KEEP).')
+@click.option('--every', default=0, help='Repeat every N seconds instead of running once.')
+@click.option('--no-compress', is_flag=True, help='Write plain database files, e.g. to open them as replicas.')
+def backup_db(keep, every, no_compress):
+    """
+    Takes an online snapshot of the database while the app keeps running.
+    """
+    keep = app.config['BACKUP_KEEP'] if keep is None else keep
+    while True:
+        started = time.perf_counter()
+        snapshot = create_snapshot(app.config['DATABASE_FILE'], app.config['BACKUP_DIR'], compress=not no_compress)
+        removed = prune_snapshots(app.config['DATABASE_FILE'], app.config['BACKUP_DIR'], keep)
+        click.echo(f"Wrote {snapshot.path} ({snapshot.size} bytes, sha256 {snapshot.sha256}) in "
+                   f"{time.perf_counter() - started:.1f}s; removed {len(removed)} old snapshots")
+        if not every:
+            break
+        time.sleep(every)
+
+
+@app.cli.command('list-backups')
+def list_backups():
+    """
+    Lists the database snapshots, newest first.
+    """
+    for snapshot in list_snapshots(app.config['DATABASE_FILE'], app.config['BACKUP_DIR']):
+        click.echo(f"{snapshot.created_at:%Y-%m-%d %H:%M:%S}  {snapshot.size:>12}  {snapshot.path}")
+
+
+@app.cli.command('restore-db')
+@click.argument('snapshot', type=click.Path(exists=True, dir_okay=False))
+@click.option('--target', help='Restore into this file instead of the database, e.g. a read-only replica.')
+@click.confirmation_option(prompt='Replace the target database with this snapshot?')
+def restore_db(snapshot, target):
+    """
+    Verifies a snapshot's checksum and restores it. Restart the app afterwards.
+    """
+    target = target or app.config['DATABASE_FILE']
+    try:
+        restore_snapshot(snapshot, target)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Restored {snapshot} into {target}")
+
+
+@app.cli.command('build-title-index')
+@click.argument('basics', type=click.Path(exists=True, dir_okay=False))
+@click.argument('ratings', type=click.Path(exists=True, dir_okay=False))
+@click.argument('crew', type=click.Path(exists=True, dir_okay=False))
+@click.option('--names', type=click.Path(exists=True, dir_okay=False), help='name.basics, for director names.')
+def build_local_title_index(basics, ratings, crew, names):
+    """
+    Builds the local title index from IMDb's title.basics, title.ratings and title.crew TSV dumps.
+    """
+    count = build_title_index(app.config['TITLE_INDEX_FILE'], basics, ratings, crew, names=names)
+    click.echo(f"Indexed {count} titles into {app.config['TITLE_INDEX_FILE']}")
+
+
+@app.cli.command('import-movies')
+@click.argument('titles', type=click.File())
+@click.option('--user-id', type=int, help="Also add the movies to this user's favorites.")
+@click.option('--batch-size', default=100, show_default=True, help='Movies per transaction.')
+def import_movies(titles, user_id, batch_size):
+    """
+    Adds the movies listed in a file, one title per line.
+
+    Titles are looked up like in the add-movie form: in the local title index
+    first, on OMDb only if the index does not know them.
+    """
+    added = missing = 0
+    lines = [line.strip() for line in titles if line.strip()]
+    for start in range(0, len(lines), batch_size):
+        # Look the batch up first, so no upstream call runs while the write lock is held
+        found = []
+        for title in lines[start:start + batch_size]:
+            details = fetch_movie_details(title)
+            if details:
+                found.append(details)
+            else:
+                missing += 1
+                click.echo(f"Not found: {title}")
+        with data_manager.unit_of_work():
+            for details in found:
+                genres = [data_manager.get_genre_by_name(name) or data_manager.add_genre(name)
+                          for name in details["genre"] if name]
+                movie = data_manager.add_movie(
+                    name=details["title"],
+                    director=details["director"],
+                    year=details["year"],
+                    rating=details["rating"],
+                    poster=details["poster"],
+                    genres=genres,
+                    imdb_id=details.get("imdb_id")
+                )
+                if user_id:
+                    data_manager.add_favorite_movie(user_id=user_id, movie_id=movie.id)
+        added += len(found)
+    click.echo(f"Imported {added} movies, {missing} not found")
+
+
+@app.cli.command('build-assets')
+def build_static_assets():
+    """
+    Writes content-hashed copies of the static files for far-future caching.
+    """
+    manifest = build_assets(app.static_folder)
+    app.extensions['static_manifest'] = manifest
+    click.echo(f"Fingerprinted {len(manifest)} static files into {DIST_DIR}/")
+
+
 @app.route('/user/<int:user_id>/recommendations')
 def show_recommendations(user_id):
     """
@@ -613,16 +1247,62 @@ def search_movies():
     """
     Sucht nach Filmen basierend auf der Suchanfrage.
 
+    Findet die exakte Suche nichts, werden ähnlich geschriebene Titel und
+    Regisseure angezeigt (z. B. "Incepton" -> "Inception").
+
     Returns:
         Response: Eine Flask-Response, die das Suchergebnis-Template rendert.
     """
     query = request.args.get('query')  # Hole die Suchanfrage aus den Query-Parametern
     if query:
         # Hier solltest du deine Filmdatenbank durchsuchen
-        movies = data_manager.search_movies(query)  # Verwende die Suchfunktion des DataManagers
+        movies = data_manager.search_movies(query, rows=True)  # Verwende die Suchfunktion des DataManagers
+        if not movies:
+            # Keine exakten Treffer: tippfehlertolerante Suche über den Trigramm-Index
+            movies = data_manager.fuzzy_search_movies(query, rows=True)
+            return render_template('search_results.html', movies=movies, query=query, fuzzy=True)
         return render_template('search_results.html', movies=movies, query=query)
     else:
         return render_template('search_results.html', movies=[], query='')  # Leere Ergebnisse
 
+
+@app.route('/omdb_search', methods=['GET'])
+def omdb_search():
+    """
+    Previews the OMDb films matching a title, for the add-movie form.
+
+    Query parameter: ``q`` (the title).
+
+    Returns:
+        Response: A JSON list of movie details, best match first, or an error message.
+    """
+    query = request.args.get('q', '').strip()
+    if len(query) < 2:
+        return jsonify({"error": "Query must have at least 2 characters"}), 400
+    try:
+        return jsonify(search_omdb(query))
+    except Exception as e:
+        app.logger.error(f"Error searching OMDb for {query}: {e}")
+        return jsonify({"error": "OMDb search failed"}), 500
+
+
+@app.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    """
+    Suggests movies for search-as-you-type from the in-memory prefix index.
+
+    Query parameters: ``q`` (the typed prefix), ``limit`` (default 10, 1 to 50)
+    and ``order`` ('rating' or 'popularity').
+
+    Returns:
+        Response: A JSON list of suggestions, best first.
+    """
+    prefix = request.args.get('q', '')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    order = request.args.get('order', 'rating')
+    suggestions = data_manager.autocomplete_movies(prefix, limit=limit, order=order)
+    return jsonify([suggestion._asdict() for suggestion in suggestions])
+
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,500 @@
+"""
+This module defines the async (ASGI) variant of the MovieWeb app.
+
+It serves the same routes and templates as app.py, but the database is accessed
+through AsyncSQLiteDataManager and both upstreams (OMDb and RapidAPI) are called
+with a shared aiohttp client, so slow upstream calls no longer tie up a worker
+thread each. Run it with any ASGI server, e.g.:
+
+    uvicorn asgi_app:app --workers 2
+"""
+import os
+import logging
+import traceback
+from contextlib import asynccontextmanager
+from urllib.parse import urlencode
+
+import aiohttp
+from dotenv import load_dotenv
+from jinja2 import pass_context
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, RedirectResponse
+from starlette.routing import Route, Mount
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+
+from datamanager.async_sqlite_data_manager import AsyncSQLiteDataManager
+from upstream.flow_control import AsyncSingleFlight, TokenBucket, RateLimitExceeded
+from upstream.title_index import OfflineMetadataProvider
+from upstream.recommendation_prompt import build_prompt, parse_suggestions, resolve_suggestions
+from static_assets import DIST_DIR, IMMUTABLE_CACHE_CONTROL, load_manifest
+
+# Load environment variables
+load_dotenv()
+
+RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
+RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST")
+OMDB_API_KEY = os.getenv("OMDB_API_KEY")
+
+RAPIDAPI_URL = os.getenv("RAPIDAPI_URL", "https://open-ai21.p.rapidapi.com/conversationllama")
+OMDB_URL = os.getenv("OMDB_URL", "http://www.omdbapi.com/")
+UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(total=30)
+OMDB_MAX_WAIT = float(os.getenv("OMDB_MAX_WAIT", 10))
+RECOMMENDATION_PROMPT_TOKENS = int(os.getenv("RECOMMENDATION_PROMPT_TOKENS", 500))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_FILE = os.getenv("DATABASE_FILE", os.path.join(BASE_DIR, 'instance', 'moviweb_app.db'))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TITLE_INDEX_FILE = os.getenv("TITLE_INDEX_FILE", os.path.join(BASE_DIR, 'instance', 'title_index.db'))
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+
+logger = logging.getLogger(__name__)
+data_manager = AsyncSQLiteDataManager(DATABASE_FILE)
+templates = Jinja2Templates(directory=os.path.join(BASE_DIR, 'templates'))
+omdb_flight = AsyncSingleFlight()
+omdb_limiter = TokenBucket(rate=float(os.getenv("OMDB_RATE_PER_SECOND", 5)),
+                           capacity=int(os.getenv("OMDB_BURST", 10)))
+static_manifest = load_manifest(STATIC_DIR)
+title_index = OfflineMetadataProvider(TITLE_INDEX_FILE)
+
+
+class FingerprintedStaticFiles(StaticFiles):
+    """
+    Static files that serve the hashed copies from `flask build-assets` as immutable.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if self.get_path(scope).startswith(f"{DIST_DIR}{os.sep}"):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+@pass_context
+def url_for(context, endpoint, **values):
+    """
+    Flask-compatible url_for for the shared templates.
+
+    Path parameters are filled into the route, any remaining values are appended
+    as a query string, and 'static' accepts Flask's ``filename`` argument.
+
+    Args:
+        context: The Jinja2 render context (provides the request).
+        endpoint (str): The route name.
+        **values: Path and query parameters.
+
+    Returns:
+        str: The URL path for the endpoint.
+    """
+    app = context['request'].app
+    if endpoint == 'static':
+        filename = values.pop('filename')
+        return app.url_path_for('static', path=static_manifest.get(filename, filename))
+    route = next(r for r in app.routes if getattr(r, 'name', None) == endpoint)
+    path_params = {key: values.pop(key) for key in list(values) if key in route.param_convertors}
+    url = app.url_path_for(endpoint, **path_params)
+    return f"{url}?{urlencode(values)}" if values else url
+
+
+templates.env.globals['url_for'] = url_for
+
+
+def render(request, template_name, status_code=200, **context):
+    """
+    Render a template the way Flask's render_template does.
+    """
+    return templates.TemplateResponse(request, template_name, context, status_code=status_code)
+
+
+def redirect(request, endpoint, **values):
+    """
+    Redirect to a named route with a 303 so browsers switch to GET after a POST.
+    """
+    return RedirectResponse(request.app.url_path_for(endpoint, **values), status_code=303)
+
+
+async def get_chatgpt_response(http, prompt):
+    """
+    Ruft eine Antwort von ChatGPT über RapidAPI ab, ohne den Event-Loop zu blockieren.
+
+    Args:
+        http (aiohttp.ClientSession): The shared HTTP client.
+        prompt (str): Die Frage oder Anweisung, die an ChatGPT gesendet wird.
+
+    Returns:
+        str: Die Antwort von ChatGPT oder None im Fehlerfall.
+    """
+    payload = {"messages": [{"role": "user", "content": prompt}]}
+    headers = {
+        "content-type": "application/json",
+        "X-RapidAPI-Key": RAPIDAPI_KEY,
+        "X-RapidAPI-Host": RAPIDAPI_HOST
+    }
+    try:
+        async with http.post(RAPIDAPI_URL, json=payload, headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json()
+        if "result" in data:
+            return data["result"]
+        logger.error("Unexpected response format from RapidAPI")
+        return None
+    except (aiohttp.ClientError, TimeoutError) as e:
+        logger.error(f"RapidAPI Request Error: {e}")
+        return None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        logger.error(f"Error parsing RapidAPI response: {e}")
+        return None
+
+
+async def fetch_movie_details(http, title):
+    """
+    Fetches movie details from the local title index, or from the OMDb API without
+    blocking the event loop if the index does not know the title.
+
+    The index answers from a local SQLite file in microseconds, so it is read inline.
+    Concurrent OMDb calls for the same normalized title share one upstream request.
+
+    Args:
+        http (aiohttp.ClientSession): The shared HTTP client.
+        title (str): The title of the movie.
+
+    Returns:
+        dict or None: A dictionary containing the movie details, or None if an error occurs.
+    """
+    details = title_index.lookup(title)
+    if details:
+        return details
+    key = ' '.join(title.split()).casefold()
+    return await omdb_flight.do(key, _request_movie_details, http, title)
+
+
+async def _request_movie_details(http, title):
+    """
+    Performs the rate-limited OMDb request behind fetch_movie_details.
+    """
+    try:
+        await omdb_limiter.acquire_async(max_wait=OMDB_MAX_WAIT)
+    except RateLimitExceeded as e:
+        logger.warning(f"OMDb rate limit reached, not fetching {title}: {e}")
+        return None
+
+    try:
+        params = {"apikey": OMDB_API_KEY or "", "t": title}
+        async with http.get(OMDB_URL, params=params) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        if data.get("Response") == "True":
+            return {
+                "title": data.get("Title"),
+                "year": data.get("Year"),
+                "director": data.get("Director"),
+                "rating": data.get("imdbRating"),
+                "imdb_id": data.get("imdbID"),
+                "plot": data.get("Plot"),
+                "poster": data.get("Poster"),
+                "genre": [genre.strip() for genre in data.get("Genre", "").split(",")]
+            }
+        logger.warning(f"OMDb API error: {data.get('Error')}")
+        return None
+    except (aiohttp.ClientError, TimeoutError) as e:
+        logger.error(f"Error fetching movie details for {title}: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error fetching movie details for {title}: {e}")
+        return None
+
+
+async def home(request):
+    """
+    Renders the home page with trending, recently added and top-rated movies.
+    """
+    trending = await data_manager.get_trending_movies()
+    recently_added = await data_manager.get_recently_added_movies()
+    top_rated = await data_manager.get_top_rated_movies()
+    return render(request, 'home.html', trending=trending, recently_added=recently_added, top_rated=top_rated)
+
+
+async def list_users(request):
+    """
+    Lists all users from the database.
+    """
+    users = await data_manager.get_all_users()
+    return render(request, 'users.html', users=users)
+
+
+async def user_movies(request):
+    """
+    Lists favorite movies for a specific user.
+    """
+    user_id = request.path_params['user_id']
+    user = await data_manager.get_user_by_id(user_id)
+    if not user:
+        return render(request, '404.html', status_code=404)
+    movies = await data_manager.get_favorite_movies_by_user(user_id)
+    return render(request, 'user_movies.html', user=user, movies=movies)
+
+
+async def list_movies(request):
+    """
+    Lists all movies from the database.
+    """
+    movies = await data_manager.get_all_movies()
+    return render(request, 'movies.html', movies=movies)
+
+
+async def add_user(request):
+    """
+    Adds a new user to the database.
+    """
+    if request.method == 'POST':
+        form = await request.form()
+        name = form.get('name')
+        if not name:
+            return render(request, 'add_user.html', error="Name is required")
+        await data_manager.add_user(name)
+        return redirect(request, 'list_users')
+    return render(request, 'add_user.html')
+
+
+async def add_movie(request):
+    """
+    Adds a movie to a user's favorite movies, with details fetched from OMDb.
+    """
+    user_id = request.path_params['user_id']
+    user = await data_manager.get_user_by_id(user_id)
+    if not user:
+        return render(request, '404.html', status_code=404)
+
+    if request.method == 'POST':
+        form = await request.form()
+        title = form.get('name')
+        genre_names = form.getlist('genres')
+        movie_details = await fetch_movie_details(request.app.state.http, title) if title else None
+        if not movie_details:
+            genres = await data_manager.get_all_genres()
+            error = "OMDb API error: Unable to fetch movie details" if title else "Title is required"
+            return render(request, 'add_movie.html', user=user, genres=genres, error=error)
+
+        genres = []
+        for genre_name in genre_names:
+            genre = await data_manager.get_genre_by_name(genre_name)
+            if not genre:
+                genre = await data_manager.add_genre(genre_name)
+            genres.append(genre)
+
+        new_movie = await data_manager.add_movie(
+            name=movie_details["title"],
+            director=movie_details["director"],
+            year=movie_details["year"],
+            rating=movie_details["rating"],
+            poster=movie_details["poster"],
+            genres=genres,
+            imdb_id=movie_details.get("imdb_id")
+        )
+        await data_manager.add_favorite_movie(user_id=user.id, movie_id=new_movie.id)
+        return redirect(request, 'user_movies', user_id=user_id)
+
+    genres = await data_manager.get_all_genres()
+    return render(request, 'add_movie.html', user=user, genres=genres)
+
+
+async def update_movie(request):
+    """
+    Updates a movie's details.
+    """
+    user_id = request.path_params['user_id']
+    movie_id = request.path_params['movie_id']
+    user = await data_manager.get_user_by_id(user_id)
+    movie = await data_manager.get_movie_by_id(movie_id)
+    if not user or not movie:
+        return render(request, '404.html', status_code=404)
+
+    if request.method == 'POST':
+        form = await request.form()
+        await data_manager.update_movie(
+            movie_id=movie.id,
+            name=form.get('name'),
+            director=form.get('director'),
+            year=form.get('year'),
+            rating=form.get('rating')
+        )
+        return redirect(request, 'user_movies', user_id=user_id)
+
+    return render(request, 'update_movie.html', user=user, movie=movie)
+
+
+async def delete_movie(request):
+    """
+    Deletes a movie from the database.
+    """
+    if not await data_manager.delete_movie(request.path_params['movie_id']):
+        return render(request, '404.html', status_code=404)
+    return redirect(request, 'list_movies')
+
+
+async def list_genres(request):
+    """
+    Lists all genres from the database.
+    """
+    genres = await data_manager.get_all_genres()
+    return render(request, 'genres.html', genres=genres)
+
+
+async def genre_movies(request):
+    """
+    Lists movies for a specific genre.
+    """
+    genre = await data_manager.get_genre_by_id(request.path_params['genre_id'])
+    if not genre:
+        return render(request, '404.html', status_code=404)
+    return render(request, 'genre_movies.html', genre=genre, movies=genre.movies)
+
+
+async def add_genre(request):
+    """
+    Adds a new genre to the database.
+    """
+    if request.method == 'POST':
+        form = await request.form()
+        name = form.get('name')
+        if not name:
+            return render(request, 'add_genre.html', error="Name is required")
+        await data_manager.add_genre(name)
+        return redirect(request, 'list_genres')
+    return render(request, 'add_genre.html')
+
+
+async def delete_genre(request):
+    """
+    Deletes a genre from the database.
+    """
+    await data_manager.delete_genre(request.path_params['genre_id'])
+    return redirect(request, 'list_genres')
+
+
+async def add_review(request):
+    """
+    Adds a review to a movie.
+    """
+    movie = await data_manager.get_movie_by_id(request.path_params['movie_id'])
+    if not movie:
+        return render(request, '404.html', status_code=404)
+
+    if request.method == 'POST':
+        form = await request.form()
+        user = await data_manager.get_user_by_id(1)  # Default user, as in app.py
+        if not user:
+            return render(request, '404.html', status_code=404)
+        await data_manager.add_review(
+            movie_id=movie.id,
+            user_id=user.id,
+            text=form.get('text'),
+            rating=form.get('rating')
+        )
+        return redirect(request, 'movie_details', movie_id=movie.id)
+
+    return render(request, 'add_review.html', movie=movie)
+
+
+async def movie_details(request):
+    """
+    Shows details for a specific movie.
+    """
+    movie_id = request.path_params['movie_id']
+    movie = await data_manager.get_movie_by_id(movie_id)
+    if not movie:
+        return render(request, '404.html', status_code=404)
+    reviews = await data_manager.get_reviews_by_movie(movie_id)
+    return render(request, 'movie_details.html', movie=movie, reviews=reviews)
+
+
+async def recommend_movies(request):
+    """
+    Generates movie recommendations for a user using ChatGPT via RapidAPI.
+    """
+    user_id = request.path_params['user_id']
+    user = await data_manager.get_user_by_id(user_id)
+    if not user:
+        return JSONResponse({"error": "User not found"}, status_code=404)
+
+    favorites = await data_manager.get_favorite_details(user_id)
+    prompt = build_prompt(favorites, token_budget=RECOMMENDATION_PROMPT_TOKENS)
+    suggestions = parse_suggestions(await get_chatgpt_response(request.app.state.http, prompt))
+    recommendations = resolve_suggestions(
+        suggestions, await data_manager.get_movies_by_names([suggestion.title for suggestion in suggestions]),
+        {favorite.id for favorite in favorites})
+    if not recommendations:
+        logger.error("Konnte keine Empfehlungen von RapidAPI generieren.")
+        return render(request, '500.html', status_code=500)
+    return render(request, 'movie_recommendations.html', user=user, recommendations=recommendations)
+
+
+async def search_movies(request):
+    """
+    Sucht nach Filmen basierend auf der Suchanfrage.
+    """
+    query = request.query_params.get('query')
+    movies = await data_manager.search_movies(query) if query else []
+    return render(request, 'search_results.html', movies=movies, query=query or '')
+
+
+async def not_found(request, exc):
+    """
+    Renders the 404.html template for unknown routes.
+    """
+    return render(request, '404.html', status_code=404)
+
+
+async def server_error(request, exc):
+    """
+    Logs the error and renders the 500.html template.
+    """
+    logger.error(f"Server error: {exc}")
+    logger.error(traceback.format_exc())
+    return render(request, '500.html', status_code=500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Create the tables and the shared upstream HTTP client per worker process.
+    """
+    await data_manager.init()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=UPSTREAM_TIMEOUT) as http:
+        app.state.http = http
+        yield
+    await data_manager.close()
+
+
+routes = [
+    Route('/', home, name='home'),
+    Route('/users', list_users, name='list_users'),
+    Route('/users/{user_id:int}', user_movies, name='user_movies'),
+    Route('/movies', list_movies, name='list_movies'),
+    Route('/add_user', add_user, methods=['GET', 'POST'], name='add_user'),
+    Route('/users/{user_id:int}/add_movie', add_movie, methods=['GET', 'POST'], name='add_movie'),
+    Route('/users/{user_id:int}/update_movie/{movie_id:int}', update_movie,
+          methods=['GET', 'POST'], name='update_movie'),
+    Route('/movies/{movie_id:int}/delete', delete_movie, methods=['POST'], name='delete_movie'),
+    Route('/genres', list_genres, name='list_genres'),
+    Route('/genres/{genre_id:int}', genre_movies, name='genre_movies'),
+    Route('/genres/add', add_genre, methods=['GET', 'POST'], name='add_genre'),
+    Route('/genres/delete/{genre_id:int}', delete_genre, methods=['POST'], name='delete_genre'),
+    Route('/movies/{movie_id:int}/add_review', add_review, methods=['GET', 'POST'], name='add_review'),
+    Route('/movies/{movie_id:int}', movie_details, name='movie_details'),
+    Route('/recommend_movies/{user_id:int}', recommend_movies, name='recommend_movies'),
+    Route('/user/{user_id:int}/recommendations', recommend_movies, name='show_recommendations'),
+    Route('/search_movies', search_movies, name='search_movies'),
+    Mount('/static', FingerprintedStaticFiles(directory=STATIC_DIR), name='static'),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    # Starlette ships gzip only; brotli is served by the Flask app
+    middleware=[Middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE)],
+    exception_handlers={404: not_found, 500: server_error},
+)
@@ -0,0 +1,61 @@
+"""
+Startup-time benchmark for the MovieWeb app.
+
+Each run starts a fresh interpreter, imports app.py and serves a first request,
+so the numbers include everything a new worker (or test collection) pays before
+it can answer traffic. The database is a temporary copy of instance/moviweb_app.db.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+with app.app.test_client() as client:
+    client.get('/users')
+served = time.perf_counter()
+print(json.dumps({'import': imported - start, 'first_request': served - imported,
+                  'total': served - start}))
+"""
+
+
+def run_once(env):
+    """
+    Start a fresh interpreter and return its import and first-request timings.
+    """
+    output = subprocess.run([sys.executable, '-c', SNIPPET], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """
+    Run the benchmark and print median and best timings in milliseconds.
+    """
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'moviweb_app.db')
+        shutil.copy(os.path.join(ROOT, 'instance', 'moviweb_app.db'), db_file)
+        env = dict(os.environ, DATABASE_FILE=db_file, DATA_MANAGER_BACKEND='sqlite')
+        results = [run_once(env) for _ in range(runs)]
+
+    print(f"{'phase':<15}{'median ms':>12}{'best ms':>12}")
+    for phase in ('import', 'first_request', 'total'):
+        timings = [result[phase] * 1000 for result in results]
+        print(f"{phase:<15}{statistics.median(timings):>12.1f}{min(timings):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
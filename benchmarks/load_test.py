@@ -0,0 +1,415 @@
+"""
+End-to-end load test for the MovieWeb app.
+
+Seeds a temporary database, replaces OMDb and RapidAPI with local stand-ins whose
+latency and error rate are configurable, starts the app under gunicorn (or the
+ASGI variant under uvicorn) and drives a mix of browse, search, add-movie, review
+and recommendation traffic with a fixed number of concurrent clients. Each
+concurrency level runs for a while, then throughput and p50/p95/p99 latency are
+reported per route, so the level at which latency or errors take off is visible.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 8,16,32,64 --duration 30
+    python benchmarks/load_test.py --server uvicorn --omdb-latency 0.5 --omdb-error-rate 0.1
+"""
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Words the seeded titles are made of, so searches and autocomplete hit real rows
+ADJECTIVES = ['Dark', 'Silent', 'Last', 'Lost', 'Golden', 'Broken', 'Hidden', 'Eternal', 'Red', 'Wild']
+NOUNS = ['Night', 'River', 'Empire', 'Dream', 'Heart', 'City', 'Storm', 'Shadow', 'Road', 'Garden']
+GENRES = ['Drama', 'Comedy', 'Action', 'Thriller', 'Sci-Fi', 'Romance', 'Horror', 'Animation']
+DIRECTORS = ['Michael Mann', 'Kathryn Bigelow', 'Denis Villeneuve', 'Greta Gerwig', 'Bong Joon-ho',
+             'Sofia Coppola', 'Christopher Nolan', 'Agnes Varda']
+
+
+# Upstream stand-ins
+class _StubHandler(BaseHTTPRequestHandler):
+    """
+    Base handler of the upstream stand-ins: waits the configured latency, then fails
+    with the configured probability or answers with the subclass's payload.
+    """
+
+    def respond(self, payload):
+        """
+        Send payload as JSON after the simulated latency, or a 503 now and then.
+        """
+        server = self.server
+        time.sleep(random.uniform(0.5, 1.5) * server.latency)
+        if random.random() < server.error_rate:
+            status, body = 503, b'{"error": "stub failure"}'
+        else:
+            status, body = 200, json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        Keep the stand-ins quiet.
+        """
+
+
+class OmdbStubHandler(_StubHandler):
+    """
+    Answers OMDb title lookups (``?t=``) with a made-up but stable movie per title.
+    """
+
+    def do_GET(self):
+        """
+        Look up the ``t`` parameter.
+        """
+        title = parse_qs(urlparse(self.path).query).get('t', [''])[0]
+        checksum = zlib.crc32(title.lower().encode())
+        self.respond({
+            'Response': 'True',
+            'Title': title,
+            'Year': str(1950 + checksum % 75),
+            'Director': DIRECTORS[checksum % len(DIRECTORS)],
+            'imdbRating': f"{checksum % 60 / 10 + 4:.1f}",
+            'imdbID': f"tt{checksum % 10_000_000:07d}",
+            'Plot': 'A load test stand-in.',
+            'Poster': 'N/A',
+            'Genre': ', '.join(GENRES[checksum % len(GENRES)::3][:2]),
+        })
+
+
+class RapidApiStubHandler(_StubHandler):
+    """
+    Answers RapidAPI chat requests with a fixed list of recommendations.
+    """
+
+    def do_POST(self):
+        """
+        Reply to a chat request.
+        """
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond({'result': '\n'.join(f"{i}. {random.choice(ADJECTIVES)} {random.choice(NOUNS)}"
+                                          for i in range(1, 6))})
+
+
+def start_stub(handler, latency, error_rate):
+    """
+    Start an upstream stand-in on a free local port.
+
+    Args:
+        handler (type): OmdbStubHandler or RapidApiStubHandler.
+        latency (float): Mean response time in seconds.
+        error_rate (float): Fraction of requests answered with HTTP 503.
+
+    Returns:
+        ThreadingHTTPServer: The running server; call shutdown() to stop it.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Seeded database
+def seed_database(db_file, users, movies, rng):
+    """
+    Fill a new database with users, movies, genres, favorites and reviews.
+
+    Args:
+        db_file (str): The database file to create.
+        users (int): The number of users.
+        movies (int): The number of movies.
+        rng (Random): The random generator.
+
+    Returns:
+        dict: The seeded 'user_ids' and 'movie_ids'.
+    """
+    from datamanager.sqlite_data_manager import SQLiteDataManager
+
+    data_manager = SQLiteDataManager(db_file)
+    with data_manager.unit_of_work():
+        genres = [data_manager.add_genre(name) for name in GENRES]
+        movie_ids = [
+            data_manager.add_movie(
+                name=f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}",
+                director=rng.choice(DIRECTORS), year=rng.randint(1950, 2024),
+                rating=round(rng.uniform(4, 9.5), 1), genres=rng.sample(genres, 2),
+                imdb_id=f"tt9{i:06d}"
+            ).id
+            for i in range(movies)
+        ]
+        user_ids = [data_manager.add_user(f"Load Test User {i}").id for i in range(users)]
+        for user_id in user_ids:
+            for movie_id in rng.sample(movie_ids, min(10, len(movie_ids))):
+                data_manager.add_favorite_movie(user_id, movie_id)
+            for movie_id in rng.sample(movie_ids, min(3, len(movie_ids))):
+                data_manager.add_review("Seeded review", rng.randint(1, 10), user_id, movie_id)
+    data_manager.dispose()
+    return {'user_ids': user_ids, 'movie_ids': movie_ids}
+
+
+# The app under test
+def free_port():
+    """
+    Returns a TCP port that is free right now.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_app(server, workers, env, log_file):
+    """
+    Start the app in a subprocess and wait until it answers.
+
+    Args:
+        server (str): 'gunicorn' (app.py) or 'uvicorn' (asgi_app.py).
+        workers (int): The number of worker processes.
+        env (dict): The environment of the app.
+        log_file (file): Receives the app's output.
+
+    Returns:
+        tuple: (Popen, base URL).
+    """
+    port = free_port()
+    if server == 'uvicorn':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--no-access-log', '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--access-logfile', os.devnull, 'app:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{server} exited with code {process.returncode}, see {log_file.name}")
+        try:
+            if requests.get(f'{base_url}/users', timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{server} did not start within 60 seconds, see {log_file.name}")
+
+
+# Traffic mix: (weight, scenario); each scenario makes one request through the client
+def browse(client):
+    """
+    A listing, user page or movie page.
+    """
+    page = client.rng.choice([
+        ('GET /movies', '/movies', {'page': client.rng.randint(1, 5),
+                                    'sort': client.rng.choice(['name', 'newest', 'rating_desc'])}),
+        ('GET /users/<id>', f'/users/{client.user_id()}', None),
+        ('GET /movies/<id>', f'/movies/{client.movie_id()}', None),
+        ('GET /users', '/users', None),
+    ])
+    return client.request('GET', *page)
+
+
+def search(client):
+    """
+    A title search, or an autocomplete lookup where the server has one.
+    """
+    word = client.rng.choice(ADJECTIVES + NOUNS)
+    if client.autocomplete and client.rng.random() < 0.5:
+        return client.request('GET', 'GET /autocomplete', '/autocomplete', {'q': word[:3].lower()})
+    return client.request('GET', 'GET /search_movies', '/search_movies', {'query': word})
+
+
+def add_movie(client):
+    """
+    Adding a favorite, which looks the title up on OMDb.
+    """
+    # Mostly new titles; some repeat, as popular films get added by many users
+    title = f"{client.rng.choice(ADJECTIVES)} {client.rng.choice(NOUNS)} {client.rng.randint(1, 5000)}"
+    form = {'name': title, 'director': '', 'year': '', 'rating': '', 'genres': client.rng.sample(GENRES, 2)}
+    return client.request('POST', 'POST /users/<id>/add_movie', f'/users/{client.user_id()}/add_movie', data=form)
+
+
+def review(client):
+    """
+    Posting a review.
+    """
+    form = {'text': 'Load test review', 'rating': str(client.rng.randint(1, 10))}
+    return client.request('POST', 'POST /movies/<id>/add_review', f'/movies/{client.movie_id()}/add_review',
+                          data=form)
+
+
+def recommend(client):
+    """
+    Recommendations, from the stored ones or RapidAPI.
+    """
+    return client.request('GET', 'GET /recommend_movies/<id>', f'/recommend_movies/{client.user_id()}')
+
+
+MIX = [(50, browse), (25, search), (5, add_movie), (15, review), (5, recommend)]
+
+
+class LoadClient:
+    """
+    One simulated user: sends requests back to back and records their latency.
+    """
+
+    def __init__(self, base_url, seeded, seed, autocomplete):
+        """
+        Args:
+            base_url (str): The app's address.
+            seeded (dict): The seeded 'user_ids' and 'movie_ids'.
+            seed (int): Seed of the client's random choices.
+            autocomplete (bool): Whether the server has /autocomplete.
+        """
+        self.base_url = base_url
+        self.seeded = seeded
+        self.rng = random.Random(seed)
+        self.autocomplete = autocomplete
+        self.session = requests.Session()
+        self.samples = []  # (route, seconds, failed)
+
+    def user_id(self):
+        """
+        A random seeded user.
+        """
+        return self.rng.choice(self.seeded['user_ids'])
+
+    def movie_id(self):
+        """
+        A random seeded movie.
+        """
+        return self.rng.choice(self.seeded['movie_ids'])
+
+    def request(self, method, route, path, params=None, data=None):
+        """
+        Send one request (redirects are not followed) and record it under route.
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, params=params, data=data,
+                                            allow_redirects=False, timeout=60)
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        self.samples.append((route, time.perf_counter() - start, failed))
+
+    def run(self, stop_at):
+        """
+        Drive the traffic mix until the deadline.
+        """
+        weights = [weight for weight, _ in MIX]
+        scenarios = [scenario for _, scenario in MIX]
+        while time.monotonic() < stop_at:
+            self.rng.choices(scenarios, weights)[0](self)
+
+
+def run_level(base_url, seeded, concurrency, duration, autocomplete):
+    """
+    Run the traffic mix with a number of concurrent clients.
+
+    Returns:
+        list: The (route, seconds, failed) samples of all clients.
+    """
+    clients = [LoadClient(base_url, seeded, seed, autocomplete) for seed in range(concurrency)]
+    stop_at = time.monotonic() + duration
+    threads = [threading.Thread(target=client.run, args=(stop_at,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [sample for client in clients for sample in client.samples]
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an ascending list.
+    """
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+def report(samples, duration, concurrency):
+    """
+    Print requests, errors, throughput and latency percentiles per route.
+    """
+    by_route = defaultdict(list)
+    for route, seconds, failed in samples:
+        by_route[route].append((seconds, failed))
+    by_route['TOTAL'] = [(seconds, failed) for _, seconds, failed in samples]
+
+    print(f"\n== concurrency {concurrency}, {duration:.0f} s ==")
+    print(f"{'route':<32}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for route in sorted(by_route, key=lambda route: (route == 'TOTAL', route)):
+        latencies = sorted(seconds * 1000 for seconds, _ in by_route[route])
+        errors = sum(failed for _, failed in by_route[route])
+        print(f"{route:<32}{len(latencies):>10}{errors:>8}{len(latencies) / duration:>9.1f}"
+              f"{percentile(latencies, 50):>9.1f}{percentile(latencies, 95):>9.1f}{percentile(latencies, 99):>9.1f}")
+
+
+def main():
+    """
+    Parse the options, set everything up, run each concurrency level and report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--server', choices=['gunicorn', 'uvicorn'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2, help='app worker processes')
+    parser.add_argument('--concurrency', default='8,16,32', help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per concurrency level')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--movies', type=int, default=2000)
+    parser.add_argument('--omdb-latency', type=float, default=0.2, help='mean seconds')
+    parser.add_argument('--omdb-error-rate', type=float, default=0.0)
+    parser.add_argument('--rapidapi-latency', type=float, default=1.0, help='mean seconds')
+    parser.add_argument('--rapidapi-error-rate', type=float, default=0.0)
+    parser.add_argument('--omdb-rate', type=float, help="the app's OMDb quota per second (default: app config)")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    omdb = start_stub(OmdbStubHandler, args.omdb_latency, args.omdb_error_rate)
+    rapidapi = start_stub(RapidApiStubHandler, args.rapidapi_latency, args.rapidapi_error_rate)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'moviweb_app.db')
+        print(f"Seeding {args.users} users and {args.movies} movies ...")
+        seeded = seed_database(db_file, args.users, args.movies, random.Random(args.seed))
+
+        env = dict(os.environ, DATABASE_FILE=db_file, DATA_MANAGER_BACKEND='sqlite',
+                   OMDB_URL=f'http://127.0.0.1:{omdb.server_port}/',
+                   RAPIDAPI_URL=f'http://127.0.0.1:{rapidapi.server_port}/conversationllama',
+                   OMDB_API_KEY='load-test', RAPIDAPI_KEY='load-test', RAPIDAPI_HOST='load-test')
+        if args.omdb_rate is not None:
+            env['OMDB_RATE_PER_SECOND'] = str(args.omdb_rate)
+            env['OMDB_BURST'] = str(max(int(args.omdb_rate), 1))
+
+        with open(os.path.join(tmp, 'app.log'), 'w') as log_file:
+            process, base_url = start_app(args.server, args.workers, env, log_file)
+            try:
+                for concurrency in (int(level) for level in args.concurrency.split(',')):
+                    samples = run_level(base_url, seeded, concurrency, args.duration,
+                                        autocomplete=args.server == 'gunicorn')
+                    report(samples, args.duration, concurrency)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+    omdb.shutdown()
+    rapidapi.shutdown()
+
+
+if __name__ == '__main__':
+    main()
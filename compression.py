@@ -0,0 +1,92 @@
+"""
+This module compresses rendered pages and JSON responses with brotli or gzip,
+depending on what the client accepts.
+"""
+
+import gzip
+from flask import request
+
+# Responses with these content types are compressed; images are already compressed
+COMPRESSIBLE_TYPES = frozenset({
+    'text/html', 'text/css', 'text/plain', 'application/json', 'application/javascript', 'text/javascript'
+})
+
+# Levels tuned for on-the-fly compression: most of the size win at a fraction of the CPU time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def _brotli():
+    """
+    Returns the brotli module, or None if it is not installed (gzip is used then).
+    """
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def choose_encoding(accept_encodings, brotli_available=True):
+    """
+    Picks the best encoding the client accepts.
+
+    Args:
+        accept_encodings (Accept): The parsed Accept-Encoding header.
+        brotli_available (bool, optional): Whether brotli can be used. Defaults to True.
+
+    Returns:
+        str: 'br', 'gzip' or None.
+    """
+    if brotli_available and accept_encodings['br'] > 0:
+        return 'br'
+    if accept_encodings['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    """
+    Compresses a response body.
+
+    Args:
+        data (bytes): The uncompressed body.
+        encoding (str): 'br' or 'gzip'.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    if encoding == 'br':
+        return _brotli().compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def init_compression(app):
+    """
+    Compresses the app's responses above COMPRESS_MIN_SIZE bytes.
+
+    Args:
+        app (Flask): The application.
+    """
+    brotli_available = _brotli() is not None
+
+    @app.after_request
+    def compress_response(response):
+        """
+        Replaces the body with its compressed form when that is worthwhile.
+        """
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = choose_encoding(request.accept_encodings, brotli_available)
+        if encoding is None:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,36 @@
+import pytest
+from datamanager.memory_data_manager import InMemoryDataManager
+from datamanager.sqlite_data_manager import SQLiteDataManager
+
+
+@pytest.fixture
+def data_manager():
+    """Fixture for a fresh in-memory data manager."""
+    return InMemoryDataManager()
+
+
+@pytest.fixture
+def user(data_manager):
+    """Fixture for a user stored in the data manager."""
+    return data_manager.add_user("Jane Doe")
+
+
+@pytest.fixture
+def movie(data_manager):
+    """Fixture for a movie stored in the data manager."""
+    return data_manager.add_movie(name="Memento", director="Christopher Nolan", year=2000, rating=8.4)
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    """Fixture for the path of a fresh SQLite database file."""
+    return str(tmp_path / "moviweb_app.db")
+
+
+@pytest.fixture
+def sqlite_data_manager(db_file):
+    """Fixture for a SQLite data manager on a fresh database file."""
+    data_manager = SQLiteDataManager(db_file)
+    yield data_manager
+    data_manager.session.remove()
+    data_manager.engine.dispose()
@@ -1,33 +1,188 @@
 """
-This module initializes the Flask application and sets up the database.
+This module initializes the Flask application and sets up the data manager.
+
+Creating the app is side-effect free: no database engine is created and no schema
+DDL runs until the first request asks for the data manager, and the backends
+(and with them SQLAlchemy) are only imported at that point.
 """
 
 import os
-from flask import Flask
-from datamanager.data_models import db
+from importlib import import_module
+from flask import Flask, current_app
+
+# Data manager backends selectable via the DATA_MANAGER_BACKEND config value,
+# as "module:Class" paths so only the selected backend is ever imported.
+DATA_MANAGER_BACKENDS = {
+    'sqlite': 'datamanager.sqlite_data_manager:SQLiteDataManager',
+    'memory': 'datamanager.memory_data_manager:InMemoryDataManager',
+    'sharded': 'datamanager.sharded_data_manager:ShardedDataManager',
+}
+
+
+def register_backend(name, backend_class):
+    """
+    Registers a data manager backend under a config name.
+
+    Args:
+        name (str): The value of DATA_MANAGER_BACKEND that selects the backend.
+        backend_class (type or str): A DataManagerInterface implementation taking the
+            database file name (or providing a from_config(config) classmethod), or its
+            "module:Class" import path.
+    """
+    DATA_MANAGER_BACKENDS[name] = backend_class
+
+
+def create_data_manager(config):
+    """
+    Creates the data manager selected by the app configuration.
+
+    Args:
+        config (Mapping): The app config with DATA_MANAGER_BACKEND and DATABASE_FILE.
 
+    Returns:
+        DataManagerInterface: The configured data manager instance.
+
+    Raises:
+        ValueError: If the configured backend is not registered.
+    """
+    backend = config.get('DATA_MANAGER_BACKEND', 'sqlite')
+    if backend not in DATA_MANAGER_BACKENDS:
+        raise ValueError(f"Unknown data manager backend: {backend}")
+    backend_class = DATA_MANAGER_BACKENDS[backend]
+    if isinstance(backend_class, str):
+        module_name, class_name = backend_class.split(':')
+        backend_class = getattr(import_module(module_name), class_name)
+    # Backends with settings beyond the database file read them from the config
+    from_config = getattr(backend_class, 'from_config', None)
+    if from_config is not None:
+        return from_config(config)
+    return backend_class(config.get('DATABASE_FILE'))
 
-def create_app():
+
+def get_data_manager():
+    """
+    Returns the current app's data manager, creating it on first use.
+
+    Returns:
+        DataManagerInterface: The data manager bound to the current app.
+    """
+    data_manager = current_app.extensions.get('data_manager')
+    if data_manager is None:
+        data_manager = create_data_manager(current_app.config)
+        current_app.extensions['data_manager'] = data_manager
+    return data_manager
+
+
+def get_group_commit_writer():
+    """
+    Returns the current app's group-commit writer, starting it on first use.
+
+    Returns:
+        GroupCommitWriter: The writer bound to the app's data manager.
+    """
+    writer = current_app.extensions.get('group_commit_writer')
+    if writer is None:
+        from datamanager.group_commit import GroupCommitWriter
+        writer = GroupCommitWriter(get_data_manager(),
+                                   max_batch=current_app.config['GROUP_COMMIT_MAX_BATCH'],
+                                   max_delay=current_app.config['GROUP_COMMIT_MAX_DELAY']).start()
+        current_app.extensions['group_commit_writer'] = writer
+    return writer
+
+
+def reset_data_manager(app):
+    """
+    Discards the app's data manager so the next request creates a fresh one.
+
+    Call this in a pre-fork server's post-fork hook: connections inherited from the
+    parent are dropped (not closed) and each worker builds its own engine and pool.
+
+    Args:
+        app (Flask): The application whose data manager should be reset.
+    """
+    # Threads do not survive fork(); the child starts its own writer and pools on first use
+    app.extensions.pop('group_commit_writer', None)
+    app.extensions.pop('omdb_pool', None)
+    data_manager = app.extensions.pop('data_manager', None)
+    if hasattr(data_manager, 'dispose'):
+        data_manager.dispose()
+
+
+def create_app(config=None):
     """
     Application Factory: Creates and configures the Flask app.
 
+    Args:
+        config (dict, optional): Config values overriding the environment.
+
     Returns:
         Flask: The configured Flask application instance.
     """
+    from dotenv import load_dotenv
+    load_dotenv()
+
     template_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'templates')
     static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static')
 
     app = Flask(__name__, template_folder=template_folder, static_folder=static_folder)
 
     # App configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///moviweb_app.db'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DATA_MANAGER_BACKEND'] = os.getenv('DATA_MANAGER_BACKEND', 'sqlite')
+    app.config['DATABASE_FILE'] = os.getenv('DATABASE_FILE', 'instance/moviweb_app.db')
+    # Number of user shard files for DATA_MANAGER_BACKEND=sharded; fixed once users exist
+    app.config['SHARD_COUNT'] = int(os.getenv('SHARD_COUNT', 4))
+    app.config['RAPIDAPI_KEY'] = os.getenv("RAPIDAPI_KEY")
+    app.config['RAPIDAPI_HOST'] = os.getenv("RAPIDAPI_HOST")
+    app.config['OMDB_API_KEY'] = os.getenv("OMDB_API_KEY")
+    # Upstream endpoints; the load test points them at local stand-ins
+    app.config['OMDB_URL'] = os.getenv("OMDB_URL", "http://www.omdbapi.com/")
+    app.config['RAPIDAPI_URL'] = os.getenv("RAPIDAPI_URL", "https://open-ai21.p.rapidapi.com/conversationllama")
+    # Local IMDb title index (flask build-title-index), asked before OMDb once it exists
+    app.config['TITLE_INDEX_FILE'] = os.getenv("TITLE_INDEX_FILE", "instance/title_index.db")
+    # OMDb quota per worker process: sustained rate, burst, and how long callers may queue
+    app.config['OMDB_RATE_PER_SECOND'] = float(os.getenv("OMDB_RATE_PER_SECOND", 5))
+    app.config['OMDB_BURST'] = int(os.getenv("OMDB_BURST", 10))
+    app.config['OMDB_MAX_WAIT'] = float(os.getenv("OMDB_MAX_WAIT", 10))
+    # OMDb responses cached per worker process: entries and seconds they stay valid
+    app.config['OMDB_CACHE_SIZE'] = int(os.getenv("OMDB_CACHE_SIZE", 1024))
+    app.config['OMDB_CACHE_TTL'] = float(os.getenv("OMDB_CACHE_TTL", 3600))
+    # Add-movie search preview: result pages read, candidates fetched in detail, parallel calls
+    app.config['OMDB_SEARCH_PAGES'] = int(os.getenv("OMDB_SEARCH_PAGES", 3))
+    app.config['OMDB_SEARCH_DETAILS'] = int(os.getenv("OMDB_SEARCH_DETAILS", 5))
+    app.config['OMDB_SEARCH_WORKERS'] = int(os.getenv("OMDB_SEARCH_WORKERS", 4))
+    # RapidAPI circuit breaker: consecutive failures to open, slow-call limit, seconds before probing
+    app.config['RAPIDAPI_TIMEOUT'] = float(os.getenv("RAPIDAPI_TIMEOUT", 30))
+    app.config['RAPIDAPI_FAILURE_THRESHOLD'] = int(os.getenv("RAPIDAPI_FAILURE_THRESHOLD", 3))
+    app.config['RAPIDAPI_SLOW_CALL_SECONDS'] = float(os.getenv("RAPIDAPI_SLOW_CALL_SECONDS", 10))
+    app.config['RAPIDAPI_RESET_TIMEOUT'] = float(os.getenv("RAPIDAPI_RESET_TIMEOUT", 30))
+    # Estimated token budget of a recommendation prompt, which names a subset of the favorites
+    app.config['RECOMMENDATION_PROMPT_TOKENS'] = int(os.getenv("RECOMMENDATION_PROMPT_TOKENS", 500))
+    # Group commit: batch concurrent review writes into one transaction (up to N writes,
+    # optionally waiting M seconds for more)
+    app.config['GROUP_COMMIT'] = os.getenv("GROUP_COMMIT", "0") == "1"
+    app.config['GROUP_COMMIT_MAX_BATCH'] = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 100))
+    app.config['GROUP_COMMIT_MAX_DELAY'] = float(os.getenv("GROUP_COMMIT_MAX_DELAY", 0))
+    # Required in the X-Admin-Token header of the /admin endpoints; unset disables them
+    app.config['ADMIN_TOKEN'] = os.getenv("ADMIN_TOKEN")
+    # Online snapshots (flask backup-db): target directory and how many to keep
+    app.config['BACKUP_DIR'] = os.getenv("BACKUP_DIR", "instance/backups")
+    app.config['BACKUP_KEEP'] = int(os.getenv("BACKUP_KEEP", 7))
+    # Smallest HTML/JSON body (in bytes) worth compressing
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv("COMPRESS_MIN_SIZE", 500))
+    app.config.update(config or {})
 
-    # Initialize SQLAlchemy with the app
-    db.init_app(app)
+    from compression import init_compression
+    from static_assets import init_static_assets
+    init_compression(app)
+    init_static_assets(app)
 
-    # Create tables (optional, on first start)
-    with app.app_context():
-        db.create_all()
+    @app.teardown_appcontext
+    def close_data_manager_session(exception):
+        """
+        Returns the request's database session to the pool.
+        """
+        data_manager = app.extensions.get('data_manager')
+        if hasattr(data_manager, 'close_session'):
+            data_manager.close_session()
 
-    return app
\ No newline at end of file
+    return app
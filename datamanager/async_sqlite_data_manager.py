@@ -0,0 +1,565 @@
+"""
+This module implements an asyncio-based SQLite data manager for the MovieWeb application.
+
+It mirrors SQLiteDataManager but runs on SQLAlchemy's asyncio extension over aiosqlite,
+so the ASGI variant of the app never blocks the event loop on database I/O.
+"""
+
+from datetime import datetime, UTC
+from sqlalchemy import select, delete, event, union, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import selectinload
+from datamanager.data_models import (ensure_schema, User, Movie, UserMovie, Genre, Review, UserStats,
+                                     MovieTrend, movie_genre)
+from datamanager.trending import (FAVORITE_WEIGHT, REVIEW_WEIGHT, PRUNE_BELOW, event_hours, register_functions,
+                                  landmark_statement, landmark_query, bump_statement, prune_statement,
+                                  rebase_statements)
+from datamanager.favorite_rows import favorites_statement, favorite_genres_statement, favorite_rows
+
+
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    """
+    Enforces foreign keys on every new connection so deletes cascade to dependent rows,
+    and adds the SQL functions of the trending counters.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+    register_functions(dbapi_connection)
+
+
+class AsyncSQLiteDataManager:
+    """
+    Async SQLite implementation of the data manager operations.
+
+    Every method opens its own short-lived session, so a single instance can be
+    shared safely by all concurrently running requests. Objects are returned
+    detached with the relationships the templates need already loaded.
+    """
+
+    def __init__(self, db_file_name):
+        """
+        Initialize the async SQLite data manager.
+
+        Args:
+            db_file_name (str): The name of the SQLite database file.
+        """
+        self.engine = create_async_engine(f'sqlite+aiosqlite:///{db_file_name}')
+        event.listen(self.engine.sync_engine, 'connect', _enable_foreign_keys)
+        self.Session = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def init(self):
+        """
+        Create the database tables unless the stored schema version matches.
+        """
+        async with self.engine.begin() as conn:
+            await conn.run_sync(ensure_schema)
+
+    async def close(self):
+        """
+        Dispose of the engine and its connection pool.
+        """
+        await self.engine.dispose()
+
+    async def _add(self, obj):
+        """
+        Persist a single new object and return it.
+        """
+        async with self.Session() as session:
+            session.add(obj)
+            await session.commit()
+            return obj
+
+    @staticmethod
+    async def _invalidate_user_stats(session, user_ids):
+        """
+        Drop cached taste profiles (see SQLiteDataManager.get_user_stats) so they are
+        rebuilt from the aggregates on their next read.
+
+        Args:
+            session (AsyncSession): The session of the write.
+            user_ids: A list or a SELECT of the affected user IDs.
+        """
+        await session.execute(delete(UserStats).where(UserStats.user_id.in_(user_ids)))
+
+    @staticmethod
+    async def _record_trend(session, events):
+        """
+        Update the trending counters (see SQLiteDataManager._record_trend) in the write's transaction.
+
+        Args:
+            session (AsyncSession): The session of the write.
+            events (list): (movie_id, weight, timestamp) tuples; negative weights remove events.
+        """
+        hours = event_hours()
+        await session.execute(landmark_statement(), {'hours': hours})
+        for statement in rebase_statements((await session.execute(landmark_query())).scalar(), hours):
+            await session.execute(statement)
+        await session.execute(bump_statement(), [
+            {'movie_id': movie_id, 'weight': weight, 'hours': event_hours(timestamp)}
+            for movie_id, weight, timestamp in events
+        ])
+        removed = [{'movie_id': movie_id} for movie_id, weight, _ in events if weight < 0]
+        if removed:
+            await session.execute(prune_statement(), removed)
+
+    @staticmethod
+    def _movie_users(movie_ids):
+        """
+        SELECT of the users with favorites or reviews among the given movies.
+        """
+        return union(select(UserMovie.user_id).where(UserMovie.movie_id.in_(movie_ids)),
+                     select(Review.user_id).where(Review.movie_id.in_(movie_ids)))
+
+    # CRUD operations for User
+    async def get_all_users(self):
+        """
+        Retrieve all users from the database.
+
+        Returns:
+            list: A list of all User objects.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(User))
+            return result.all()
+
+    async def add_user(self, name):
+        """
+        Add a new user to the database.
+
+        Args:
+            name (str): The name of the user.
+
+        Returns:
+            User: The newly created User object.
+        """
+        return await self._add(User(name=name))
+
+    async def get_user_by_id(self, user_id):
+        """
+        Retrieve a user by their ID from the database.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User: The User object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            return await session.get(User, user_id)
+
+    # CRUD operations for Movie
+    async def get_all_movies(self):
+        """
+        Retrieve all movies from the database.
+
+        Returns:
+            list: A list of all Movie objects.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(Movie))
+            return result.all()
+
+    async def add_movie(self, name, director=None, year=None, rating=None, poster=None, genres=(), imdb_id=None):
+        """
+        Add a new movie to the database, or return the stored one with the same imdbID.
+
+        Args:
+            name (str): The name of the movie.
+            director (str, optional): The director of the movie.
+            year (int, optional): The release year of the movie.
+            rating (float, optional): The rating of the movie.
+            poster (str, optional): The URL of the movie poster.
+            genres (list, optional): A list of Genre objects for the movie.
+            imdb_id (str, optional): OMDb's imdbID of the movie.
+
+        Returns:
+            Movie: The newly created Movie object, or the existing one for imdb_id.
+        """
+        if imdb_id:
+            existing_movie = await self.get_movie_by_imdb_id(imdb_id)
+            if existing_movie:
+                return existing_movie
+        try:
+            async with self.Session() as session:
+                new_movie = Movie(name=name, director=director, year=year, rating=rating, poster=poster,
+                                  imdb_id=imdb_id)
+                new_movie.genres = [await session.merge(genre) for genre in genres]
+                session.add(new_movie)
+                await session.commit()
+                return new_movie
+        except IntegrityError:
+            # Another request stored the same film in the meantime
+            existing_movie = await self.get_movie_by_imdb_id(imdb_id) if imdb_id else None
+            if existing_movie is None:
+                raise
+            return existing_movie
+
+    async def get_movie_by_imdb_id(self, imdb_id):
+        """
+        Retrieve a movie by its imdbID.
+
+        Args:
+            imdb_id (str): OMDb's imdbID of the movie.
+
+        Returns:
+            Movie: The Movie object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            result = await session.execute(select(Movie).filter_by(imdb_id=imdb_id).options(selectinload(Movie.genres)))
+            return result.scalars().first()
+
+    async def get_movies_by_names(self, names):
+        """
+        Retrieve the movies with any of the given names, ignoring case, in one query.
+
+        Args:
+            names (iterable): The movie names to look up.
+
+        Returns:
+            list: A list of matching Movie objects (several per name for remakes).
+        """
+        names = {name.lower() for name in names}
+        if not names:
+            return []
+        async with self.Session() as session:
+            result = await session.scalars(select(Movie).where(func.lower(Movie.name).in_(names)))
+            return result.all()
+
+    async def get_movie_by_id(self, movie_id):
+        """
+        Retrieve a movie by its ID, with its genres loaded.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            Movie: The Movie object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            return await session.get(Movie, movie_id, options=[selectinload(Movie.genres)])
+
+    async def update_movie(self, movie_id, **kwargs):
+        """
+        Update a movie's details in the database.
+
+        Args:
+            movie_id (int): The ID of the movie to update.
+            **kwargs: Arbitrary keyword arguments representing the movie attributes to update.
+
+        Returns:
+            Movie: The updated Movie object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            movie = await session.get(Movie, movie_id)
+            if not movie:
+                return None
+            for key, value in kwargs.items():
+                if hasattr(movie, key):
+                    setattr(movie, key, value)
+            if {'director', 'year', 'genres'} & kwargs.keys():
+                await self._invalidate_user_stats(session, self._movie_users([movie_id]))
+            await session.commit()
+            return movie
+
+    async def delete_movie(self, movie_id):
+        """
+        Delete a movie and its associated data from the database.
+
+        Args:
+            movie_id (int): The ID of the movie to delete.
+
+        Returns:
+            bool: True if the movie was successfully deleted, False otherwise.
+        """
+        async with self.Session() as session:
+            # Favorites, reviews and genre links go with it (ON DELETE CASCADE)
+            await self._invalidate_user_stats(session, self._movie_users([movie_id]))
+            result = await session.execute(delete(Movie).filter_by(id=movie_id))
+            await session.commit()
+            return result.rowcount > 0
+
+    # CRUD operations for UserMovie (relationship table)
+    async def add_favorite_movie(self, user_id, movie_id):
+        """
+        Add a movie to a user's favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie to add as a favorite.
+
+        Returns:
+            UserMovie: The UserMovie object representing the favorite relationship.
+        """
+        async with self.Session() as session:
+            existing_favorite = await session.get(UserMovie, (user_id, movie_id))
+            if existing_favorite:
+                return existing_favorite
+            favorite = UserMovie(user_id=user_id, movie_id=movie_id, date_added=datetime.now(UTC))
+            session.add(favorite)
+            await self._invalidate_user_stats(session, [user_id])
+            await self._record_trend(session, [(movie_id, FAVORITE_WEIGHT, favorite.date_added)])
+            await session.commit()
+            return favorite
+
+    async def get_favorite_movies_by_user(self, user_id):
+        """
+        Retrieve all favorite movies for a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: A list of Movie objects that are favorites of the specified user.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(
+                select(Movie).join(UserMovie).where(UserMovie.user_id == user_id)
+            )
+            return result.all()
+
+    async def get_favorite_details(self, user_id):
+        """
+        Retrieve a user's favorites with when they were added, the user's own rating
+        and their genres, for building recommendation prompts.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: FavoriteRow tuples, most recently added first.
+        """
+        async with self.Session() as session:
+            return favorite_rows(await session.execute(favorites_statement(user_id)),
+                                 await session.execute(favorite_genres_statement(user_id)))
+
+    async def get_users_by_favorite_movie(self, movie_id):
+        """
+        Retrieve all users who have favorited a specific movie.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            list: A list of User objects who have favorited the specified movie.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(
+                select(User).join(UserMovie).where(UserMovie.movie_id == movie_id)
+            )
+            return result.all()
+
+    async def remove_favorite_movie(self, user_id, movie_id):
+        """
+        Remove a movie from a user's favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie to remove from favorites.
+        """
+        async with self.Session() as session:
+            favorite = await session.get(UserMovie, (user_id, movie_id))
+            if favorite is None:
+                return
+            await session.delete(favorite)
+            await self._invalidate_user_stats(session, [user_id])
+            await self._record_trend(session, [(movie_id, -FAVORITE_WEIGHT, favorite.date_added)])
+            await session.commit()
+
+    # CRUD operations for Genre
+    async def get_all_genres(self):
+        """
+        Retrieve all genres from the database.
+
+        Returns:
+            list: A list of all Genre objects.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(Genre))
+            return result.all()
+
+    async def add_genre(self, name):
+        """
+        Add a new genre to the database.
+
+        Args:
+            name (str): The name of the genre.
+
+        Returns:
+            Genre: The newly created Genre object.
+        """
+        return await self._add(Genre(name=name))
+
+    async def get_genre_by_id(self, genre_id):
+        """
+        Retrieve a genre by its ID, with its movies loaded.
+
+        Args:
+            genre_id (int): The ID of the genre.
+
+        Returns:
+            Genre: The Genre object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            return await session.get(Genre, genre_id, options=[selectinload(Genre.movies)])
+
+    async def get_genre_by_name(self, genre_name):
+        """
+        Retrieve a genre by its name from the database.
+
+        Args:
+            genre_name (str): The name of the genre.
+
+        Returns:
+            Genre: The Genre object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(Genre).filter_by(name=genre_name))
+            return result.first()
+
+    async def update_genre(self, genre_id, new_name):
+        """
+        Update a genre's name in the database.
+
+        Args:
+            genre_id (int): The ID of the genre to update.
+            new_name (str): The new name for the genre.
+
+        Returns:
+            Genre: The updated Genre object if found, None otherwise.
+        """
+        async with self.Session() as session:
+            genre = await session.get(Genre, genre_id)
+            if genre:
+                genre.name = new_name
+                await session.commit()
+            return genre
+
+    async def delete_genre(self, genre_id):
+        """
+        Delete a genre from the database.
+
+        Args:
+            genre_id (int): The ID of the genre to delete.
+        """
+        async with self.Session() as session:
+            genre_movies = select(movie_genre.c.movie_id).where(movie_genre.c.genre_id == genre_id)
+            await self._invalidate_user_stats(session, self._movie_users(genre_movies))
+            await session.execute(delete(Genre).filter_by(id=genre_id))
+            await session.commit()
+
+    # CRUD operations for Review
+    async def add_review(self, text, rating, user_id, movie_id):
+        """
+        Add a new review to the database.
+
+        Args:
+            text (str): The text content of the review.
+            rating (float): The rating given in the review.
+            user_id (int): The ID of the user who wrote the review.
+            movie_id (int): The ID of the movie being reviewed.
+
+        Returns:
+            Review: The newly created Review object.
+        """
+        async with self.Session() as session:
+            review = Review(text=text, rating=rating, user_id=user_id, movie_id=movie_id,
+                            date_posted=datetime.now(UTC))
+            session.add(review)
+            await self._invalidate_user_stats(session, [user_id])
+            await self._record_trend(session, [(movie_id, REVIEW_WEIGHT, review.date_posted)])
+            await session.commit()
+            return review
+
+    async def get_reviews_by_movie(self, movie_id):
+        """
+        Retrieve all reviews for a specific movie, with their authors loaded.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            list: A list of Review objects for the specified movie.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(
+                select(Review).filter_by(movie_id=movie_id).options(selectinload(Review.user))
+            )
+            return result.all()
+
+    async def get_reviews_by_user(self, user_id):
+        """
+        Retrieve all reviews by a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: A list of Review objects by the specified user.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(Review).filter_by(user_id=user_id))
+            return result.all()
+
+    async def search_movies(self, query):
+        """
+        Search for movies based on a query string.
+
+        Args:
+            query (str): The search query.
+
+        Returns:
+            list: A list of Movie objects that match the search query.
+        """
+        search = f"%{query}%"
+        async with self.Session() as session:
+            result = await session.scalars(
+                select(Movie).where(Movie.name.ilike(search) | Movie.director.ilike(search))
+            )
+            return result.all()
+
+    async def get_recently_added_movies(self, limit=5):
+        """
+        Retrieve the most recently added movies.
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+
+        Returns:
+            list: A list of the most recently added Movie objects.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(Movie).order_by(Movie.id.desc()).limit(limit))
+            return result.all()
+
+    async def get_top_rated_movies(self, limit=5):
+        """
+        Retrieve the top-rated movies.
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+
+        Returns:
+            list: A list of the top-rated Movie objects.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(select(Movie).order_by(Movie.rating.desc()).limit(limit))
+            return result.all()
+
+    async def get_trending_movies(self, limit=5):
+        """
+        Retrieve the movies with the most favorites and reviews lately (see trending.py).
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+
+        Returns:
+            list: A list of Movie objects, most trending first.
+        """
+        async with self.Session() as session:
+            result = await session.scalars(
+                select(Movie).join(MovieTrend, MovieTrend.movie_id == Movie.id)
+                .where(MovieTrend.score >= PRUNE_BELOW).order_by(MovieTrend.score.desc()).limit(limit)
+            )
+            return result.all()
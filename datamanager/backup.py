@@ -0,0 +1,219 @@
+"""
+This module takes online snapshots of the SQLite database and restores them.
+
+Snapshots are copied with SQLite's backup API a few pages per step inside one read
+transaction, so they are consistent and the app keeps running: in WAL mode writers
+are never blocked by the copy. Each snapshot is a self-contained database file,
+optionally gzipped, with a sha256sum-compatible checksum file next to it.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime, UTC
+
+# Pages copied per backup step, and seconds to pause between steps
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.005
+
+# Snapshot file names: <database name>-<UTC time>.db[.gz]
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%S%fZ'
+
+Snapshot = namedtuple('Snapshot', ['path', 'created_at', 'size', 'sha256'])
+
+
+def _prefix(db_file):
+    """
+    Returns the snapshot file name prefix of a database, e.g. "moviweb_app-".
+    """
+    return os.path.splitext(os.path.basename(db_file))[0] + '-'
+
+
+def _sha256(path):
+    """
+    Returns the SHA-256 hex digest of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_database(source_file, target_file, pages, sleep):
+    """
+    Copies a database with the backup API. The source is read in one transaction, so
+    concurrent writes neither restart the copy nor end up half in it.
+    """
+    source = sqlite3.connect(source_file, isolation_level=None)
+    target = sqlite3.connect(target_file)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT count(*) FROM sqlite_master").fetchone()  # Start the read transaction
+        # The progress callback runs after each step; pausing there spreads the I/O out
+        source.backup(target, pages=pages, progress=(lambda *_: time.sleep(sleep)) if sleep else None)
+        source.execute("COMMIT")
+    finally:
+        source.close()
+        target.close()
+
+
+def create_snapshot(db_file, backup_dir, compress=True, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    """
+    Takes a snapshot of a live database.
+
+    Args:
+        db_file (str): The database file.
+        backup_dir (str): The directory for the snapshots; created if missing.
+        compress (bool, optional): Gzip the snapshot. Defaults to True.
+        pages (int, optional): Pages copied per step. Defaults to BACKUP_PAGES.
+        sleep (float, optional): Seconds between steps. Defaults to BACKUP_SLEEP.
+
+    Returns:
+        Snapshot: The new snapshot.
+
+    Raises:
+        FileNotFoundError: If the database does not exist.
+    """
+    if not os.path.exists(db_file):
+        raise FileNotFoundError(f"No database at {db_file}")
+    os.makedirs(backup_dir, exist_ok=True)
+    created_at = datetime.now(UTC)
+    path = os.path.join(backup_dir, f"{_prefix(db_file)}{created_at.strftime(TIMESTAMP_FORMAT)}.db")
+    copy = f"{path}.partial"
+    try:
+        _copy_database(db_file, copy, pages, sleep)
+        snapshot = sqlite3.connect(copy)
+        try:
+            # A single file without a -wal side file, checked before it counts as a backup
+            snapshot.execute("PRAGMA journal_mode=DELETE")
+            result = snapshot.execute("PRAGMA integrity_check").fetchone()[0]
+        finally:
+            snapshot.close()
+        if result != 'ok':
+            raise ValueError(f"Snapshot of {db_file} failed the integrity check: {result}")
+        if compress:
+            path += '.gz'
+            with open(copy, 'rb') as source, gzip.open(f"{path}.partial", 'wb', compresslevel=6) as target:
+                shutil.copyfileobj(source, target, 1 << 20)
+            os.remove(copy)
+            copy = f"{path}.partial"
+        sha256 = _sha256(copy)
+        os.replace(copy, path)
+    finally:
+        if os.path.exists(copy):
+            os.remove(copy)
+    with open(f"{path}.sha256", 'w') as file:
+        file.write(f"{sha256}  {os.path.basename(path)}\n")
+    return Snapshot(path, created_at, os.path.getsize(path), sha256)
+
+
+def list_snapshots(db_file, backup_dir):
+    """
+    Lists a database's snapshots, newest first.
+
+    Args:
+        db_file (str): The database file the snapshots were taken of.
+        backup_dir (str): The snapshot directory.
+
+    Returns:
+        list: Snapshot tuples; sha256 is the recorded checksum, or None if it is missing.
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = _prefix(db_file)
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if not name.startswith(prefix) or not name.endswith(('.db', '.db.gz')):
+            continue
+        stamp = name[len(prefix):].split('.', 1)[0]
+        try:
+            created_at = datetime.strptime(stamp, TIMESTAMP_FORMAT).replace(tzinfo=UTC)
+        except ValueError:
+            continue
+        path = os.path.join(backup_dir, name)
+        snapshots.append(Snapshot(path, created_at, os.path.getsize(path), _recorded_checksum(path)))
+    snapshots.sort(key=lambda snapshot: snapshot.created_at, reverse=True)
+    return snapshots
+
+
+def _recorded_checksum(path):
+    """
+    Returns the checksum stored next to a snapshot, or None.
+    """
+    try:
+        with open(f"{path}.sha256") as file:
+            return file.read().split()[0]
+    except (OSError, IndexError):
+        return None
+
+
+def prune_snapshots(db_file, backup_dir, keep):
+    """
+    Deletes all but the newest snapshots of a database.
+
+    Args:
+        db_file (str): The database file the snapshots were taken of.
+        backup_dir (str): The snapshot directory.
+        keep (int): The number of snapshots to keep.
+
+    Returns:
+        list: The deleted Snapshot tuples.
+    """
+    removed = list_snapshots(db_file, backup_dir)[max(keep, 0):]
+    for snapshot in removed:
+        os.remove(snapshot.path)
+        if os.path.exists(f"{snapshot.path}.sha256"):
+            os.remove(f"{snapshot.path}.sha256")
+    return removed
+
+
+def verify_snapshot(path):
+    """
+    Checks a snapshot against its recorded checksum.
+
+    Args:
+        path (str): The snapshot file.
+
+    Raises:
+        ValueError: If the checksum is missing or does not match.
+    """
+    recorded = _recorded_checksum(path)
+    if recorded is None:
+        raise ValueError(f"No checksum recorded for {path}")
+    if _sha256(path) != recorded:
+        raise ValueError(f"Checksum mismatch for {path}; the snapshot is damaged")
+
+
+def restore_snapshot(path, db_file, pages=BACKUP_PAGES, sleep=0):
+    """
+    Replaces a database (or creates one, e.g. a read-only analytics replica) with the
+    contents of a verified snapshot.
+
+    The pages are written with the backup API, which holds the target's write lock
+    until the copy is complete, so other connections never see a half-restored
+    database. Processes holding the target open keep in-memory state (search indexes)
+    built from the old data and should be restarted.
+
+    Args:
+        path (str): The snapshot file.
+        db_file (str): The database file to restore into.
+        pages (int, optional): Pages copied per step. Defaults to BACKUP_PAGES.
+        sleep (float, optional): Seconds between steps; the target stays locked meanwhile. Defaults to 0.
+    """
+    verify_snapshot(path)
+    source = path
+    if path.endswith('.gz'):
+        source = os.path.join(os.path.dirname(os.path.abspath(db_file)),
+                              f".{os.path.basename(db_file)}.restoring")
+        with gzip.open(path, 'rb') as compressed, open(source, 'wb') as target:
+            shutil.copyfileobj(compressed, target, 1 << 20)
+    try:
+        _copy_database(source, db_file, pages, sleep)
+    finally:
+        if source != path:
+            os.remove(source)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 
 
 class DataManagerInterface(ABC):
@@ -6,6 +7,17 @@ class DataManagerInterface(ABC):
     Abstract base class defining the interface for data management operations.
     """
 
+    def unit_of_work(self):
+        """
+        Groups the writes of several calls into one transaction.
+
+        Backends without transactions can keep this default, which does nothing.
+
+        Returns:
+            ContextManager: A context manager that commits on exit.
+        """
+        return nullcontext(self)
+
     @abstractmethod
     def get_all_users(self):
         """
@@ -3,13 +3,88 @@ This module defines the database models for the MovieWeb application.
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
 from datetime import datetime, UTC
 
 db = SQLAlchemy()
 
+# Bump whenever the models change so existing databases get their DDL applied again.
+SCHEMA_VERSION = 10
+
+
+def ensure_schema(connection):
+    """
+    Creates the tables unless the database already records the current schema version.
+
+    The version is kept in SQLite's ``PRAGMA user_version``, so a started-up database
+    costs a single pragma read instead of a table-by-table DDL check.
+
+    Args:
+        connection (Connection): A SQLAlchemy connection inside a transaction.
+
+    Returns:
+        bool: True if the schema DDL was run, False if it was already up to date.
+    """
+    if connection.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION:
+        return False
+    db.metadata.create_all(connection)
+    # create_all skips existing tables entirely, so add columns, foreign key actions
+    # and indexes declared since then
+    for table in db.metadata.sorted_tables:
+        if _foreign_keys_changed(connection, table):
+            _rebuild_table(connection, table)
+        existing = {row[1] for row in connection.execute(text(f'PRAGMA table_info("{table.name}")'))}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    connection.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+    return True
+
+
+def _foreign_keys_changed(connection, table):
+    """
+    Tells whether a table's stored ON DELETE actions differ from the model's.
+    """
+    stored = {(row[3], (row[6] or 'NO ACTION').upper())
+              for row in connection.execute(text(f'PRAGMA foreign_key_list("{table.name}")'))}
+    declared = {(key.parent.name, (key.ondelete or 'NO ACTION').upper()) for key in table.foreign_keys}
+    return stored != declared
+
+
+def _rebuild_table(connection, table):
+    """
+    Recreates a table from the model, since SQLite cannot alter foreign keys in place.
+
+    Rows whose parents no longer exist are dropped on the way, as the new
+    constraints would reject them.
+    """
+    new_name = f"{table.name}__new"
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    quoted_name = connection.dialect.identifier_preparer.format_table(table)
+    connection.execute(text(ddl.replace(f'CREATE TABLE {quoted_name} ', f'CREATE TABLE "{new_name}" ', 1)))
+    stored = {row[1] for row in connection.execute(text(f'PRAGMA table_info("{table.name}")'))}
+    columns = ', '.join(f'"{column.name}"' for column in table.columns if column.name in stored)
+    parents = ' AND '.join(
+        f'("{key.parent.name}" IS NULL OR "{key.parent.name}" IN '
+        f'(SELECT "{key.column.name}" FROM "{key.column.table.name}"))'
+        for key in table.foreign_keys
+    ) or '1'
+    connection.execute(text(f'INSERT INTO "{new_name}" ({columns}) SELECT {columns} FROM "{table.name}" WHERE {parents}'))
+    connection.execute(text(f'DROP TABLE "{table.name}"'))
+    connection.execute(text(f'ALTER TABLE "{new_name}" RENAME TO "{table.name}"'))
+
+
+# Child rows are removed by the database (ON DELETE CASCADE, with PRAGMA foreign_keys=ON),
+# so deleting movies, users or genres is one statement however many rows depend on them.
 movie_genre = db.Table('movie_genre',
-    db.Column('movie_id', db.Integer, db.ForeignKey('movie.id'), primary_key=True),
-    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True)
+    db.Column('movie_id', db.Integer, db.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id', ondelete='CASCADE'), primary_key=True),
+    # Genre filters and facet counts look up movies by genre (the primary key is movie-first)
+    db.Index('ix_movie_genre_genre_movie', 'genre_id', 'movie_id')
 )
 
 class User(db.Model):
@@ -18,8 +93,9 @@ class User(db.Model):
     """
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
-    favorite_movies = db.relationship('Movie', secondary='user_movie', backref=db.backref('users', lazy=True))
-    reviews = db.relationship('Review', backref='user', lazy=True)
+    favorite_movies = db.relationship('Movie', secondary='user_movie', passive_deletes=True,
+                                      backref=db.backref('users', lazy=True, passive_deletes=True))
+    reviews = db.relationship('Review', backref='user', lazy=True, passive_deletes=True)
 
 class Movie(db.Model):
     """
@@ -31,18 +107,33 @@ class Movie(db.Model):
     year = db.Column(db.Integer, nullable=True)
     rating = db.Column(db.Float, nullable=True)
     poster = db.Column(db.String(255), nullable=True)
-    genres = db.relationship('Genre', secondary=movie_genre, backref=db.backref('movies', lazy=True))
-    reviews = db.relationship('Review', backref='movie', lazy=True)
+    # OMDb's imdbID ("tt0133093"); identifies the film, so each is stored once
+    imdb_id = db.Column(db.String(20), nullable=True)
+    genres = db.relationship('Genre', secondary=movie_genre, passive_deletes=True,
+                             backref=db.backref('movies', lazy=True, passive_deletes=True))
+    reviews = db.relationship('Review', backref='movie', lazy=True, passive_deletes=True)
+
+    # Supporting indexes for the faceted /movies filters and sort orders
+    __table_args__ = (
+        db.Index('ix_movie_year_rating', 'year', 'rating'),
+        db.Index('ix_movie_rating', 'rating'),
+        db.Index('ix_movie_imdb_id', 'imdb_id', unique=True),
+    )
 
 class UserMovie(db.Model):
     """
     Represents the association between a user and their favorite movies.
     """
     __tablename__ = 'user_movie'
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
-    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
     date_added = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
 
+    # Activity timeline: a user's favorites, newest first
+    __table_args__ = (
+        db.Index('ix_user_movie_user_date', 'user_id', 'date_added', 'movie_id'),
+    )
+
 class Genre(db.Model):
     """
     Represents a movie genre.
@@ -57,6 +148,111 @@ class Review(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
     rating = db.Column(db.Float, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id'), nullable=False)
-    date_posted = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
\ No newline at end of file
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id', ondelete='CASCADE'), nullable=False)
+    date_posted = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+
+    # Covering index for per-movie community ratings (AVG(rating) GROUP BY movie_id),
+    # and a user's reviews newest first for the activity timeline
+    __table_args__ = (
+        db.Index('ix_review_movie_rating', 'movie_id', 'rating'),
+        db.Index('ix_review_user_date', 'user_id', 'date_posted', 'id'),
+    )
+
+class Recommendation(db.Model):
+    """
+    Represents the precomputed movie recommendations for a user.
+    """
+    __tablename__ = 'recommendation'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    content = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+    @property
+    def items(self):
+        """
+        The recommendations as a list, one suggestion per entry.
+        """
+        return self.content.split('\n')
+
+class UserStats(db.Model):
+    """
+    Represents the cached totals of a user's taste profile.
+
+    A row exists once the profile has been built; the write methods then keep it
+    (and the user's UserTaste counters) up to date incrementally.
+    """
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    favorite_count = db.Column(db.Integer, nullable=False, default=0)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+class UserTaste(db.Model):
+    """
+    Represents how many of a user's favorites share a genre, director or decade.
+    """
+    __tablename__ = 'user_taste'
+    user_id = db.Column(db.Integer, db.ForeignKey('user_stats.user_id', ondelete='CASCADE'), primary_key=True)
+    dimension = db.Column(db.String(10), primary_key=True)  # 'genre', 'director' or 'decade'
+    value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class MovieSimilarity(db.Model):
+    """
+    Represents a precomputed content-based neighbour of a movie (see similarity.py).
+    """
+    __tablename__ = 'movie_similarity'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)
+    __table_args__ = (
+        db.Index('ix_movie_similarity_neighbor', 'neighbor_id'),
+    )
+
+class MovieTrend(db.Model):
+    """
+    Represents a movie's time-decayed trending counter (see trending.py).
+    """
+    __tablename__ = 'movie_trend'
+    movie_id = db.Column(db.Integer, db.ForeignKey('movie.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False, default=0.0)
+    __table_args__ = (
+        db.Index('ix_movie_trend_score', 'score'),
+    )
+
+class TrendLandmark(db.Model):
+    """
+    Represents the landmark time (hours since the epoch) the trending counters are relative to.
+    """
+    __tablename__ = 'trend_landmark'
+    id = db.Column(db.Integer, primary_key=True)
+    hours = db.Column(db.Float, nullable=False)
+
+class IdBlock(db.Model):
+    """
+    Represents the next unreserved ID of a table whose IDs are handed out in blocks,
+    so rows written to different shard files still get unique IDs.
+    """
+    __tablename__ = 'id_block'
+    name = db.Column(db.String(20), primary_key=True)
+    next_id = db.Column(db.Integer, nullable=False)
+
+class RecommendationRun(db.Model):
+    """
+    Represents one run of the recommendation batch job and its outcome.
+    """
+    __tablename__ = 'recommendation_run'
+    id = db.Column(db.Integer, primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=False)
+    succeeded = db.Column(db.Integer, nullable=False, default=0)
+    failed = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def users_per_second(self):
+        """
+        Throughput of the run in processed users per second.
+        """
+        seconds = (self.finished_at - self.started_at).total_seconds()
+        return (self.succeeded + self.failed) / seconds if seconds > 0 else 0.0
@@ -0,0 +1,54 @@
+"""
+This module defines the favorite rows recommendation prompts are built from, and the
+queries that load them, shared by the SQLite data manager backends.
+"""
+
+from collections import namedtuple
+from sqlalchemy import select, func
+from datamanager.data_models import Movie, UserMovie, Genre, Review, movie_genre
+
+# A favorite with what the prompt ranks it by: when it was added, its OMDb rating and
+# the user's own review rating, and its genre names for variety
+FavoriteRow = namedtuple('FavoriteRow', ['id', 'name', 'year', 'rating', 'genres', 'date_added', 'user_rating'])
+
+
+def favorites_statement(user_id):
+    """
+    SELECT of a user's favorites (id, name, year, rating, date_added, user_rating), most recently added first.
+    """
+    user_rating = (select(func.max(Review.rating))
+                   .where(Review.user_id == user_id, Review.movie_id == Movie.id)
+                   .scalar_subquery())
+    return (select(Movie.id, Movie.name, Movie.year, Movie.rating, UserMovie.date_added, user_rating)
+            .join(UserMovie, UserMovie.movie_id == Movie.id)
+            .where(UserMovie.user_id == user_id)
+            .order_by(UserMovie.date_added.desc(), Movie.id.desc()))
+
+
+def favorite_genres_statement(user_id):
+    """
+    SELECT of (movie_id, genre name) for all of a user's favorites.
+    """
+    return (select(movie_genre.c.movie_id, Genre.name)
+            .join(Genre, Genre.id == movie_genre.c.genre_id)
+            .join(UserMovie, UserMovie.movie_id == movie_genre.c.movie_id)
+            .where(UserMovie.user_id == user_id)
+            .order_by(movie_genre.c.movie_id, Genre.name))
+
+
+def favorite_rows(favorites, genre_links):
+    """
+    Combines the results of the two statements into FavoriteRow tuples.
+
+    Args:
+        favorites (iterable): Rows of favorites_statement.
+        genre_links (iterable): Rows of favorite_genres_statement.
+
+    Returns:
+        list: FavoriteRow tuples in the order of the favorites.
+    """
+    genres = {}
+    for movie_id, name in genre_links:
+        genres.setdefault(movie_id, []).append(name)
+    return [FavoriteRow(movie_id, name, year, rating, tuple(genres.get(movie_id, ())), date_added, user_rating)
+            for movie_id, name, year, rating, date_added, user_rating in favorites]
@@ -0,0 +1,161 @@
+"""
+This module implements a group-commit writer: small writes queued by concurrent
+requests are applied by one thread and committed together in a single transaction.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# Queue marker telling the writer thread to finish the current batch and exit
+_STOP = object()
+
+
+class GroupCommitWriter:
+    """
+    Batches data manager writes from many threads into shared transactions.
+
+    A batch takes every write queued while the previous batch was committing, up
+    to max_batch; with max_delay > 0 it also stays open that long for more writes,
+    which pays off when each commit costs an fsync (synchronous=FULL). The batch runs
+    inside one unit of work, so N writes cost one commit instead of N. Callers
+    wait on a Future that resolves once their write is committed. If a batch fails,
+    its writes are retried one by one so a single bad write only fails its caller.
+
+    Results are detached from the writer's session: their column attributes can be
+    read from any thread, but relationships are not loaded.
+    """
+
+    def __init__(self, data_manager, max_batch=100, max_delay=0.0):
+        """
+        Initialize the writer; call start() to launch its thread.
+
+        Args:
+            data_manager (DataManagerInterface): The data manager that applies the writes.
+            max_batch (int, optional): The maximum number of writes per transaction. Defaults to 100.
+            max_delay (float, optional): Seconds a batch waits for more writes. Defaults to 0.
+        """
+        self.data_manager = data_manager
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stopped = False
+
+    def start(self):
+        """
+        Launch the writer thread.
+
+        Returns:
+            GroupCommitWriter: self, for chaining.
+        """
+        self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Apply the writes queued so far and stop the writer thread.
+
+        Args:
+            timeout (float, optional): Seconds to wait for the thread to finish.
+        """
+        self._stopped = True
+        self._queue.put(_STOP)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, method_name, *args, **kwargs):
+        """
+        Queue a call of a data manager write method.
+
+        Args:
+            method_name (str): The data manager method, e.g. "add_review".
+            *args: Positional arguments for the method.
+            **kwargs: Keyword arguments for the method.
+
+        Returns:
+            Future: Resolves to the method's result once the write is committed.
+
+        Raises:
+            RuntimeError: If the writer has been stopped.
+        """
+        if self._stopped:
+            raise RuntimeError("Group commit writer is stopped")
+        future = Future()
+        self._queue.put((future, method_name, args, kwargs))
+        return future
+
+    def _run(self):
+        """
+        Collect batches from the queue and write them until stopped.
+        """
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _call(self, method_name, args, kwargs):
+        """
+        Run one queued write on the writer thread.
+        """
+        return getattr(self.data_manager, method_name)(*args, **kwargs)
+
+    def _unit_of_work(self):
+        """
+        Open a unit of work whose results stay readable after its commit.
+        """
+        session = getattr(self.data_manager, 'session', None)
+        if session is not None:
+            session().expire_on_commit = False
+        return self.data_manager.unit_of_work()
+
+    def _detach(self):
+        """
+        Detach committed results from the writer's session, so a later rollback cannot
+        expire them and other threads can read them.
+        """
+        session = getattr(self.data_manager, 'session', None)
+        if session is not None:
+            session().expunge_all()
+
+    def _write(self, batch):
+        """
+        Apply a batch in one unit of work and resolve its futures.
+        """
+        outcomes = []  # (future, result, exception)
+        try:
+            with self._unit_of_work():
+                results = [self._call(method_name, args, kwargs) for _, method_name, args, kwargs in batch]
+            self._detach()
+            outcomes = [(future, result, None) for (future, *_), result in zip(batch, results)]
+        except Exception:
+            # The whole batch was rolled back; retry each write on its own
+            for future, method_name, args, kwargs in batch:
+                try:
+                    with self._unit_of_work():
+                        result = self._call(method_name, args, kwargs)
+                    self._detach()
+                except Exception as e:
+                    outcomes.append((future, None, e))
+                else:
+                    outcomes.append((future, result, None))
+        for future, result, exception in outcomes:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
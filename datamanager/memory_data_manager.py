@@ -0,0 +1,978 @@
+"""
+This module implements a pure in-memory data manager for the MovieWeb application.
+
+It keeps the same model classes as the SQL backends (as transient, never-flushed
+objects) in dictionaries indexed by id, by user and by genre, so tests and
+benchmarks can run the whole app without touching a database file.
+"""
+
+import heapq
+from collections import Counter
+from datetime import datetime, UTC
+from itertools import count
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.prefix_index import PrefixIndex
+from datamanager.search_indexes import MovieSearchIndexes
+from datamanager.data_models import User, Movie, UserMovie, Genre, Review, Recommendation, RecommendationRun
+from datamanager.movie_filters import MovieFilters, FacetCount, facet_label, is_number
+from datamanager.movie_dedup import find_duplicates
+from datamanager.timeline import ActivityEvent, decode_cursor, merge_timeline, order_key
+from datamanager.taste_profile import build_profile, taste_keys
+from datamanager.movie_rows import movie_row
+from datamanager.favorite_rows import FavoriteRow
+from datamanager.similarity import MovieFeatures
+from datamanager.trending import FAVORITE_WEIGHT, REVIEW_WEIGHT, decayed_scores
+
+
+def _project(movies, rows):
+    """
+    Returns the movies as MovieRow tuples if rows is set, else unchanged.
+    """
+    return [movie_row(movie) for movie in movies] if rows else list(movies)
+
+
+def _rating_key(movie):
+    """
+    Sort key for movie ratings; missing or non-numeric ratings sort last.
+    """
+    try:
+        return float(movie.rating)
+    except (TypeError, ValueError):
+        return float('-inf')
+
+
+class InMemoryDataManager(DataManagerInterface, MovieSearchIndexes):
+    """
+    In-memory implementation of the data manager interface.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initialize empty tables and indexes. Arguments are accepted and ignored so the
+        backend can be swapped in wherever a database file name is passed.
+        """
+        self.users = {}
+        self.movies = {}
+        self.genres = {}
+        self.reviews = {}
+        self.genres_by_name = {}
+        self.movies_by_imdb_id = {}
+        self.favorites_by_user = {}   # user_id -> {movie_id: UserMovie}
+        self.favorites_by_movie = {}  # movie_id -> {user_id: None}
+        self.reviews_by_user = {}     # user_id -> {review_id: None}
+        self.reviews_by_movie = {}    # movie_id -> {review_id: None}
+        self.recommendations = {}     # user_id -> Recommendation
+        self.recommendation_runs = []
+        self.title_index = PrefixIndex()
+        self._ids = {'user': count(1), 'movie': count(1), 'genre': count(1), 'review': count(1)}
+
+    # CRUD operations for User
+    def get_all_users(self):
+        """
+        Retrieve all users.
+
+        Returns:
+            list: A list of all User objects.
+        """
+        return list(self.users.values())
+
+    def add_user(self, name):
+        """
+        Add a new user.
+
+        Args:
+            name (str): The name of the user.
+
+        Returns:
+            User: The newly created User object.
+        """
+        user = User(id=next(self._ids['user']), name=name)
+        self.users[user.id] = user
+        return user
+
+    def get_user_by_id(self, user_id):
+        """
+        Retrieve a user by their ID.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User: The User object if found, None otherwise.
+        """
+        return self.users.get(user_id)
+
+    def delete_users(self, user_ids):
+        """
+        Delete many users together with their favorites, reviews and recommendations.
+
+        Args:
+            user_ids (iterable): The IDs of the users to delete.
+
+        Returns:
+            int: The number of users deleted.
+        """
+        deleted = 0
+        for user_id in set(user_ids):
+            if self.users.pop(user_id, None) is None:
+                continue
+            for movie_id in self.favorites_by_user.pop(user_id, {}):
+                self.favorites_by_movie[movie_id].pop(user_id, None)
+                self.title_index.add_popularity(movie_id, -1)
+            for review_id in self.reviews_by_user.pop(user_id, {}):
+                review = self.reviews.pop(review_id)
+                self.reviews_by_movie[review.movie_id].pop(review_id, None)
+            self.recommendations.pop(user_id, None)
+            deleted += 1
+        return deleted
+
+    # CRUD operations for Movie
+    def get_all_movies(self):
+        """
+        Retrieve all movies.
+
+        Returns:
+            list: A list of all Movie objects.
+        """
+        return list(self.movies.values())
+
+    def add_movie(self, name, director=None, year=None, rating=None, poster=None, genres=(), imdb_id=None):
+        """
+        Add a new movie, or return the stored one with the same imdbID.
+
+        Args:
+            name (str): The name of the movie.
+            director (str, optional): The director of the movie.
+            year (int, optional): The release year of the movie.
+            rating (float, optional): The rating of the movie.
+            poster (str, optional): The URL of the movie poster.
+            genres (list, optional): A list of Genre objects for the movie.
+            imdb_id (str, optional): OMDb's imdbID of the movie.
+
+        Returns:
+            Movie: The newly created Movie object, or the existing one for imdb_id.
+        """
+        if imdb_id in self.movies_by_imdb_id:
+            return self.movies_by_imdb_id[imdb_id]
+        movie = Movie(id=next(self._ids['movie']), name=name, director=director,
+                      year=year, rating=rating, poster=poster, imdb_id=imdb_id)
+        self.movies[movie.id] = movie
+        if imdb_id:
+            self.movies_by_imdb_id[imdb_id] = movie
+        for genre in genres:
+            movie.genres.append(genre)
+        self._index_movie(movie)
+        return movie
+
+    def get_movie_by_id(self, movie_id):
+        """
+        Retrieve a movie by its ID.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            Movie: The Movie object if found, None otherwise.
+        """
+        return self.movies.get(movie_id)
+
+    def get_movie_by_imdb_id(self, imdb_id):
+        """
+        Retrieve a movie by its imdbID.
+
+        Args:
+            imdb_id (str): OMDb's imdbID of the movie.
+
+        Returns:
+            Movie: The Movie object if found, None otherwise.
+        """
+        return self.movies_by_imdb_id.get(imdb_id)
+
+    def get_movies_by_names(self, names):
+        """
+        Retrieve the movies with any of the given names, ignoring case.
+
+        Args:
+            names (iterable): The movie names to look up.
+
+        Returns:
+            list: A list of matching Movie objects (several per name for remakes).
+        """
+        names = {name.lower() for name in names}
+        return [movie for movie in self.movies.values() if movie.name.lower() in names]
+
+    def update_movie(self, movie_id, **kwargs):
+        """
+        Update a movie's details.
+
+        Args:
+            movie_id (int): The ID of the movie to update.
+            **kwargs: Arbitrary keyword arguments representing the movie attributes to update.
+
+        Returns:
+            Movie: The updated Movie object if found, None otherwise.
+        """
+        movie = self.movies.get(movie_id)
+        if not movie:
+            return None
+        if kwargs.get('imdb_id', movie.imdb_id) != movie.imdb_id:
+            self.movies_by_imdb_id.pop(movie.imdb_id, None)
+            if kwargs['imdb_id']:
+                self.movies_by_imdb_id[kwargs['imdb_id']] = movie
+        for key, value in kwargs.items():
+            if key != 'id' and hasattr(movie, key):
+                setattr(movie, key, value)
+        self._index_movie(movie)
+        return movie
+
+    def delete_movie(self, movie_id):
+        """
+        Delete a movie together with its favorites, reviews and genre links.
+
+        Args:
+            movie_id (int): The ID of the movie to delete.
+
+        Returns:
+            bool: True if the movie was successfully deleted, False otherwise.
+        """
+        movie = self.movies.pop(movie_id, None)
+        if not movie:
+            return False
+        self.movies_by_imdb_id.pop(movie.imdb_id, None)
+        for user_id in self.favorites_by_movie.pop(movie_id, {}):
+            self.favorites_by_user[user_id].pop(movie_id, None)
+        for review_id in self.reviews_by_movie.pop(movie_id, {}):
+            review = self.reviews.pop(review_id)
+            self.reviews_by_user[review.user_id].pop(review_id, None)
+        movie.genres.clear()
+        self._unindex_movie(movie_id)
+        return True
+
+    def delete_movies(self, movie_ids):
+        """
+        Delete many movies together with their favorites, reviews and genre links.
+
+        Args:
+            movie_ids (iterable): The IDs of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        return sum(self.delete_movie(movie_id) for movie_id in set(movie_ids))
+
+    def delete_movies_matching(self, filters):
+        """
+        Delete all movies matching the /movies filters, with their dependent data.
+
+        Args:
+            filters (MovieFilters): Genre, year, OMDb rating and community rating filters.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        predicates = self._filter_predicates(filters).values()
+        if not predicates:
+            raise ValueError("Refusing to delete movies without a filter")
+        return self.delete_movies([movie.id for movie in self.movies.values()
+                                   if all(match(movie) for match in predicates)])
+
+    def merge_duplicate_movies(self):
+        """
+        Collapse duplicate movies into one canonical movie per film.
+
+        Duplicates share an imdbID, or a normalized name and year (see movie_dedup).
+        Favorites, genres and reviews of the copies move to the canonical movie.
+
+        Returns:
+            int: The number of duplicate movies removed.
+        """
+        duplicates = find_duplicates((movie.id, movie.name, movie.year, movie.imdb_id)
+                                     for movie in self.movies.values())
+        for duplicate_id, canonical_id in duplicates.items():
+            duplicate, canonical = self.movies[duplicate_id], self.movies[canonical_id]
+            for user_id in self.favorites_by_movie.pop(duplicate_id, {}):
+                favorites = self.favorites_by_user[user_id]
+                moved = favorites.pop(duplicate_id)
+                if canonical_id not in favorites:
+                    moved.movie_id = canonical_id
+                    favorites[canonical_id] = moved
+                    self.favorites_by_movie.setdefault(canonical_id, {})[user_id] = None
+            for review_id in self.reviews_by_movie.pop(duplicate_id, {}):
+                self.reviews[review_id].movie_id = canonical_id
+                self.reviews_by_movie.setdefault(canonical_id, {})[review_id] = None
+            for genre in list(duplicate.genres):
+                if genre not in canonical.genres:
+                    canonical.genres.append(genre)
+            duplicate.genres.clear()
+            del self.movies[duplicate_id]
+            self._unindex_movie(duplicate_id)
+        for canonical_id in set(duplicates.values()):
+            self.title_index.add(self.movies[canonical_id],
+                                 popularity=len(self.favorites_by_movie.get(canonical_id, {})))
+        return len(duplicates)
+
+    # CRUD operations for UserMovie (relationship table)
+    def add_favorite_movie(self, user_id, movie_id):
+        """
+        Add a movie to a user's favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie to add as a favorite.
+
+        Returns:
+            UserMovie: The UserMovie object representing the favorite relationship.
+        """
+        favorites = self.favorites_by_user.setdefault(user_id, {})
+        if movie_id not in favorites:
+            favorites[movie_id] = UserMovie(user_id=user_id, movie_id=movie_id,
+                                            date_added=datetime.now(UTC))
+            self.favorites_by_movie.setdefault(movie_id, {})[user_id] = None
+            self.title_index.add_popularity(movie_id, 1)
+        return favorites[movie_id]
+
+    def get_favorite_movies_by_user(self, user_id, rows=False):
+        """
+        Retrieve all favorite movies for a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects that are favorites of the specified user.
+        """
+        return _project((self.movies[movie_id] for movie_id in self.favorites_by_user.get(user_id, {})), rows)
+
+    def get_user_favorite_movies(self, user_id):
+        """
+        Alias of get_favorite_movies_by_user required by DataManagerInterface.
+        """
+        return self.get_favorite_movies_by_user(user_id)
+
+    def get_favorite_details(self, user_id):
+        """
+        Retrieve a user's favorites with when they were added, the user's own rating
+        and their genres, for building recommendation prompts.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: FavoriteRow tuples, most recently added first.
+        """
+        user_ratings = {}
+        for review_id in self.reviews_by_user.get(user_id, {}):
+            review = self.reviews[review_id]
+            user_ratings[review.movie_id] = max(review.rating, user_ratings.get(review.movie_id, review.rating))
+        favorites = sorted(self.favorites_by_user.get(user_id, {}).values(),
+                           key=lambda favorite: (favorite.date_added, favorite.movie_id), reverse=True)
+        rows = []
+        for favorite in favorites:
+            movie = self.movies[favorite.movie_id]
+            rows.append(FavoriteRow(movie.id, movie.name, movie.year, movie.rating,
+                                    tuple(sorted(genre.name for genre in movie.genres)),
+                                    favorite.date_added, user_ratings.get(movie.id)))
+        return rows
+
+    def get_users_by_favorite_movie(self, movie_id):
+        """
+        Retrieve all users who have favorited a specific movie.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            list: A list of User objects who have favorited the specified movie.
+        """
+        return [self.users[user_id] for user_id in self.favorites_by_movie.get(movie_id, {})]
+
+    def remove_favorite_movie(self, user_id, movie_id):
+        """
+        Remove a movie from a user's favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie to remove from favorites.
+        """
+        if self.favorites_by_user.get(user_id, {}).pop(movie_id, None):
+            self.favorites_by_movie[movie_id].pop(user_id, None)
+            self.title_index.add_popularity(movie_id, -1)
+
+    # Taste profile
+    def get_user_stats(self, user_id):
+        """
+        Retrieve a user's taste profile: top genres and directors of their favorites,
+        favorites per decade, and their review count and average rating.
+
+        Computed on each call; the indexes make that as cheap as a cache lookup.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            TasteProfile: The profile, or None if the user does not exist.
+        """
+        if user_id not in self.users:
+            return None
+        counts = Counter()
+        favorites = self.favorites_by_user.get(user_id, {})
+        for movie_id in favorites:
+            movie = self.movies[movie_id]
+            counts.update(taste_keys((genre.id for genre in movie.genres), movie.director, movie.year))
+        ratings = [self.reviews[review_id].rating for review_id in self.reviews_by_user.get(user_id, {})]
+        genre_names = {genre.id: genre.name for genre in self.genres.values()}
+        return build_profile(len(favorites), len(ratings), sum(ratings),
+                             [(dimension, value, count) for (dimension, value), count in counts.items()],
+                             genre_names)
+
+    # Activity timeline
+    def get_user_timeline(self, user_id, limit=20, cursor=None):
+        """
+        Retrieve one page of a user's favorites and reviews, newest first.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The page size. Defaults to 20.
+            cursor (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            tuple: (list of ActivityEvent, cursor for the next page or None).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        favorites = [
+            ActivityEvent('favorite', favorite.date_added, movie_id, movie_id, self.movies[movie_id].name, None, None)
+            for movie_id, favorite in self.favorites_by_user.get(user_id, {}).items()
+        ]
+        reviews = [
+            ActivityEvent('review', review.date_posted, review.id, review.movie_id,
+                          self.movies[review.movie_id].name, review.rating, review.text)
+            for review in (self.reviews[review_id] for review_id in self.reviews_by_user.get(user_id, {}))
+        ]
+        streams = []
+        for events in (favorites, reviews):
+            events = [event for event in events if position is None or order_key(event) < position]
+            streams.append(heapq.nlargest(limit + 1, events, key=order_key))
+        return merge_timeline(streams, limit)
+
+    # CRUD operations for Genre
+    def get_all_genres(self):
+        """
+        Retrieve all genres.
+
+        Returns:
+            list: A list of all Genre objects.
+        """
+        return list(self.genres.values())
+
+    def add_genre(self, name):
+        """
+        Add a new genre.
+
+        Args:
+            name (str): The name of the genre.
+
+        Returns:
+            Genre: The newly created Genre object.
+
+        Raises:
+            ValueError: If a genre with this name already exists (the name is unique).
+        """
+        if name in self.genres_by_name:
+            raise ValueError(f"Genre '{name}' already exists")
+        genre = Genre(id=next(self._ids['genre']), name=name)
+        self.genres[genre.id] = genre
+        self.genres_by_name[name] = genre
+        return genre
+
+    def get_genre_by_id(self, genre_id):
+        """
+        Retrieve a genre by its ID.
+
+        Args:
+            genre_id (int): The ID of the genre.
+
+        Returns:
+            Genre: The Genre object if found, None otherwise.
+        """
+        return self.genres.get(genre_id)
+
+    def get_genre_by_name(self, genre_name):
+        """
+        Retrieve a genre by its name.
+
+        Args:
+            genre_name (str): The name of the genre.
+
+        Returns:
+            Genre: The Genre object if found, None otherwise.
+        """
+        return self.genres_by_name.get(genre_name)
+
+    def update_genre(self, genre_id, new_name):
+        """
+        Update a genre's name.
+
+        Args:
+            genre_id (int): The ID of the genre to update.
+            new_name (str): The new name for the genre.
+
+        Returns:
+            Genre: The updated Genre object if found, None otherwise.
+        """
+        genre = self.genres.get(genre_id)
+        if genre:
+            del self.genres_by_name[genre.name]
+            genre.name = new_name
+            self.genres_by_name[new_name] = genre
+        return genre
+
+    def delete_genre(self, genre_id):
+        """
+        Delete a genre and its movie associations.
+
+        Args:
+            genre_id (int): The ID of the genre to delete.
+        """
+        genre = self.genres.pop(genre_id, None)
+        if genre:
+            del self.genres_by_name[genre.name]
+            genre.movies.clear()
+
+    def get_movies_by_genre(self, genre_id, rows=False):
+        """
+        Retrieve all movies of a genre.
+
+        Args:
+            genre_id (int): The ID of the genre.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects in the genre.
+        """
+        genre = self.genres.get(genre_id)
+        return _project(genre.movies if genre else [], rows)
+
+    # CRUD operations for Review
+    def add_review(self, text, rating, user_id, movie_id):
+        """
+        Add a new review.
+
+        Args:
+            text (str): The text content of the review.
+            rating (float): The rating given in the review.
+            user_id (int): The ID of the user who wrote the review.
+            movie_id (int): The ID of the movie being reviewed.
+
+        Returns:
+            Review: The newly created Review object.
+        """
+        # Form values arrive as strings; SQLite's REAL column converts them, so do the same here
+        review = Review(id=next(self._ids['review']), text=text, rating=float(rating),
+                        user_id=user_id, movie_id=movie_id, date_posted=datetime.now(UTC))
+        review.user = self.users.get(user_id)
+        self.reviews[review.id] = review
+        self.reviews_by_user.setdefault(user_id, {})[review.id] = None
+        self.reviews_by_movie.setdefault(movie_id, {})[review.id] = None
+        return review
+
+    def get_reviews_by_movie(self, movie_id):
+        """
+        Retrieve all reviews for a specific movie.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            list: A list of Review objects for the specified movie.
+        """
+        return [self.reviews[review_id] for review_id in self.reviews_by_movie.get(movie_id, {})]
+
+    def get_reviews_by_user(self, user_id):
+        """
+        Retrieve all reviews by a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: A list of Review objects by the specified user.
+        """
+        return [self.reviews[review_id] for review_id in self.reviews_by_user.get(user_id, {})]
+
+    def update_review(self, review_id, new_text=None, new_rating=None):
+        """
+        Update a review's content or rating.
+
+        Args:
+            review_id (int): The ID of the review to update.
+            new_text (str, optional): The new text content for the review.
+            new_rating (float, optional): The new rating for the review.
+
+        Returns:
+            Review: The updated Review object if found, None otherwise.
+        """
+        review = self.reviews.get(review_id)
+        if review:
+            if new_text:
+                review.text = new_text
+            if new_rating:
+                review.rating = float(new_rating)
+        return review
+
+    def delete_review(self, review_id):
+        """
+        Delete a review.
+
+        Args:
+            review_id (int): The ID of the review to delete.
+        """
+        review = self.reviews.pop(review_id, None)
+        if review:
+            self.reviews_by_user[review.user_id].pop(review_id, None)
+            self.reviews_by_movie[review.movie_id].pop(review_id, None)
+
+    def add_movie_to_genre(self, movie_id, genre_id):
+        """
+        Associate a movie with a genre.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            genre_id (int): The ID of the genre.
+        """
+        movie = self.movies.get(movie_id)
+        genre = self.genres.get(genre_id)
+        if movie and genre and genre not in movie.genres:
+            movie.genres.append(genre)
+
+    def remove_movie_from_genre(self, movie_id, genre_id):
+        """
+        Remove the association between a movie and a genre.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            genre_id (int): The ID of the genre.
+        """
+        movie = self.movies.get(movie_id)
+        genre = self.genres.get(genre_id)
+        if movie and genre in movie.genres:
+            movie.genres.remove(genre)
+
+    def search_movies(self, query, rows=False):
+        """
+        Search for movies whose name or director contains the query (case-insensitive).
+
+        Args:
+            query (str): The search query.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects that match the search query.
+        """
+        needle = query.lower()
+        return _project((
+            movie for movie in self.movies.values()
+            if needle in (movie.name or '').lower() or needle in (movie.director or '').lower()
+        ), rows)
+
+    def _fuzzy_index_rows(self):
+        """
+        Return (id, name, director) rows for building the trigram index.
+        """
+        return [(movie.id, movie.name, movie.director) for movie in self.movies.values()]
+
+    def fuzzy_search_movies(self, query, limit=20, rows=False):
+        """
+        Search for movies by name or director, tolerating typos ("Incepton", "Nolen").
+
+        Args:
+            query (str): The search query.
+            limit (int, optional): The maximum number of results. Defaults to 20.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: Matching Movie objects, best match first.
+        """
+        return _project((self.movies[movie_id] for movie_id, _ in self.fuzzy_index.search(query, limit=limit)), rows)
+
+    # Faceted movie listing
+    def _community_rating(self, movie_id):
+        """
+        Return the average review rating of a movie, or None without reviews.
+        """
+        ratings = [self.reviews[review_id].rating for review_id in self.reviews_by_movie.get(movie_id, ())]
+        return sum(ratings) / len(ratings) if ratings else None
+
+    def _filter_predicates(self, filters):
+        """
+        Translate MovieFilters into movie predicates keyed by facet.
+        """
+        predicates = {}
+        if filters.genre_ids:
+            genre_ids = set(filters.genre_ids)
+            predicates['genre'] = lambda movie: any(genre.id in genre_ids for genre in movie.genres)
+        if filters.year_min is not None or filters.year_max is not None:
+            low = filters.year_min if filters.year_min is not None else float('-inf')
+            high = filters.year_max if filters.year_max is not None else float('inf')
+            predicates['decade'] = lambda movie, low=low, high=high: is_number(movie.year) and low <= movie.year <= high
+        if filters.rating_min is not None or filters.rating_max is not None:
+            low = filters.rating_min if filters.rating_min is not None else float('-inf')
+            high = filters.rating_max if filters.rating_max is not None else float('inf')
+            predicates['rating'] = lambda movie, low=low, high=high: is_number(movie.rating) and low <= movie.rating <= high
+        if filters.community_min is not None:
+            def community(movie):
+                average = self._community_rating(movie.id)
+                return average is not None and average >= filters.community_min
+            predicates['community'] = community
+        return predicates
+
+    def filter_movies(self, filters=MovieFilters(), sort='name', page=1, per_page=24, rows=False):
+        """
+        Retrieve one page of movies matching the filters, in the requested order.
+
+        Args:
+            filters (MovieFilters, optional): Genre, year, OMDb rating and community rating filters.
+            sort (str, optional): A key of movie_filters.SORT_OPTIONS. Defaults to 'name'.
+            page (int, optional): The 1-based page number. Defaults to 1.
+            per_page (int, optional): Movies per page. Defaults to 24.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            tuple: (list of Movie objects, total number of matching movies).
+        """
+        predicates = self._filter_predicates(filters).values()
+        movies = [movie for movie in self.movies.values() if all(match(movie) for match in predicates)]
+
+        def descending(value):
+            # Missing values last, then highest first
+            return (value is None, -value if value is not None else 0)
+
+        if sort == 'newest':
+            movies.sort(key=lambda movie: -movie.id)
+        elif sort == 'year_desc':
+            movies.sort(key=lambda movie: (*descending(movie.year if is_number(movie.year) else None), movie.id))
+        elif sort == 'year_asc':
+            movies.sort(key=lambda movie: (not is_number(movie.year),
+                                           movie.year if is_number(movie.year) else 0, movie.id))
+        elif sort == 'rating_desc':
+            movies.sort(key=lambda movie: (*descending(movie.rating if is_number(movie.rating) else None), movie.id))
+        elif sort == 'community_desc':
+            movies.sort(key=lambda movie: (*descending(self._community_rating(movie.id)), movie.id))
+        else:
+            movies.sort(key=lambda movie: (movie.name, movie.id))
+        start = (max(page, 1) - 1) * per_page
+        return _project(movies[start:start + per_page], rows), len(movies)
+
+    def get_community_ratings(self, movie_ids):
+        """
+        Retrieve the average review rating for each of the given movies.
+
+        Args:
+            movie_ids (list): The IDs of the movies.
+
+        Returns:
+            dict: movie_id -> average rating, for movies that have reviews.
+        """
+        averages = {movie_id: self._community_rating(movie_id) for movie_id in movie_ids}
+        return {movie_id: average for movie_id, average in averages.items() if average is not None}
+
+    def get_movie_facets(self, filters=MovieFilters()):
+        """
+        Count the movies per genre, decade and whole OMDb rating.
+
+        Each facet's counts apply all filters except the facet's own, so they show
+        how many movies selecting that value would match.
+
+        Args:
+            filters (MovieFilters, optional): The active filters.
+
+        Returns:
+            dict: 'genre', 'decade' and 'rating' -> list of FacetCount.
+        """
+        predicates = self._filter_predicates(filters)
+        counts = {'genre': {}, 'decade': {}, 'rating': {}}
+        for movie in self.movies.values():
+            matches = {facet: all(match(movie) for name, match in predicates.items() if name != facet)
+                       for facet in counts}
+            if matches['genre']:
+                for genre in movie.genres:
+                    counts['genre'][genre.id] = counts['genre'].get(genre.id, 0) + 1
+            if matches['decade'] and is_number(movie.year):
+                decade = int(movie.year) // 10 * 10
+                counts['decade'][decade] = counts['decade'].get(decade, 0) + 1
+            if matches['rating'] and is_number(movie.rating):
+                rating = int(movie.rating)
+                counts['rating'][rating] = counts['rating'].get(rating, 0) + 1
+        facets = {
+            facet: [FacetCount(value, facet_label(facet, value, self.genres[value].name if facet == 'genre' else None),
+                               total) for value, total in values.items()]
+            for facet, values in counts.items()
+        }
+        facets['genre'].sort(key=lambda facet_count: facet_count.label)
+        facets['decade'].sort(key=lambda facet_count: facet_count.value, reverse=True)
+        facets['rating'].sort(key=lambda facet_count: facet_count.value, reverse=True)
+        return facets
+
+    def get_recently_added_movies(self, limit=5, rows=False):
+        """
+        Retrieve the most recently added movies.
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of the most recently added Movie objects.
+        """
+        return _project(heapq.nlargest(limit, self.movies.values(), key=lambda movie: movie.id), rows)
+
+    def get_top_rated_movies(self, limit=5, rows=False):
+        """
+        Retrieve the top-rated movies.
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of the top-rated Movie objects.
+        """
+        return _project(heapq.nlargest(limit, self.movies.values(), key=_rating_key), rows)
+
+    def get_genre_recommendations(self, user_id, limit=5):
+        """
+        Rank the movies a user has not favorited by how many of the user's favorites
+        share each of their genres, then by rating.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+
+        Returns:
+            list: MovieRow tuples, best match first.
+        """
+        favorite_ids = self.favorites_by_user.get(user_id, {})
+        weights = Counter(genre.id for movie_id in favorite_ids for genre in self.movies[movie_id].genres)
+        candidates = (movie for movie in self.movies.values() if movie.id not in favorite_ids)
+        return _project(heapq.nsmallest(limit, candidates, key=lambda movie: (
+            -sum(weights[genre.id] for genre in movie.genres), -_rating_key(movie), movie.id)), True)
+
+    # Trending movies
+    def get_trending_movies(self, limit=5, rows=False):
+        """
+        Retrieve the movies with the most favorites and reviews lately, scored from
+        scratch with the same time decay as the stored counters of the SQL backend.
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects, most trending first.
+        """
+        events = [(movie_id, FAVORITE_WEIGHT, favorite.date_added)
+                  for favorites in self.favorites_by_user.values() for movie_id, favorite in favorites.items()]
+        events.extend((review.movie_id, REVIEW_WEIGHT, review.date_posted) for review in self.reviews.values())
+        scores = decayed_scores(events)
+        trending = heapq.nlargest(limit, scores, key=scores.get)
+        return _project([self.movies[movie_id] for movie_id in trending], rows)
+
+    def rebuild_trending(self, movie_ids=None):
+        """
+        Trending scores are computed on read here, so there is nothing to rebuild.
+
+        Returns:
+            int: Always 0.
+        """
+        return 0
+
+    # Similar movies
+    def get_similar_movies(self, movie_id, limit=6):
+        """
+        Retrieve the most similar movies of a movie, computed on the fly.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 6.
+
+        Returns:
+            list: MovieRow tuples, most similar first.
+        """
+        if movie_id not in self.movies:
+            return []
+        features = MovieFeatures(
+            [(movie.id, movie.director, movie.year, movie.rating) for movie in self.movies.values()],
+            [(movie.id, genre.id) for movie in self.movies.values() for genre in movie.genres],
+        )
+        neighbours = features.top_k([features.position[movie_id]], k=limit)[movie_id]
+        return [movie_row(self.movies[neighbor_id]) for neighbor_id, _ in neighbours]
+
+    def refresh_similar_movies(self, movie_ids=None):
+        """
+        Similar movies are computed on read here, so there is nothing to refresh.
+
+        Returns:
+            int: Always 0.
+        """
+        return 0
+
+    # Precomputed recommendations
+    def get_users_with_changed_favorites(self):
+        """
+        Retrieve the users whose favorites changed since their recommendations were generated.
+
+        Returns:
+            list: The IDs of the users needing new recommendations.
+        """
+        changed = []
+        for user_id, favorites in self.favorites_by_user.items():
+            if not favorites:
+                continue
+            recommendation = self.recommendations.get(user_id)
+            latest = max(favorite.date_added for favorite in favorites.values())
+            if recommendation is None or latest > recommendation.generated_at:
+                changed.append(user_id)
+        return changed
+
+    def get_recommendation(self, user_id):
+        """
+        Retrieve the stored recommendations for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Recommendation: The Recommendation object if found, None otherwise.
+        """
+        return self.recommendations.get(user_id)
+
+    def save_recommendation(self, user_id, recommendations):
+        """
+        Store (or replace) the recommendations for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+            recommendations (list): The recommended titles, one per entry.
+
+        Returns:
+            Recommendation: The stored Recommendation object.
+        """
+        recommendation = Recommendation(user_id=user_id, content='\n'.join(recommendations),
+                                        generated_at=datetime.now(UTC))
+        self.recommendations[user_id] = recommendation
+        return recommendation
+
+    def add_recommendation_run(self, started_at, finished_at, succeeded, failed):
+        """
+        Record the outcome of a recommendation batch run.
+
+        Returns:
+            RecommendationRun: The newly created RecommendationRun object.
+        """
+        run = RecommendationRun(id=len(self.recommendation_runs) + 1, started_at=started_at,
+                                finished_at=finished_at, succeeded=succeeded, failed=failed)
+        self.recommendation_runs.append(run)
+        return run
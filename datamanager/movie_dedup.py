@@ -0,0 +1,55 @@
+"""
+This module decides which movie rows are copies of the same film, for the merge job
+that collapses duplicates into one canonical row.
+"""
+
+from collections import namedtuple
+from datamanager.prefix_index import normalize
+
+# What the merge job needs to know per movie
+MovieKey = namedtuple('MovieKey', ['id', 'name', 'year', 'imdb_id'])
+
+
+def find_duplicates(movies):
+    """
+    Groups movies by imdbID, or by normalized name and year where the imdbID is unknown,
+    and picks the canonical row of each group.
+
+    A movie without an imdbID joins the imdbID group whose name and year match, as long
+    as exactly one such group exists. The canonical row is the oldest one with an imdbID,
+    or the oldest row if none has one.
+
+    Args:
+        movies (iterable): MovieKey tuples (or rows with the same fields).
+
+    Returns:
+        dict: duplicate movie ID -> canonical movie ID.
+    """
+    by_imdb_id = {}
+    by_title = {}
+    for movie in sorted(movies, key=lambda movie: movie[0]):
+        movie = MovieKey(*movie)
+        if movie.imdb_id:
+            by_imdb_id.setdefault(movie.imdb_id, []).append(movie)
+        else:
+            by_title.setdefault((normalize(movie.name), str(movie.year or '')), []).append(movie)
+
+    imdb_ids_by_title = {}
+    for imdb_id, group in by_imdb_id.items():
+        for movie in group:
+            imdb_ids_by_title.setdefault((normalize(movie.name), str(movie.year or '')), set()).add(imdb_id)
+
+    groups = list(by_imdb_id.values())
+    for title, group in by_title.items():
+        imdb_ids = imdb_ids_by_title.get(title, set())
+        if len(imdb_ids) == 1:
+            by_imdb_id[next(iter(imdb_ids))].extend(group)
+        else:
+            groups.append(group)
+
+    duplicates = {}
+    for group in groups:
+        canonical, *copies = sorted(group, key=lambda movie: (movie.imdb_id is None, movie.id))
+        for movie in copies:
+            duplicates[movie.id] = canonical.id
+    return duplicates
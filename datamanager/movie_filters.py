@@ -0,0 +1,52 @@
+"""
+This module defines the filter, sort and facet vocabulary of the /movies page,
+shared by all data manager backends.
+"""
+
+from collections import namedtuple
+
+# Sort order name -> label shown in the UI
+SORT_OPTIONS = {
+    'name': 'Title (A-Z)',
+    'newest': 'Recently added',
+    'year_desc': 'Year (newest first)',
+    'year_asc': 'Year (oldest first)',
+    'rating_desc': 'OMDb rating',
+    'community_desc': 'Community rating',
+}
+
+# Filter values accepted by filter_movies/get_movie_facets
+MovieFilters = namedtuple(
+    'MovieFilters',
+    ['genre_ids', 'year_min', 'year_max', 'rating_min', 'rating_max', 'community_min'],
+    defaults=[(), None, None, None, None, None]
+)
+
+# One facet value and how many movies it would match
+FacetCount = namedtuple('FacetCount', ['value', 'label', 'count'])
+
+
+def facet_label(facet, value, name=None):
+    """
+    Returns the display label for a facet value.
+
+    Args:
+        facet (str): 'genre', 'decade' or 'rating'.
+        value (int): The facet value (genre ID, decade start year or whole rating).
+        name (str, optional): The genre name, for the genre facet.
+
+    Returns:
+        str: The label, e.g. "Drama", "1990s" or "8+".
+    """
+    if facet == 'genre':
+        return name
+    if facet == 'decade':
+        return f"{value}s"
+    return f"{value}+"
+
+
+def is_number(value):
+    """
+    Tells whether a stored year/rating is numeric (OMDb sends "N/A" or "2010–2012" at times).
+    """
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,22 @@
+"""
+This module defines the read-only movie rows the list pages are rendered from.
+"""
+
+from collections import namedtuple
+
+# The columns the list templates read; one plain tuple per movie instead of an ORM object
+# with its identity-map entry, change tracking and lazy relationship loaders
+MovieRow = namedtuple('MovieRow', ['id', 'name', 'director', 'year', 'rating', 'poster'])
+
+
+def movie_row(movie):
+    """
+    Projects a Movie object onto a MovieRow.
+
+    Args:
+        movie (Movie): The movie.
+
+    Returns:
+        MovieRow: Its list-page columns.
+    """
+    return MovieRow(movie.id, movie.name, movie.director, movie.year, movie.rating, movie.poster)
@@ -0,0 +1,211 @@
+"""
+This module implements the in-memory prefix index behind title autocomplete.
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+
+# What autocomplete returns per movie; kept small so the index stays compact
+Suggestion = namedtuple('Suggestion', ['id', 'name', 'director', 'year', 'rating', 'popularity'])
+
+# Prefixes shorter than this match too much of the catalog to be useful
+MIN_PREFIX_LENGTH = 2
+
+# Prefixes up to this length match a large share of the catalog, so their best
+# SHORT_PREFIX_TOP suggestions are cached instead of selected per request
+SHORT_PREFIX_LENGTH = 3
+SHORT_PREFIX_TOP = 50
+
+
+def normalize(text):
+    """
+    Normalizes text for prefix matching: lower-case with single spaces.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    return ' '.join((text or '').split()).casefold()
+
+
+def _numeric(value):
+    """
+    Converts a stored rating to a float; missing or non-numeric ratings rank last.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('-inf')
+
+
+# Sort keys of the suggestion orders
+_SCORES = {
+    'rating': lambda movie: (_numeric(movie.rating), movie.popularity),
+    'popularity': lambda movie: (movie.popularity, _numeric(movie.rating)),
+}
+
+
+def _keys(name, director):
+    """
+    Returns the index keys for a movie: every word suffix of its name and its
+    director, so "dark kn" finds "The Dark Knight" and "nolan" finds "Christopher Nolan".
+    """
+    keys = set()
+    for text in (name, director):
+        words = normalize(text).split(' ')
+        keys.update(' '.join(words[i:]) for i in range(len(words)) if words[i])
+    return keys
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over normalized movie names and directors.
+
+    Keys are stored as sorted (key, movie_id) pairs, so a prefix lookup is two
+    binary searches plus a top-N selection over the matching range. Updates insert
+    or remove a handful of pairs with bisect, so the index can be kept current by
+    the data manager's movie mutations.
+
+    The range of a short prefix can span much of the catalog, so the best
+    suggestions of prefixes up to SHORT_PREFIX_LENGTH characters are cached on
+    first use. A movie change drops only the cached lists it is in or now enters.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self._entries = []      # sorted [(key, movie_id)]
+        self._movies = {}       # movie_id -> Suggestion
+        self._top = {}          # (short prefix, order) -> best SHORT_PREFIX_TOP Suggestions
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """
+        Returns the number of indexed movies.
+        """
+        return len(self._movies)
+
+    def build(self, rows):
+        """
+        Replace the index contents in one pass.
+
+        Args:
+            rows (iterable): (id, name, director, year, rating, popularity) tuples.
+        """
+        movies = {row[0]: Suggestion(*row) for row in rows}
+        entries = sorted((key, movie.id) for movie in movies.values() for key in _keys(movie.name, movie.director))
+        with self._lock:
+            self._movies, self._entries, self._top = movies, entries, {}
+
+    def add(self, movie, popularity=0):
+        """
+        Index a movie, replacing any previous entry for it.
+
+        Args:
+            movie (Movie): The movie to index.
+            popularity (int, optional): The number of users who favorited it.
+        """
+        with self._lock:
+            self.remove(movie.id)
+            suggestion = Suggestion(movie.id, movie.name, movie.director, movie.year, movie.rating, popularity)
+            self._movies[movie.id] = suggestion
+            for key in _keys(movie.name, movie.director):
+                insort(self._entries, (key, movie.id))
+            self._invalidate(suggestion)
+
+    def update(self, movie):
+        """
+        Re-index a changed movie, keeping its popularity.
+
+        Args:
+            movie (Movie): The updated movie.
+        """
+        with self._lock:
+            previous = self._movies.get(movie.id)
+            self.add(movie, popularity=previous.popularity if previous else 0)
+
+    def remove(self, movie_id):
+        """
+        Drop a movie from the index.
+
+        Args:
+            movie_id (int): The ID of the movie.
+        """
+        with self._lock:
+            movie = self._movies.pop(movie_id, None)
+            if movie is None:
+                return
+            self._invalidate(movie)
+            for key in _keys(movie.name, movie.director):
+                position = bisect_left(self._entries, (key, movie_id))
+                if position < len(self._entries) and self._entries[position] == (key, movie_id):
+                    del self._entries[position]
+
+    def add_popularity(self, movie_id, delta):
+        """
+        Adjust a movie's popularity after a favorite was added or removed.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            delta (int): +1 or -1.
+        """
+        with self._lock:
+            movie = self._movies.get(movie_id)
+            if movie:
+                self._movies[movie_id] = movie._replace(popularity=max(0, movie.popularity + delta))
+                self._invalidate(self._movies[movie_id])
+
+    def _invalidate(self, movie):
+        """
+        Drop the cached short-prefix lists that a new, changed or removed movie is in
+        or now belongs in; the others stay valid.
+        """
+        if not self._top:
+            return
+        prefixes = {key[:length] for key in _keys(movie.name, movie.director)
+                    for length in range(MIN_PREFIX_LENGTH, SHORT_PREFIX_LENGTH + 1) if len(key) >= length}
+        for prefix in prefixes:
+            for order, score in _SCORES.items():
+                top = self._top.get((prefix, order))
+                if top is not None and (len(top) < SHORT_PREFIX_TOP or score(movie) > score(top[-1])
+                                        or any(suggestion.id == movie.id for suggestion in top)):
+                    del self._top[(prefix, order)]
+
+    def search(self, prefix, limit=10, order='rating'):
+        """
+        Find the best movies whose name or director has a word starting with prefix.
+
+        Args:
+            prefix (str): What the user has typed so far.
+            limit (int, optional): The maximum number of suggestions. Defaults to 10.
+            order (str, optional): 'rating' or 'popularity'. Defaults to 'rating'.
+
+        Returns:
+            list: Up to limit Suggestion tuples, best first.
+        """
+        prefix = normalize(prefix)
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return []
+        if order not in _SCORES:
+            order = 'rating'
+        with self._lock:
+            if len(prefix) > SHORT_PREFIX_LENGTH or limit > SHORT_PREFIX_TOP:
+                return self._select(prefix, limit, order)
+            top = self._top.get((prefix, order))
+            if top is None:
+                top = self._top[(prefix, order)] = self._select(prefix, SHORT_PREFIX_TOP, order)
+            return top[:limit]
+
+    def _select(self, prefix, limit, order):
+        """
+        Select the best limit movies with a key starting with prefix, scanning its range.
+        """
+        start = bisect_left(self._entries, (prefix,))
+        end = bisect_left(self._entries, (prefix + '\uffff',), lo=start)
+        movie_ids = {movie_id for _, movie_id in self._entries[start:end]}
+        return heapq.nlargest(limit, (self._movies[movie_id] for movie_id in movie_ids), key=_SCORES[order])
@@ -0,0 +1,73 @@
+"""
+This module provides the in-memory movie search indexes shared by the data managers.
+"""
+
+import threading
+from datamanager.prefix_index import PrefixIndex
+from datamanager.trigram_index import TrigramIndex
+
+
+class MovieSearchIndexes:
+    """
+    Mixin that keeps a data manager's in-memory search indexes in step with its movies.
+
+    The prefix index (autocomplete) is built eagerly by the data manager. The trigram
+    index (fuzzy search) is built on first use via ``_fuzzy_index_rows()``, since it is
+    only needed when an exact search finds nothing. Movie mutations call
+    ``_index_movie``/``_unindex_movie`` to update both.
+    """
+
+    title_index = None
+    _fuzzy_index = None
+    _fuzzy_lock = threading.Lock()
+
+    def _fuzzy_index_rows(self):
+        """
+        Return (id, name, director) rows for all movies; implemented by the data manager.
+        """
+        raise NotImplementedError
+
+    @property
+    def fuzzy_index(self):
+        """
+        The trigram index, built from all movies on first access.
+        """
+        if self._fuzzy_index is None:
+            with self._fuzzy_lock:
+                if self._fuzzy_index is None:
+                    index = TrigramIndex()
+                    index.build(self._fuzzy_index_rows())
+                    self._fuzzy_index = index
+        return self._fuzzy_index
+
+    def _index_movie(self, movie):
+        """
+        Add a new or changed movie to the search indexes.
+        """
+        self.title_index.update(movie)
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.add(movie.id, movie.name, movie.director)
+
+    def _unindex_movie(self, movie_id):
+        """
+        Remove a deleted movie from the search indexes.
+        """
+        self.title_index.remove(movie_id)
+        if self._fuzzy_index is not None:
+            self._fuzzy_index.remove(movie_id)
+
+    def autocomplete_movies(self, prefix, limit=10, order='rating'):
+        """
+        Suggest movies whose name or director has a word starting with prefix.
+
+        Served from the in-memory prefix index, without a database query.
+
+        Args:
+            prefix (str): What the user has typed so far.
+            limit (int, optional): The maximum number of suggestions. Defaults to 10.
+            order (str, optional): 'rating' or 'popularity'. Defaults to 'rating'.
+
+        Returns:
+            list: Suggestion tuples (id, name, director, year, rating, popularity).
+        """
+        return self.title_index.search(prefix, limit=limit, order=order)
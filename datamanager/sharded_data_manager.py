@@ -0,0 +1,838 @@
+"""
+This module implements a sharded SQLite data manager for the MovieWeb application.
+
+Users, with their favorites, reviews, taste profiles, trending counters and
+recommendations, live in N shard files chosen by a hash of the user ID, so writes
+for different users go to different files instead of queueing for one writer lock.
+The movie and genre catalog lives in its own file, which also backs the search
+indexes and similar movies, and is replicated into every shard so per-user queries
+(favorites, timeline, taste profile) still join locally. Queries across users fan
+out to all shards in parallel and merge the results.
+
+Each file commits on its own: a unit of work is atomic per file, not across files.
+"""
+
+import heapq
+import os
+import threading
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from sqlalchemy import select, delete, func, text, table, column, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.data_models import Movie, Genre, UserMovie, Review, MovieTrend, TrendLandmark, IdBlock, movie_genre
+from datamanager.sqlite_data_manager import SQLiteDataManager, DELETE_BATCH_SIZE
+from datamanager.trending import HALF_LIFE_HOURS, PRUNE_BELOW
+
+DEFAULT_SHARD_COUNT = 4
+
+# User and review IDs reserved from the catalog per round trip
+ID_BLOCK_SIZE = 100
+
+# Trending candidates fetched per shard, as a multiple of the requested count
+TRENDING_CANDIDATES = 4
+
+
+def shard_files(db_file_name, shard_count):
+    """
+    Returns the shard file names of a catalog file, e.g. "moviweb_app.shard0.db".
+    """
+    stem, extension = os.path.splitext(db_file_name)
+    return [f"{stem}.shard{index}{extension or '.db'}" for index in range(shard_count)]
+
+
+def shard_index(user_id, shard_count):
+    """
+    Returns the shard a user's rows live in: a stable hash of the user ID, so the
+    mapping survives restarts and does not depend on how IDs are allocated.
+    """
+    return zlib.crc32(str(user_id).encode()) % shard_count
+
+
+class CatalogDataManager(SQLiteDataManager):
+    """
+    The catalog database of a sharded deployment. Favorites and reviews live in the
+    shards, so autocomplete popularity and community ratings are fetched from there.
+    """
+
+    def __init__(self, db_file_name, favorite_counts, community_ratings):
+        """
+        Args:
+            db_file_name (str): The catalog database file.
+            favorite_counts (callable): Returns a Counter of favorites per movie.
+            community_ratings (callable): Returns a dict movie_id -> average review rating.
+        """
+        self._favorite_counts = favorite_counts
+        self._fetch_community_ratings = community_ratings
+        super().__init__(db_file_name)
+
+    def rebuild_title_index(self):
+        """
+        Load all movies into the autocomplete index, with favorite counts from the shards.
+        """
+        super().rebuild_title_index()
+        for movie_id, count in self._favorite_counts().items():
+            self.title_index.add_popularity(movie_id, count)
+
+    def _community_ratings(self):
+        """
+        Returns the shards' average ratings, loaded into a temporary table of this
+        session's connection so the catalog queries can join them.
+        """
+        self.session.execute(text(
+            "CREATE TEMP TABLE IF NOT EXISTS community_rating (movie_id INTEGER PRIMARY KEY, average REAL)"))
+        self.session.execute(text("DELETE FROM community_rating"))
+        ratings = self._fetch_community_ratings()
+        if ratings:
+            self.session.execute(text("INSERT INTO community_rating VALUES (:movie_id, :average)"),
+                                 [{'movie_id': movie_id, 'average': average} for movie_id, average in ratings.items()])
+        return table('community_rating', column('movie_id'), column('average'))
+
+
+class ShardDataManager(SQLiteDataManager):
+    """
+    One shard of a sharded deployment: the users of its hash bucket and their rows,
+    plus a replica of the catalog. Search indexes and similar movies belong to the
+    catalog, so the shard does not maintain them; its title_index is the catalog's,
+    which keeps favorite counts there up to date.
+    """
+
+    def rebuild_title_index(self):
+        """
+        Nothing to do; the catalog owns the index.
+        """
+
+    def _index_movie(self, movie):
+        """
+        Nothing to do; the catalog owns the index.
+        """
+
+    def _unindex_movie(self, movie_id):
+        """
+        Nothing to do; the catalog owns the index.
+        """
+
+    def _touch_similarity(self, movie_ids):
+        """
+        Nothing to do; similar movies are computed in the catalog.
+        """
+
+
+def _catalog_method(name):
+    """
+    Returns a method answering a catalog-only call from the catalog database.
+    """
+    def method(self, *args, **kwargs):
+        return getattr(self.catalog, name)(*args, **kwargs)
+    method.__name__ = name
+    method.__doc__ = getattr(SQLiteDataManager, name).__doc__
+    return method
+
+
+class ShardedDataManager(DataManagerInterface):
+    """
+    Sharded SQLite implementation of the data manager interface.
+
+    DATABASE_FILE names the catalog; the shards are stored next to it (see
+    shard_files). The shard count must not change once users have been added, as it
+    decides which file each user's rows are in.
+    """
+
+    def __init__(self, db_file_name, shard_count=DEFAULT_SHARD_COUNT):
+        """
+        Open (or create) the catalog and shard databases.
+
+        Args:
+            db_file_name (str): The catalog database file.
+            shard_count (int, optional): The number of shards. Defaults to DEFAULT_SHARD_COUNT.
+        """
+        self.shards = [ShardDataManager(file_name) for file_name in shard_files(db_file_name, shard_count)]
+        self._pool = ThreadPoolExecutor(max_workers=shard_count, thread_name_prefix='shard')
+        self.catalog = CatalogDataManager(db_file_name, self._favorite_counts, self._all_community_ratings)
+        for shard in self.shards:
+            shard.title_index = self.catalog.title_index
+        self._id_lock = threading.Lock()
+        self._id_blocks = {}  # Table name -> (next ID, end of the reserved block)
+        self.sync_catalog(only_stale=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Create the data manager from the app config (DATABASE_FILE and SHARD_COUNT).
+        """
+        return cls(config.get('DATABASE_FILE'), config.get('SHARD_COUNT', DEFAULT_SHARD_COUNT))
+
+    def close_session(self):
+        """
+        Release the calling thread's sessions of all databases.
+        """
+        self.catalog.close_session()
+        for shard in self.shards:
+            shard.close_session()
+
+    def dispose(self):
+        """
+        Drop all pooled connections, worker threads and reserved IDs after fork();
+        see SQLiteDataManager.dispose.
+        """
+        self.catalog.dispose()
+        for shard in self.shards:
+            shard.dispose()
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix='shard')
+        self._id_blocks = {}  # The parent process may hand out the rest of its blocks
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Group the writes of several calls into one transaction per database; each
+        database commits once on exit, but a failure in one does not undo another.
+        """
+        with ExitStack() as stack:
+            for manager in (self.catalog, *self.shards):
+                stack.enter_context(manager.unit_of_work())
+            yield self
+
+    def rebuild_title_index(self):
+        """
+        Load all movies (with their favorite counts) into the autocomplete index.
+        """
+        self.catalog.rebuild_title_index()
+
+    # Routing and fan-out
+    def _shard(self, user_id):
+        """
+        Returns the shard holding a user's rows.
+        """
+        return self.shards[shard_index(user_id, len(self.shards))]
+
+    def _fan_out(self, fn):
+        """
+        Run fn(shard) on all shards in parallel and return the results in shard order.
+
+        Each call runs in a pool thread whose session is closed afterwards, so any
+        ORM objects returned must have everything the caller reads already loaded.
+        """
+        def run(shard):
+            try:
+                return fn(shard)
+            finally:
+                shard.close_session()
+        return list(self._pool.map(run, self.shards))
+
+    def _next_id(self, name):
+        """
+        Returns a new ID for a sharded table, unique across all shards. IDs are
+        reserved from the catalog in blocks of ID_BLOCK_SIZE, so only one insert in
+        ID_BLOCK_SIZE writes to the catalog.
+        """
+        with self._id_lock:
+            next_id, end = self._id_blocks.get(name, (0, 0))
+            if next_id >= end:
+                blocks = IdBlock.__table__
+                statement = (sqlite_insert(blocks).values(name=name, next_id=1 + ID_BLOCK_SIZE)
+                             .on_conflict_do_update(index_elements=[blocks.c.name],
+                                                    set_={'next_id': blocks.c.next_id + ID_BLOCK_SIZE})
+                             .returning(blocks.c.next_id))
+                with self.catalog.engine.begin() as connection:
+                    end = connection.execute(statement).scalar_one()
+                next_id = end - ID_BLOCK_SIZE
+            self._id_blocks[name] = (next_id + 1, end)
+            return next_id
+
+    # Catalog replication
+    def sync_catalog(self, only_stale=False):
+        """
+        Copy the whole catalog (genres, movies and their links) into the shards, e.g.
+        after adding shards or when a replica missed a write. Rows the catalog no
+        longer has are deleted from the shard, with their favorites and reviews.
+
+        Args:
+            only_stale (bool, optional): Skip shards whose movie and genre IDs match the catalog.
+
+        Returns:
+            int: The number of shards synced.
+        """
+        def ids(manager):
+            return ({movie_id for movie_id, in manager.session.execute(select(Movie.id))},
+                    {genre_id for genre_id, in manager.session.execute(select(Genre.id))})
+        movie_ids, genre_ids = ids(self.catalog)
+        genres = [dict(row) for row in self.catalog.session.execute(select(Genre.__table__)).mappings()]
+        stale = []
+        for shard in self.shards:
+            shard_movie_ids, shard_genre_ids = ids(shard)
+            if only_stale and (shard_movie_ids, shard_genre_ids) == (movie_ids, genre_ids):
+                continue
+            shard.delete_movies(shard_movie_ids - movie_ids)
+            for genre_id in shard_genre_ids - genre_ids:
+                shard.delete_genre(genre_id)
+            self._upsert_genres(shard, genres)
+            shard._commit()
+            stale.append(shard)
+        if stale:
+            movie_ids = sorted(movie_ids)
+            for start in range(0, len(movie_ids), DELETE_BATCH_SIZE):
+                self._replicate_movies(movie_ids[start:start + DELETE_BATCH_SIZE], shards=stale)
+        return len(stale)
+
+    @staticmethod
+    def _upsert_genres(shard, genres):
+        """
+        Insert or update genre rows (dicts of Genre columns) in a shard.
+        """
+        if genres:
+            statement = sqlite_insert(Genre.__table__)
+            shard.session.execute(statement.on_conflict_do_update(
+                index_elements=[Genre.__table__.c.id], set_={'name': statement.excluded.name}), genres)
+
+    def _replicate_movies(self, movie_ids, shards=None):
+        """
+        Copy the catalog rows and genre links of some movies into the shards, and drop
+        the cached taste profiles there that may include them.
+        """
+        movie_ids = list(movie_ids)
+        movies = [dict(row) for row in self.catalog.session.execute(
+            select(Movie.__table__).where(Movie.id.in_(movie_ids))).mappings()]
+        links = [dict(row) for row in self.catalog.session.execute(
+            select(movie_genre).where(movie_genre.c.movie_id.in_(movie_ids))).mappings()]
+        for shard in shards or self.shards:
+            if movies:
+                statement = sqlite_insert(Movie.__table__)
+                shard.session.execute(statement.on_conflict_do_update(
+                    index_elements=[Movie.__table__.c.id],
+                    set_={name: statement.excluded[name] for name in movies[0] if name != 'id'}), movies)
+            shard.session.execute(delete(movie_genre).where(movie_genre.c.movie_id.in_(movie_ids)))
+            if links:
+                shard.session.execute(insert(movie_genre), links)
+            shard._invalidate_user_stats(movie_ids)
+            shard._commit()
+
+    # CRUD operations for User
+    def get_all_users(self):
+        """
+        Retrieve all users from all shards.
+
+        Returns:
+            list: A list of all User objects, by ID.
+        """
+        return sorted((user for users in self._fan_out(lambda shard: shard.get_all_users()) for user in users),
+                      key=lambda user: user.id)
+
+    def add_user(self, name):
+        """
+        Add a new user to the shard its new ID hashes to.
+
+        Args:
+            name (str): The name of the user.
+
+        Returns:
+            User: The newly created User object.
+        """
+        user_id = self._next_id('user')
+        return self._shard(user_id).add_user(name, user_id=user_id)
+
+    def get_user_by_id(self, user_id):
+        """
+        Retrieve a user by their ID from their shard.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User: The User object if found, None otherwise.
+        """
+        return self._shard(user_id).get_user_by_id(user_id)
+
+    def delete_users(self, user_ids):
+        """
+        Delete many users and their favorites, reviews and recommendations, one
+        transaction per shard.
+
+        Args:
+            user_ids (iterable): The IDs of the users to delete.
+
+        Returns:
+            int: The number of users deleted.
+        """
+        by_shard = {}
+        for user_id in dict.fromkeys(user_ids):
+            by_shard.setdefault(shard_index(user_id, len(self.shards)), []).append(user_id)
+        return sum(self.shards[index].delete_users(batch) for index, batch in by_shard.items())
+
+    # CRUD operations for Movie and Genre (catalog, replicated to the shards)
+    get_all_movies = _catalog_method('get_all_movies')
+    get_movie_by_id = _catalog_method('get_movie_by_id')
+    get_movie_by_imdb_id = _catalog_method('get_movie_by_imdb_id')
+    get_movies_by_names = _catalog_method('get_movies_by_names')
+    get_all_genres = _catalog_method('get_all_genres')
+    get_genre_by_id = _catalog_method('get_genre_by_id')
+    get_genre_by_name = _catalog_method('get_genre_by_name')
+    get_movies_by_genre = _catalog_method('get_movies_by_genre')
+    search_movies = _catalog_method('search_movies')
+    fuzzy_search_movies = _catalog_method('fuzzy_search_movies')
+    autocomplete_movies = _catalog_method('autocomplete_movies')
+    filter_movies = _catalog_method('filter_movies')
+    get_movie_facets = _catalog_method('get_movie_facets')
+    get_recently_added_movies = _catalog_method('get_recently_added_movies')
+    get_top_rated_movies = _catalog_method('get_top_rated_movies')
+    get_similar_movies = _catalog_method('get_similar_movies')
+    refresh_similar_movies = _catalog_method('refresh_similar_movies')
+    add_recommendation_run = _catalog_method('add_recommendation_run')
+
+    def add_movie(self, name, director=None, year=None, rating=None, poster=None, genres=[], imdb_id=None):
+        """
+        Add a new movie to the catalog and its replicas, or return the stored one with the same imdbID.
+
+        Args:
+            name (str): The name of the movie.
+            director (str, optional): The director of the movie.
+            year (int, optional): The release year of the movie.
+            rating (float, optional): The rating of the movie.
+            poster (str, optional): The URL of the movie poster.
+            genres (list, optional): A list of catalog Genre objects for the movie.
+            imdb_id (str, optional): OMDb's imdbID of the movie.
+
+        Returns:
+            Movie: The catalog's Movie object.
+        """
+        movie = self.catalog.add_movie(name, director=director, year=year, rating=rating, poster=poster,
+                                       genres=genres, imdb_id=imdb_id)
+        self._replicate_movies([movie.id])
+        return movie
+
+    def update_movie(self, movie_id, **kwargs):
+        """
+        Update a movie's details in the catalog and its replicas.
+
+        Args:
+            movie_id (int): The ID of the movie to update.
+            **kwargs: Arbitrary keyword arguments representing the movie attributes to update.
+
+        Returns:
+            Movie: The updated Movie object if found, None otherwise.
+        """
+        movie = self.catalog.update_movie(movie_id, **kwargs)
+        if movie:
+            self._replicate_movies([movie_id])
+        return movie
+
+    def add_movie_to_genre(self, movie_id, genre_id):
+        """
+        Associate a movie with a genre.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            genre_id (int): The ID of the genre.
+        """
+        self.catalog.add_movie_to_genre(movie_id, genre_id)
+        self._replicate_movies([movie_id])
+
+    def remove_movie_from_genre(self, movie_id, genre_id):
+        """
+        Remove the association between a movie and a genre.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            genre_id (int): The ID of the genre.
+        """
+        self.catalog.remove_movie_from_genre(movie_id, genre_id)
+        self._replicate_movies([movie_id])
+
+    def delete_movie(self, movie_id):
+        """
+        Delete a movie, and with it its favorites and reviews in every shard.
+
+        Args:
+            movie_id (int): The ID of the movie to delete.
+
+        Returns:
+            bool: True if the movie was successfully deleted, False otherwise.
+        """
+        deleted = self.catalog.delete_movie(movie_id)
+        if deleted:
+            for shard in self.shards:
+                shard.delete_movie(movie_id)
+        return deleted
+
+    def delete_movies(self, movie_ids):
+        """
+        Delete many movies and their favorites, reviews and genre links.
+
+        Args:
+            movie_ids (iterable): The IDs of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        movie_ids = list(dict.fromkeys(movie_ids))
+        deleted = self.catalog.delete_movies(movie_ids)
+        for shard in self.shards:
+            shard.delete_movies(movie_ids)
+        return deleted
+
+    def delete_movies_matching(self, filters):
+        """
+        Delete all movies matching the /movies filters, with their dependent rows.
+
+        Args:
+            filters (MovieFilters): Genre, year, OMDb rating and community rating filters.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        where = [clause for clauses in self.catalog._filter_clauses(filters).values() for clause in clauses]
+        if not where:
+            raise ValueError("Refusing to delete movies without a filter")
+        return self.delete_movies([movie_id for movie_id, in self.catalog.session.query(Movie.id).filter(*where)])
+
+    def merge_duplicate_movies(self):
+        """
+        Collapse duplicate movie rows into one canonical row per film, in the catalog
+        and in every shard. The replicas hold the same rows, so each database finds
+        the same duplicates and canonical rows.
+
+        Returns:
+            int: The number of duplicate rows removed.
+        """
+        merged = self.catalog.merge_duplicate_movies()
+        if merged:
+            for shard in self.shards:
+                shard.merge_duplicate_movies()
+            self.catalog.rebuild_title_index()  # Favorites moved to the canonical rows
+        return merged
+
+    def add_genre(self, name):
+        """
+        Add a new genre to the catalog and its replicas.
+
+        Args:
+            name (str): The name of the genre.
+
+        Returns:
+            Genre: The catalog's Genre object.
+        """
+        genre = self.catalog.add_genre(name)
+        for shard in self.shards:
+            self._upsert_genres(shard, [{'id': genre.id, 'name': genre.name}])
+            shard._commit()
+        return genre
+
+    def update_genre(self, genre_id, new_name):
+        """
+        Update a genre's name in the catalog and its replicas.
+
+        Args:
+            genre_id (int): The ID of the genre to update.
+            new_name (str): The new name for the genre.
+
+        Returns:
+            Genre: The updated Genre object if found, None otherwise.
+        """
+        genre = self.catalog.update_genre(genre_id, new_name)
+        if genre:
+            for shard in self.shards:
+                shard.update_genre(genre_id, new_name)
+        return genre
+
+    def delete_genre(self, genre_id):
+        """
+        Delete a genre from the catalog and its replicas.
+
+        Args:
+            genre_id (int): The ID of the genre to delete.
+        """
+        self.catalog.delete_genre(genre_id)
+        for shard in self.shards:
+            shard.delete_genre(genre_id)
+
+    # CRUD operations for UserMovie (routed to the user's shard)
+    def add_favorite_movie(self, user_id, movie_id):
+        """
+        Add a movie to a user's favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie to add as a favorite.
+
+        Returns:
+            UserMovie: The UserMovie object representing the favorite relationship.
+        """
+        return self._shard(user_id).add_favorite_movie(user_id, movie_id)
+
+    def get_favorite_movies_by_user(self, user_id, rows=False):
+        """
+        Retrieve all favorite movies for a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects (from the shard's replica) that are favorites of the user.
+        """
+        return self._shard(user_id).get_favorite_movies_by_user(user_id, rows=rows)
+
+    def get_user_favorite_movies(self, user_id):
+        """
+        Alias of get_favorite_movies_by_user required by DataManagerInterface.
+        """
+        return self.get_favorite_movies_by_user(user_id)
+
+    def get_favorite_details(self, user_id):
+        """
+        Retrieve a user's favorites for building recommendation prompts; see
+        SQLiteDataManager.get_favorite_details.
+        """
+        return self._shard(user_id).get_favorite_details(user_id)
+
+    def get_genre_recommendations(self, user_id, limit=5):
+        """
+        Rank the movies a user has not favorited by shared genres, then rating; see
+        SQLiteDataManager.get_genre_recommendations. The user's shard has the
+        favorites and a replica of the catalog, so this is one shard query.
+        """
+        return self._shard(user_id).get_genre_recommendations(user_id, limit=limit)
+
+    def get_users_by_favorite_movie(self, movie_id):
+        """
+        Retrieve all users who have favorited a specific movie, from all shards.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            list: A list of User objects who have favorited the movie, by ID.
+        """
+        users = self._fan_out(lambda shard: shard.get_users_by_favorite_movie(movie_id))
+        return sorted((user for shard_users in users for user in shard_users), key=lambda user: user.id)
+
+    def remove_favorite_movie(self, user_id, movie_id):
+        """
+        Remove a movie from a user's favorites.
+
+        Args:
+            user_id (int): The ID of the user.
+            movie_id (int): The ID of the movie to remove from favorites.
+        """
+        self._shard(user_id).remove_favorite_movie(user_id, movie_id)
+
+    def _favorite_counts(self):
+        """
+        Returns a Counter of favorites per movie over all shards.
+        """
+        counts = Counter()
+        for shard_counts in self._fan_out(lambda shard: shard.session.execute(
+                select(UserMovie.movie_id, func.count()).group_by(UserMovie.movie_id)).all()):
+            counts.update(dict(shard_counts))
+        return counts
+
+    # Per-user views (routed to the user's shard)
+    def get_user_stats(self, user_id):
+        """
+        Retrieve a user's taste profile; see SQLiteDataManager.get_user_stats.
+        """
+        return self._shard(user_id).get_user_stats(user_id)
+
+    def get_user_timeline(self, user_id, limit=20, cursor=None):
+        """
+        Retrieve a page of a user's activity; see SQLiteDataManager.get_user_timeline.
+        """
+        return self._shard(user_id).get_user_timeline(user_id, limit=limit, cursor=cursor)
+
+    # CRUD operations for Review
+    def add_review(self, text, rating, user_id, movie_id):
+        """
+        Add a new review to the author's shard.
+
+        Args:
+            text (str): The text content of the review.
+            rating (float): The rating given in the review.
+            user_id (int): The ID of the user who wrote the review.
+            movie_id (int): The ID of the movie being reviewed.
+
+        Returns:
+            Review: The newly created Review object.
+        """
+        return self._shard(user_id).add_review(text, rating, user_id, movie_id, review_id=self._next_id('review'))
+
+    def get_reviews_by_movie(self, movie_id):
+        """
+        Retrieve all reviews for a specific movie, from all shards, with their authors loaded.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            list: A list of Review objects for the movie, by ID.
+        """
+        def fetch(shard):
+            reviews = shard.get_reviews_by_movie(movie_id)
+            for review in reviews:
+                review.user  # Loaded before the pool thread's session closes
+            return reviews
+        return sorted((review for reviews in self._fan_out(fetch) for review in reviews),
+                      key=lambda review: review.id)
+
+    def get_reviews_by_user(self, user_id):
+        """
+        Retrieve all reviews by a specific user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: A list of Review objects by the user.
+        """
+        return self._shard(user_id).get_reviews_by_user(user_id)
+
+    def _review_shard(self, review_id):
+        """
+        Returns the shard holding a review, or None.
+        """
+        for shard in self.shards:
+            if shard.session.query(Review.id).filter_by(id=review_id).first():
+                return shard
+        return None
+
+    def update_review(self, review_id, new_text=None, new_rating=None):
+        """
+        Update a review's content or rating.
+
+        Args:
+            review_id (int): The ID of the review to update.
+            new_text (str, optional): The new text content for the review.
+            new_rating (float, optional): The new rating for the review.
+
+        Returns:
+            Review: The updated Review object if found, None otherwise.
+        """
+        shard = self._review_shard(review_id)
+        return shard.update_review(review_id, new_text=new_text, new_rating=new_rating) if shard else None
+
+    def delete_review(self, review_id):
+        """
+        Delete a review.
+
+        Args:
+            review_id (int): The ID of the review to delete.
+        """
+        shard = self._review_shard(review_id)
+        if shard:
+            shard.delete_review(review_id)
+
+    def get_community_ratings(self, movie_ids):
+        """
+        Retrieve the average review rating for each of the given movies over all shards.
+
+        Args:
+            movie_ids (list): The IDs of the movies.
+
+        Returns:
+            dict: movie_id -> average rating, for movies that have reviews.
+        """
+        return self._review_averages(Review.movie_id.in_(list(movie_ids)))
+
+    def _all_community_ratings(self):
+        """
+        Returns the average review rating of every reviewed movie over all shards.
+        """
+        return self._review_averages()
+
+    def _review_averages(self, *where):
+        """
+        Sums the review ratings and counts per movie in every shard and divides the totals.
+        """
+        statement = (select(Review.movie_id, func.sum(Review.rating), func.count())
+                     .where(*where).group_by(Review.movie_id))
+        totals = {}
+        for rows in self._fan_out(lambda shard: shard.session.execute(statement).all()):
+            for movie_id, rating_sum, count in rows:
+                previous_sum, previous_count = totals.get(movie_id, (0.0, 0))
+                totals[movie_id] = (previous_sum + rating_sum, previous_count + count)
+        return {movie_id: rating_sum / count for movie_id, (rating_sum, count) in totals.items()}
+
+    # Trending movies
+    def get_trending_movies(self, limit=5, rows=False):
+        """
+        Retrieve the movies with the most favorites and reviews lately over all shards.
+
+        Each shard contributes its top limit * TRENDING_CANDIDATES counters, rescaled
+        to a common landmark and summed per movie. A movie that is in no shard's
+        candidates can be missed, which takes a near-uniform spread of its activity.
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of catalog Movie objects, most trending first.
+        """
+        def candidates(shard):
+            landmark = shard.session.execute(select(TrendLandmark.hours)).scalar()
+            top = shard.session.execute(
+                select(MovieTrend.movie_id, MovieTrend.score).where(MovieTrend.score >= PRUNE_BELOW)
+                .order_by(MovieTrend.score.desc()).limit(limit * TRENDING_CANDIDATES)).all()
+            return landmark, top
+        results = [(landmark, top) for landmark, top in self._fan_out(candidates) if landmark is not None]
+        if not results:
+            return []
+        reference = max(landmark for landmark, _ in results)
+        scores = Counter()
+        for landmark, top in results:
+            scale = 2.0 ** ((landmark - reference) / HALF_LIFE_HOURS)
+            for movie_id, score in top:
+                scores[movie_id] += score * scale
+        trending = heapq.nlargest(limit, scores, key=scores.get)
+        query = self.catalog.session.query(Movie).filter(Movie.id.in_(trending))
+        movies = {movie.id: movie for movie in (self.catalog._movie_rows(query) if rows else query.all())}
+        return [movies[movie_id] for movie_id in trending if movie_id in movies]
+
+    def rebuild_trending(self, movie_ids=None):
+        """
+        Recompute the trending counters of every shard from its favorites and reviews.
+
+        Args:
+            movie_ids (iterable, optional): The movies to recompute. Defaults to all.
+
+        Returns:
+            int: The number of counters stored, summed over the shards.
+        """
+        movie_ids = None if movie_ids is None else list(movie_ids)
+        return sum(shard.rebuild_trending(movie_ids) for shard in self.shards)
+
+    # Precomputed recommendations
+    def get_users_with_changed_favorites(self):
+        """
+        Retrieve the users whose favorites changed since their recommendations were generated.
+
+        Returns:
+            list: The IDs of the users needing new recommendations, from all shards.
+        """
+        return [user_id for user_ids in self._fan_out(lambda shard: shard.get_users_with_changed_favorites())
+                for user_id in user_ids]
+
+    def get_recommendation(self, user_id):
+        """
+        Retrieve the stored recommendations for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Recommendation: The Recommendation object if found, None otherwise.
+        """
+        return self._shard(user_id).get_recommendation(user_id)
+
+    def save_recommendation(self, user_id, recommendations):
+        """
+        Store (or replace) the recommendations for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+            recommendations (list): The recommended titles, one per entry.
+
+        Returns:
+            Recommendation: The stored Recommendation object.
+        """
+        return self._shard(user_id).save_recommendation(user_id, recommendations)
@@ -0,0 +1,239 @@
+"""
+This module computes content-based movie similarity: each movie becomes a feature
+vector of its genres, director, decade and rating, and its nearest neighbours by
+cosine similarity are found with batched NumPy operations.
+"""
+
+import numpy as np
+from datamanager.taste_profile import decade_of, split_directors
+
+# Weights of the feature blocks; a shared director or genre counts most
+GENRE_WEIGHT = 1.0
+DIRECTOR_WEIGHT = 1.0
+DECADE_WEIGHT = 0.6
+RATING_WEIGHT = 0.4
+
+# Neighbours stored per movie
+TOP_K = 10
+
+# Movies scored against all others per NumPy batch (bounds the batch x N score matrix)
+BATCH_SIZE = 256
+
+
+def _rating(value):
+    """
+    Returns a stored rating scaled to 0..1, or 0 if it is missing or not numeric.
+    """
+    try:
+        return min(max(float(value) / 10, 0.0), 1.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class MovieFeatures:
+    """
+    The feature vectors of a set of movies.
+
+    A movie's vector is [genre one-hot | director one-hot | decade one-hot | rating],
+    each block scaled by its weight. The genre block is kept as a dense matrix; the
+    director and decade blocks have a single non-zero per movie, so they are kept as
+    integer codes and their dot products become equality tests. This gives the exact
+    cosine of the full vectors without materializing a column per director.
+    """
+
+    def __init__(self, movies, genre_links):
+        """
+        Build the feature arrays.
+
+        Args:
+            movies (iterable): (id, director, year, rating) rows.
+            genre_links (iterable): (movie_id, genre_id) rows.
+        """
+        movies = sorted(movies, key=lambda movie: movie[0])  # Position order is ID order, for tie-breaking
+        self.ids = np.array([movie[0] for movie in movies], dtype=np.int64)
+        self.position = {int(movie_id): position for position, movie_id in enumerate(self.ids)}
+        self._genre_columns, self._director_codes, self._decade_codes = {}, {}, {}
+
+        genre_links = [(movie_id, genre_id) for movie_id, genre_id in genre_links if movie_id in self.position]
+        for _, genre_id in genre_links:
+            self._genre_columns.setdefault(genre_id, len(self._genre_columns))
+        self.genres = np.zeros((len(movies), max(len(self._genre_columns), 1)), dtype=np.float32)
+        self.directors = np.full(len(movies), -1, dtype=np.int64)
+        self.decades = np.full(len(movies), -1, dtype=np.int64)
+        self.ratings = np.zeros(len(movies), dtype=np.float64)
+        self.norms = np.zeros(len(movies), dtype=np.float64)
+        # Score and ID of the weakest neighbour in each movie's stored list, if the list
+        # is full; kept up to date by the caller through set_lists()
+        self.weakest = np.zeros(len(movies), dtype=np.float64)
+        self.weakest_ids = np.full(len(movies), -1, dtype=np.int64)
+        self._encode(range(len(movies)), movies, genre_links)
+
+    def _encode(self, positions, movies, genre_links):
+        """
+        Fill in the feature rows at the given positions from their movies' data.
+        """
+        positions = list(positions)
+        for position, (_, director, year, rating) in zip(positions, movies):
+            names = split_directors(director)
+            self.directors[position] = (self._director_codes.setdefault(names[0], len(self._director_codes))
+                                        if names else -1)
+            decade = decade_of(year)
+            self.decades[position] = (self._decade_codes.setdefault(decade, len(self._decade_codes))
+                                      if decade is not None else -1)
+            self.ratings[position] = _rating(rating)
+        self.genres[positions] = 0.0
+        for movie_id, genre_id in genre_links:
+            self.genres[self.position[movie_id], self._genre_columns[genre_id]] = 1.0
+        self.norms[positions] = np.sqrt(
+            GENRE_WEIGHT ** 2 * self.genres[positions].sum(axis=1, dtype=np.float64)
+            + DIRECTOR_WEIGHT ** 2 * (self.directors[positions] >= 0)
+            + DECADE_WEIGHT ** 2 * (self.decades[positions] >= 0)
+            + RATING_WEIGHT ** 2 * self.ratings[positions] ** 2
+        )
+
+    def patch(self, movies, genre_links, removed=()):
+        """
+        Update the features in place for a few changed movies, instead of rebuilding
+        them all. Costs O(changed) unless movies are added or removed, which also
+        copies the arrays once.
+
+        Args:
+            movies (iterable): (id, director, year, rating) rows of new or changed movies.
+            genre_links (iterable): All (movie_id, genre_id) rows of those movies.
+            removed (iterable, optional): IDs of deleted movies.
+        """
+        movies = sorted(movies, key=lambda movie: movie[0])
+        removed = [self.position[movie_id] for movie_id in removed if movie_id in self.position]
+        added = np.array([movie[0] for movie in movies if movie[0] not in self.position], dtype=np.int64)
+        if removed:
+            keep = np.ones(len(self), dtype=bool)
+            keep[removed] = False
+            for name in ('ids', 'genres', 'directors', 'decades', 'ratings', 'norms', 'weakest', 'weakest_ids'):
+                setattr(self, name, getattr(self, name)[keep])
+        if len(added):
+            at = np.searchsorted(self.ids, added)
+            self.ids = np.insert(self.ids, at, added)
+            self.genres = np.insert(self.genres, at, 0.0, axis=0)
+            self.directors = np.insert(self.directors, at, -1)
+            self.decades = np.insert(self.decades, at, -1)
+            self.ratings = np.insert(self.ratings, at, 0.0)
+            self.norms = np.insert(self.norms, at, 0.0)
+            self.weakest = np.insert(self.weakest, at, 0.0)
+            self.weakest_ids = np.insert(self.weakest_ids, at, -1)
+        if removed or len(added):
+            if not removed and at.min() == len(self.ids) - len(added):  # Appended after the highest ID
+                self.position.update((int(movie_id), len(self.ids) - len(added) + offset)
+                                     for offset, movie_id in enumerate(added))
+            else:
+                self.position = {int(movie_id): position for position, movie_id in enumerate(self.ids)}
+
+        genre_links = list(genre_links)
+        for _, genre_id in genre_links:
+            self._genre_columns.setdefault(genre_id, len(self._genre_columns))
+        if len(self._genre_columns) > self.genres.shape[1]:
+            extra = len(self._genre_columns) - self.genres.shape[1]
+            self.genres = np.hstack((self.genres, np.zeros((len(self), extra), dtype=np.float32)))
+        self._encode([self.position[movie[0]] for movie in movies], movies, genre_links)
+
+    def set_lists(self, neighbours, k=TOP_K):
+        """
+        Record the weakest neighbour of newly stored similar-movie lists.
+
+        Args:
+            neighbours (iterable): (movie ID, list of (neighbour ID, score)) pairs, most
+                similar first, as returned by top_k().
+            k (int, optional): The length of a full list. Defaults to TOP_K.
+        """
+        for movie_id, ranked in neighbours:
+            position = self.position[movie_id]
+            if len(ranked) >= k:
+                self.weakest_ids[position], self.weakest[position] = ranked[-1]
+            else:
+                self.weakest[position], self.weakest_ids[position] = 0.0, -1
+
+    def entered(self, positions, batch_size=BATCH_SIZE):
+        """
+        Find the stored lists that some movies now belong in: they beat the list's
+        weakest neighbour with a higher score, or the same score and a lower ID; any
+        positive score enters a list that is not full.
+
+        Args:
+            positions (list): Positions of the movies.
+            batch_size (int, optional): Movies scored per batch. Defaults to BATCH_SIZE.
+
+        Returns:
+            set: The IDs of the movies whose lists are entered.
+        """
+        entered = set()
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            scores = self.scores(batch)
+            ties = (scores == self.weakest) & (self.ids[batch, None] < self.weakest_ids)
+            entering = (((scores > self.weakest) | ties) & (scores > 0)).any(axis=0)
+            entered.update(self.ids[entering].tolist())
+        return entered
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, positions):
+        """
+        Cosine similarity of some movies to all movies.
+
+        Args:
+            positions (array-like): Positions (not IDs) of the query movies.
+
+        Returns:
+            ndarray: A len(positions) x len(self) matrix of similarities in 0..1.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        directors = self.directors[positions, None]
+        decades = self.decades[positions, None]
+        dot = (
+            GENRE_WEIGHT ** 2 * (self.genres[positions] @ self.genres.T).astype(np.float64)
+            + DIRECTOR_WEIGHT ** 2 * ((directors == self.directors) & (directors >= 0))
+            + DECADE_WEIGHT ** 2 * ((decades == self.decades) & (decades >= 0))
+            + RATING_WEIGHT ** 2 * np.outer(self.ratings[positions], self.ratings)
+        )
+        denominator = np.outer(self.norms[positions], self.norms)
+        return np.divide(dot, denominator, out=np.zeros_like(dot), where=denominator > 0)
+
+    def top_k(self, positions, k=TOP_K, batch_size=BATCH_SIZE):
+        """
+        Find each movie's k most similar other movies.
+
+        Args:
+            positions (iterable): Positions of the movies to find neighbours for.
+            k (int, optional): Neighbours per movie. Defaults to TOP_K.
+            batch_size (int, optional): Movies scored per batch. Defaults to BATCH_SIZE.
+
+        Returns:
+            dict: movie ID -> list of (neighbour ID, score), most similar first; only
+            neighbours with a positive score are listed.
+        """
+        positions = np.asarray(list(positions), dtype=np.int64)
+        k = min(k, len(self) - 1)
+        neighbours = {}
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            scores = self.scores(batch)
+            scores[np.arange(len(batch)), batch] = -1.0  # A movie is not its own neighbour
+            if k <= 0:
+                neighbours.update((int(self.ids[position]), []) for position in batch)
+                continue
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            kth = np.take_along_axis(scores, top, axis=1).min(axis=1)
+            # Rows with more than k movies at or above the k-th best score have ties at the
+            # cut; those go to the lowest IDs rather than to whatever the partition picked
+            ambiguous = (scores >= kth[:, None]).sum(axis=1) > k
+            for row, position in enumerate(batch):
+                chosen = top[row]
+                if ambiguous[row]:
+                    above = np.flatnonzero(scores[row] > kth[row])
+                    tied = np.flatnonzero(scores[row] == kth[row])[:k - len(above)]
+                    chosen = np.concatenate((above, tied))
+                chosen = chosen[scores[row, chosen] > 0]
+                chosen = chosen[np.lexsort((chosen, -scores[row, chosen]))]
+                neighbours[int(self.ids[position])] = list(zip(self.ids[chosen].tolist(),
+                                                               scores[row, chosen].tolist()))
+        return neighbours
@@ -2,15 +2,68 @@
 This module implements the SQLite data manager for the MovieWeb application.
 """
 
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from datamanager.data_models import db, User, Movie, UserMovie, Genre, Review
+import logging
+import threading
+import numpy as np
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy import (create_engine, event, func, or_, select, literal, union_all, cast, Integer,
+                        insert, update, delete, bindparam, union)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from datamanager.data_manager_interface import DataManagerInterface
+from datamanager.prefix_index import PrefixIndex
+from datamanager.search_indexes import MovieSearchIndexes
+from datamanager.data_models import (ensure_schema, User, Movie, UserMovie, Genre, Review,
+                                     Recommendation, RecommendationRun, UserStats, UserTaste, MovieSimilarity,
+                                     MovieTrend, TrendLandmark, movie_genre)
+from datamanager.movie_filters import MovieFilters, FacetCount, facet_label
+from datamanager.movie_dedup import find_duplicates
+from datamanager.timeline import ActivityEvent, KIND_RANK, decode_cursor, merge_timeline
+from datamanager.taste_profile import build_profile, split_directors, taste_keys
+from datamanager.movie_rows import MovieRow
+from datamanager.favorite_rows import favorites_statement, favorite_genres_statement, favorite_rows
+from datamanager.similarity import MovieFeatures, TOP_K, BATCH_SIZE
+from datamanager.trending import (FAVORITE_WEIGHT, REVIEW_WEIGHT, PRUNE_BELOW, event_hours, register_functions,
+                                  landmark_statement, landmark_query, bump_statement, prune_statement,
+                                  rebase_statements, decayed_scores)
 from sqlalchemy.orm.exc import NoResultFound
 
 
-class SQLiteDataManager:
+logger = logging.getLogger(__name__)
+
+# Seconds a connection waits for SQLite's single write lock before giving up
+BUSY_TIMEOUT = 15
+
+# IDs per DELETE ... WHERE id IN (...), below SQLite's bound parameter limit
+DELETE_BATCH_SIZE = 500
+
+# The columns selected for MovieRow results, in field order
+MOVIE_ROW_COLUMNS = (Movie.id, Movie.name, Movie.director, Movie.year, Movie.rating, Movie.poster)
+
+
+def _configure_connection(dbapi_connection, connection_record):
+    """
+    Puts every new connection into WAL mode so readers in other threads and worker
+    processes are not blocked by the single writer, and enforces foreign keys so
+    deletes cascade to dependent rows.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+    register_functions(dbapi_connection)
+
+
+class SQLiteDataManager(DataManagerInterface, MovieSearchIndexes):
     """
     SQLite implementation of the data manager interface.
+
+    Sessions are thread-local, so one instance can serve all threads of a worker.
+    The engine must not be shared across fork(); call dispose() in the child.
     """
 
     def __init__(self, db_file_name):
@@ -20,10 +73,103 @@ class SQLiteDataManager:
         Args:
             db_file_name (str): The name of the SQLite database file.
         """
-        self.engine = create_engine(f'sqlite:///{db_file_name}')
-        db.metadata.create_all(self.engine)  # Ensure tables are created
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        self.engine = create_engine(f'sqlite:///{db_file_name}',
+                                    connect_args={'timeout': BUSY_TIMEOUT, 'check_same_thread': False})
+        event.listen(self.engine, 'connect', _configure_connection)
+        with self.engine.begin() as connection:
+            ensure_schema(connection)  # Create tables unless the schema version matches
+        self.session = scoped_session(sessionmaker(bind=self.engine))
+        self._units = threading.local()  # Unit-of-work nesting depth and pending similarity refreshes per thread
+        self._features = None  # Similar-movie features, loaded on the first refresh and patched after
+        self._features_lock = threading.Lock()
+        self.title_index = PrefixIndex()
+        self.rebuild_title_index()
+
+    def rebuild_title_index(self):
+        """
+        Load all movies (with their favorite counts) into the autocomplete index.
+        """
+        rows = (
+            self.session.query(Movie.id, Movie.name, Movie.director, Movie.year, Movie.rating,
+                               func.count(UserMovie.user_id))
+            .outerjoin(UserMovie, UserMovie.movie_id == Movie.id)
+            .group_by(Movie.id)
+            .all()
+        )
+        self.title_index.build(rows)
+        self.session.remove()
+
+    def close_session(self):
+        """
+        Release the calling thread's session and return its connection to the pool.
+        """
+        self.session.remove()
+
+    def dispose(self):
+        """
+        Drop all pooled connections without closing them, for use in a freshly forked
+        child process: the parent keeps its connections, the child opens its own.
+        """
+        self.session.remove()
+        self.engine.dispose(close=False)
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Group the writes of several data manager calls into one transaction.
+
+        Inside the block, mutating methods flush instead of committing (so new rows
+        still get their IDs), and the outermost block commits once on exit, costing
+        one fsync instead of one per call. If the block raises, or a call fails inside
+        it, everything since the block started is rolled back. Units nest.
+
+            with data_manager.unit_of_work():
+                for review in reviews:
+                    data_manager.add_review(**review)
+        """
+        depth = getattr(self._units, 'depth', 0)
+        self._units.depth = depth + 1
+        try:
+            yield self
+            if depth == 0:
+                self.session.commit()
+        except BaseException:
+            if depth == 0:
+                self.session.rollback()
+                self._units.similar = set()
+                # The in-memory indexes already saw the rolled-back writes
+                self._fuzzy_index = None
+                self.rebuild_title_index()
+            raise
+        finally:
+            self._units.depth = depth
+        if depth == 0:
+            self._refresh_pending_similarity()
+
+    def _commit(self):
+        """
+        Commit the current write, or only flush it inside a unit of work.
+        """
+        if getattr(self._units, 'depth', 0):
+            self.session.flush()
+        else:
+            self.session.commit()
+
+    def _rollback(self):
+        """
+        Roll back a failed write. Inside a unit of work the whole unit is lost, so the
+        error being handled is re-raised instead of being swallowed by the caller.
+        """
+        self.session.rollback()
+        if getattr(self._units, 'depth', 0):
+            raise
+
+    def _movie_rows(self, query):
+        """
+        Run a Movie query as a read-only projection: only the MovieRow columns are
+        selected, and the rows bypass ORM hydration and the identity map.
+        """
+        return list(map(MovieRow._make, query.with_entities(*MOVIE_ROW_COLUMNS)))
 
     # CRUD operations for User
     def get_all_users(self):
@@ -35,19 +181,20 @@ class SQLiteDataManager:
         """
         return self.session.query(User).all()
 
-    def add_user(self, name):
+    def add_user(self, name, user_id=None):
         """
         Add a new user to the database.
 
         Args:
             name (str): The name of the user.
+            user_id (int, optional): Store the user under this ID instead of the next free one.
 
         Returns:
             User: The newly created User object.
         """
-        new_user = User(name=name)
+        new_user = User(id=user_id, name=name)
         self.session.add(new_user)
-        self.session.commit()
+        self._commit()
         return new_user
 
     def get_user_by_id(self, user_id):
@@ -72,9 +219,9 @@ class SQLiteDataManager:
         """
         return self.session.query(Movie).all()
 
-    def add_movie(self, name, director=None, year=None, rating=None, poster=None, genres=[]):
+    def add_movie(self, name, director=None, year=None, rating=None, poster=None, genres=[], imdb_id=None):
         """
-        Add a new movie to the database.
+        Add a new movie to the database, or return the stored one with the same imdbID.
 
         Args:
             name (str): The name of the movie.
@@ -83,17 +230,113 @@ class SQLiteDataManager:
             rating (float, optional): The rating of the movie.
             poster (str, optional): The URL of the movie poster.
             genres (list, optional): A list of Genre objects for the movie.
+            imdb_id (str, optional): OMDb's imdbID of the movie.
 
         Returns:
-            Movie: The newly created Movie object.
+            Movie: The newly created Movie object, or the existing one for imdb_id.
         """
-        new_movie = Movie(name=name, director=director, year=year, rating=rating, poster=poster)
+        if imdb_id:
+            existing_movie = self.get_movie_by_imdb_id(imdb_id)
+            if existing_movie:
+                return existing_movie
+        new_movie = Movie(name=name, director=director, year=year, rating=rating, poster=poster, imdb_id=imdb_id)
         for genre in genres:
             new_movie.genres.append(genre)
         self.session.add(new_movie)
-        self.session.commit()
+        try:
+            self._commit()
+        except IntegrityError:
+            # Another request stored the same film in the meantime
+            self._rollback()
+            existing_movie = self.get_movie_by_imdb_id(imdb_id) if imdb_id else None
+            if existing_movie is None:
+                raise
+            return existing_movie
+        self._index_movie(new_movie)
+        self._touch_similarity([new_movie.id])
         return new_movie
 
+    def get_movie_by_imdb_id(self, imdb_id):
+        """
+        Retrieve a movie by its imdbID from the database.
+
+        Args:
+            imdb_id (str): OMDb's imdbID of the movie.
+
+        Returns:
+            Movie: The Movie object if found, None otherwise.
+        """
+        return self.session.query(Movie).filter_by(imdb_id=imdb_id).first()
+
+    def get_movies_by_names(self, names):
+        """
+        Retrieve the movies with any of the given names, ignoring case, in one query.
+
+        Args:
+            names (iterable): The movie names to look up.
+
+        Returns:
+            list: A list of matching Movie objects (several per name for remakes).
+        """
+        names = {name.lower() for name in names}
+        if not names:
+            return []
+        return self.session.query(Movie).filter(func.lower(Movie.name).in_(names)).all()
+
+    def merge_duplicate_movies(self):
+        """
+        Collapse duplicate movie rows into one canonical row per film.
+
+        Duplicates share an imdbID, or a normalized name and year (see movie_dedup).
+        Favorites, genre links and reviews of the copies are moved to the canonical
+        row with one bulk statement per table, and the copies are deleted, all in
+        one transaction.
+
+        Returns:
+            int: The number of duplicate rows removed.
+        """
+        rows = self.session.query(Movie.id, Movie.name, Movie.year, Movie.imdb_id).all()
+        self.session.remove()
+        duplicates = find_duplicates(rows)
+        if not duplicates:
+            return 0
+        mapping = [{'duplicate': duplicate, 'canonical': canonical} for duplicate, canonical in duplicates.items()]
+        similar_lists = self._lists_containing(duplicates)
+
+        with self.engine.begin() as connection:
+            # Cached taste profiles of everyone linked to a copy are rebuilt on their next read
+            connection.execute(delete(UserStats.__table__).where(UserStats.user_id.in_(union(
+                select(UserMovie.user_id).where(UserMovie.movie_id == bindparam('duplicate')),
+                select(Review.user_id).where(Review.movie_id == bindparam('duplicate')),
+            ))), mapping)
+            # Link tables: copy links to the canonical row (skipping ones it has), then drop the copies' links
+            connection.execute(
+                insert(UserMovie.__table__).prefix_with('OR IGNORE').from_select(
+                    ['user_id', 'movie_id', 'date_added'],
+                    select(UserMovie.user_id, bindparam('canonical'), UserMovie.date_added)
+                    .where(UserMovie.movie_id == bindparam('duplicate'))),
+                mapping)
+            connection.execute(
+                insert(movie_genre).prefix_with('OR IGNORE').from_select(
+                    ['movie_id', 'genre_id'],
+                    select(bindparam('canonical'), movie_genre.c.genre_id)
+                    .where(movie_genre.c.movie_id == bindparam('duplicate'))),
+                mapping)
+            connection.execute(delete(UserMovie.__table__).where(UserMovie.movie_id == bindparam('duplicate')),
+                               mapping)
+            connection.execute(delete(movie_genre).where(movie_genre.c.movie_id == bindparam('duplicate')),
+                               mapping)
+            connection.execute(update(Review.__table__).where(Review.movie_id == bindparam('duplicate'))
+                               .values(movie_id=bindparam('canonical')), mapping)
+            connection.execute(delete(Movie.__table__).where(Movie.id == bindparam('duplicate')), mapping)
+
+        for duplicate in duplicates:
+            self._unindex_movie(duplicate)
+        self.rebuild_title_index()  # Favorite counts of the canonical rows changed
+        self.rebuild_trending(set(duplicates.values()))  # Canonical rows gained favorites and reviews
+        self._touch_similarity(set(duplicates.values()) | similar_lists)  # Canonical rows gained genre links
+        return len(duplicates)
+
     def get_movie_by_id(self, movie_id):
         """
         Retrieve a movie by its ID from the database.
@@ -123,7 +366,12 @@ class SQLiteDataManager:
         for key, value in kwargs.items():
             if hasattr(movie, key):
                 setattr(movie, key, value)
-        self.session.commit()
+        if {'director', 'year', 'genres'} & kwargs.keys():
+            self._invalidate_user_stats([movie_id])
+        self._commit()
+        self._index_movie(movie)
+        if {'director', 'year', 'rating', 'genres'} & kwargs.keys():
+            self._touch_similarity([movie_id])
         return movie
 
     # CRUD operations for UserMovie (relationship table)
@@ -140,28 +388,52 @@ class SQLiteDataManager:
         """
         existing_favorite = self.session.query(UserMovie).filter_by(user_id=user_id, movie_id=movie_id).first()
         if not existing_favorite:
-            favorite = UserMovie(user_id=user_id, movie_id=movie_id)
+            favorite = UserMovie(user_id=user_id, movie_id=movie_id, date_added=datetime.now(UTC))
             self.session.add(favorite)
-            self.session.commit()
+            self._count_favorite(user_id, movie_id, 1)
+            self._record_trend([(movie_id, FAVORITE_WEIGHT, favorite.date_added)])
+            self._commit()
+            self.title_index.add_popularity(movie_id, 1)
             return favorite
         return existing_favorite
 
-    def get_favorite_movies_by_user(self, user_id):
+    def get_favorite_movies_by_user(self, user_id, rows=False):
         """
         Retrieve all favorite movies for a specific user.
 
         Args:
             user_id (int): The ID of the user.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
 
         Returns:
             list: A list of Movie objects that are favorites of the specified user.
         """
-        return (
+        query = (
             self.session.query(Movie)
             .join(UserMovie)
             .filter(UserMovie.user_id == user_id)
-            .all()
         )
+        return self._movie_rows(query) if rows else query.all()
+
+    def get_user_favorite_movies(self, user_id):
+        """
+        Alias of get_favorite_movies_by_user required by DataManagerInterface.
+        """
+        return self.get_favorite_movies_by_user(user_id)
+
+    def get_favorite_details(self, user_id):
+        """
+        Retrieve a user's favorites with when they were added, the user's own rating
+        and their genres, for building recommendation prompts.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            list: FavoriteRow tuples, most recently added first.
+        """
+        return favorite_rows(self.session.execute(favorites_statement(user_id)),
+                             self.session.execute(favorite_genres_statement(user_id)))
 
     def get_users_by_favorite_movie(self, movie_id):
         """
@@ -191,7 +463,191 @@ class SQLiteDataManager:
         favorite = self.session.query(UserMovie).filter_by(user_id=user_id, movie_id=movie_id).first()
         if favorite:
             self.session.delete(favorite)
-            self.session.commit()
+            self._count_favorite(user_id, movie_id, -1)
+            self._record_trend([(movie_id, -FAVORITE_WEIGHT, favorite.date_added)])
+            self._commit()
+            self.title_index.add_popularity(movie_id, -1)
+
+    # Taste profile
+    def get_user_stats(self, user_id):
+        """
+        Retrieve a user's taste profile: top genres and directors of their favorites,
+        favorites per decade, and their review count and average rating.
+
+        The profile is computed with aggregate queries on first use and cached in the
+        user_stats/user_taste tables, which the write methods then update incrementally.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            TasteProfile: The profile, or None if the user does not exist.
+        """
+        totals = (self.session.query(UserStats.favorite_count, UserStats.review_count, UserStats.rating_sum)
+                  .filter(UserStats.user_id == user_id).first())
+        if totals is None:
+            totals = self._build_user_stats(user_id)
+            if totals is None:
+                return None
+        counts = (self.session.query(UserTaste.dimension, UserTaste.value, UserTaste.count)
+                  .filter(UserTaste.user_id == user_id, UserTaste.count > 0).all())
+        genre_ids = [int(value) for dimension, value, _ in counts if dimension == 'genre']
+        genre_names = dict(self.session.query(Genre.id, Genre.name).filter(Genre.id.in_(genre_ids)))
+        return build_profile(*totals, counts, genre_names)
+
+    def _build_user_stats(self, user_id):
+        """
+        Compute a user's profile counters from the favorites and reviews and cache them.
+
+        The placeholder row is inserted first, so the aggregates run under SQLite's
+        write lock and no favorite or review can slip in between them and the cache.
+
+        Returns:
+            tuple: (favorite count, review count, rating sum), or None for unknown users.
+        """
+        try:
+            created = self.session.execute(
+                sqlite_insert(UserStats.__table__)
+                .values(user_id=user_id, favorite_count=0, review_count=0, rating_sum=0.0)
+                .on_conflict_do_nothing()
+            ).rowcount
+            if created:
+                favorites = self.session.query(UserMovie).filter(UserMovie.user_id == user_id)
+                favorite_count = favorites.count()
+                review_count, rating_sum = (self.session.query(func.count(Review.id),
+                                                               func.coalesce(func.sum(Review.rating), 0.0))
+                                            .filter(Review.user_id == user_id).one())
+                counts = Counter()
+                for genre_id, count in (self.session.query(movie_genre.c.genre_id, func.count())
+                                        .join(UserMovie, UserMovie.movie_id == movie_genre.c.movie_id)
+                                        .filter(UserMovie.user_id == user_id).group_by(movie_genre.c.genre_id)):
+                    counts['genre', str(genre_id)] += count
+                for director, count in (self.session.query(Movie.director, func.count())
+                                        .join(UserMovie).filter(UserMovie.user_id == user_id)
+                                        .group_by(Movie.director)):
+                    for name in dict.fromkeys(split_directors(director)):
+                        counts['director', name] += count
+                decade = cast(Movie.year, Integer) // 10 * 10
+                for year, count in (self.session.query(decade, func.count())
+                                    .join(UserMovie).filter(UserMovie.user_id == user_id,
+                                                            func.typeof(Movie.year).in_(('integer', 'real')))
+                                    .group_by(decade)):
+                    counts['decade', str(year)] += count
+                if counts:
+                    self.session.execute(insert(UserTaste.__table__), [
+                        {'user_id': user_id, 'dimension': dimension, 'value': value, 'count': count}
+                        for (dimension, value), count in counts.items()
+                    ])
+                self.session.execute(update(UserStats.__table__).where(UserStats.user_id == user_id).values(
+                    favorite_count=favorite_count, review_count=review_count, rating_sum=rating_sum))
+            self._commit()
+        except IntegrityError:
+            self._rollback()
+            return None
+        return (self.session.query(UserStats.favorite_count, UserStats.review_count, UserStats.rating_sum)
+                .filter(UserStats.user_id == user_id).one())
+
+    def _bump_user_stats(self, user_id, **deltas):
+        """
+        Add to a user's cached totals in the current transaction, if the profile has been built.
+
+        Returns:
+            bool: True if the user has a cached profile.
+        """
+        table = UserStats.__table__
+        result = self.session.execute(update(table).where(table.c.user_id == user_id).values(
+            {name: table.c[name] + delta for name, delta in deltas.items()}))
+        return result.rowcount > 0
+
+    def _count_favorite(self, user_id, movie_id, delta):
+        """
+        Add a favorite's genres, directors and decade to (or remove them from) the
+        user's cached profile.
+        """
+        if not self._bump_user_stats(user_id, favorite_count=delta):
+            return  # Built from the aggregates on first read
+        movie = self.session.get(Movie, movie_id)
+        if movie is None:
+            return
+        keys = taste_keys((genre.id for genre in movie.genres), movie.director, movie.year)
+        if keys:
+            table = UserTaste.__table__
+            statement = sqlite_insert(table).on_conflict_do_update(
+                index_elements=[table.c.user_id, table.c.dimension, table.c.value],
+                set_={'count': table.c.count + delta})
+            self.session.execute(statement, [
+                {'user_id': user_id, 'dimension': dimension, 'value': value, 'count': delta}
+                for dimension, value in keys
+            ])
+
+    def _invalidate_user_stats(self, movie_ids):
+        """
+        Drop the cached profiles of users with favorites or reviews among the given
+        movies (a list or a SELECT of IDs), for changes too broad to apply incrementally.
+        """
+        users = union(select(UserMovie.user_id).where(UserMovie.movie_id.in_(movie_ids)),
+                      select(Review.user_id).where(Review.movie_id.in_(movie_ids)))
+        self.session.execute(delete(UserStats.__table__).where(UserStats.user_id.in_(users)))
+
+    # Activity timeline
+    @staticmethod
+    def _after_cursor(kind, timestamp_column, key_column, cursor):
+        """
+        WHERE clause selecting the events of one kind that come after the cursor
+        in timeline order (timestamp, kind, key descending).
+        """
+        if cursor is None:
+            return literal(True)
+        timestamp, kind_rank, key = cursor
+        if KIND_RANK[kind] < kind_rank:
+            return timestamp_column <= timestamp
+        if KIND_RANK[kind] > kind_rank:
+            return timestamp_column < timestamp
+        return or_(timestamp_column < timestamp, (timestamp_column == timestamp) & (key_column < key))
+
+    def get_user_timeline(self, user_id, limit=20, cursor=None):
+        """
+        Retrieve one page of a user's favorites and reviews, newest first.
+
+        Each kind is read with its own index-ordered query limited to the page size,
+        and the two are merged lazily, so a page costs the same however long the
+        user's history is.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The page size. Defaults to 20.
+            cursor (str, optional): The cursor returned with the previous page.
+
+        Returns:
+            tuple: (list of ActivityEvent, cursor for the next page or None).
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        favorites = (
+            self.session.query(UserMovie.date_added, UserMovie.movie_id, Movie.name)
+            .join(Movie, Movie.id == UserMovie.movie_id)
+            .filter(UserMovie.user_id == user_id, UserMovie.date_added.isnot(None),
+                    self._after_cursor('favorite', UserMovie.date_added, UserMovie.movie_id, position))
+            .order_by(UserMovie.date_added.desc(), UserMovie.movie_id.desc())
+            .limit(limit + 1)
+        )
+        reviews = (
+            self.session.query(Review.date_posted, Review.id, Review.movie_id, Movie.name, Review.rating,
+                               Review.text)
+            .join(Movie, Movie.id == Review.movie_id)
+            .filter(Review.user_id == user_id, Review.date_posted.isnot(None),
+                    self._after_cursor('review', Review.date_posted, Review.id, position))
+            .order_by(Review.date_posted.desc(), Review.id.desc())
+            .limit(limit + 1)
+        )
+        return merge_timeline([
+            (ActivityEvent('favorite', date_added, movie_id, movie_id, name, None, None)
+             for date_added, movie_id, name in favorites),
+            (ActivityEvent('review', date_posted, review_id, movie_id, name, rating, text)
+             for date_posted, review_id, movie_id, name, rating, text in reviews),
+        ], limit)
 
     # CRUD operations for Genre
     def get_all_genres(self):
@@ -215,7 +671,7 @@ class SQLiteDataManager:
         """
         new_genre = Genre(name=name)
         self.session.add(new_genre)
-        self.session.commit()
+        self._commit()
         return new_genre
 
     def get_genre_by_id(self, genre_id):
@@ -256,7 +712,7 @@ class SQLiteDataManager:
         genre = self.session.query(Genre).get(genre_id)
         if genre:
             genre.name = new_name
-            self.session.commit()
+            self._commit()
             return genre
         return None
 
@@ -267,13 +723,31 @@ class SQLiteDataManager:
         Args:
             genre_id (int): The ID of the genre to delete.
         """
-        genre = self.session.query(Genre).get(genre_id)
-        if genre:
-            self.session.delete(genre)
-            self.session.commit()
+        movie_ids = [movie_id for movie_id, in self.session.query(movie_genre.c.movie_id)
+                     .filter(movie_genre.c.genre_id == genre_id)]
+        self._invalidate_user_stats(select(movie_genre.c.movie_id).where(movie_genre.c.genre_id == genre_id))
+        self.session.query(Genre).filter_by(id=genre_id).delete(synchronize_session=False)
+        self._commit()
+        self._touch_similarity(movie_ids)
+
+    def get_movies_by_genre(self, genre_id, rows=False):
+        """
+        Retrieve all movies of a genre.
+
+        Args:
+            genre_id (int): The ID of the genre.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects in the genre.
+        """
+        query = (self.session.query(Movie)
+                 .join(movie_genre, movie_genre.c.movie_id == Movie.id)
+                 .filter(movie_genre.c.genre_id == genre_id))
+        return self._movie_rows(query) if rows else query.all()
 
     # CRUD operations for Review
-    def add_review(self, text, rating, user_id, movie_id):
+    def add_review(self, text, rating, user_id, movie_id, review_id=None):
         """
         Add a new review to the database.
 
@@ -282,13 +756,17 @@ class SQLiteDataManager:
             rating (float): The rating given in the review.
             user_id (int): The ID of the user who wrote the review.
             movie_id (int): The ID of the movie being reviewed.
+            review_id (int, optional): Store the review under this ID instead of the next free one.
 
         Returns:
             Review: The newly created Review object.
         """
-        new_review = Review(text=text, rating=rating, user_id=user_id, movie_id=movie_id)
+        new_review = Review(id=review_id, text=text, rating=rating, user_id=user_id, movie_id=movie_id,
+                            date_posted=datetime.now(UTC))
         self.session.add(new_review)
-        self.session.commit()
+        self._bump_user_stats(user_id, review_count=1, rating_sum=rating)
+        self._record_trend([(movie_id, REVIEW_WEIGHT, new_review.date_posted)])
+        self._commit()
         return new_review
 
     def get_reviews_by_movie(self, movie_id):
@@ -332,8 +810,9 @@ class SQLiteDataManager:
             if new_text:
                 review.text = new_text
             if new_rating:
+                self._bump_user_stats(review.user_id, rating_sum=new_rating - review.rating)
                 review.rating = new_rating
-            self.session.commit()
+            self._commit()
             return review
         return None
 
@@ -347,7 +826,9 @@ class SQLiteDataManager:
         review = self.session.query(Review).get(review_id)
         if review:
             self.session.delete(review)
-            self.session.commit()
+            self._bump_user_stats(review.user_id, review_count=-1, rating_sum=-review.rating)
+            self._record_trend([(review.movie_id, -REVIEW_WEIGHT, review.date_posted)])
+            self._commit()
 
     def add_movie_to_genre(self, movie_id, genre_id):
         """
@@ -361,7 +842,9 @@ class SQLiteDataManager:
         genre = self.get_genre_by_id(genre_id)
         if movie and genre:
             movie.genres.append(genre)
-            self.session.commit()
+            self._invalidate_user_stats([movie_id])
+            self._commit()
+            self._touch_similarity([movie_id])
 
     def remove_movie_from_genre(self, movie_id, genre_id):
         """
@@ -375,7 +858,9 @@ class SQLiteDataManager:
         genre = self.get_genre_by_id(genre_id)
         if movie and genre:
             movie.genres.remove(genre)
-            self.session.commit()
+            self._invalidate_user_stats([movie_id])
+            self._commit()
+            self._touch_similarity([movie_id])
 
     def delete_movie(self, movie_id):
         """
@@ -388,60 +873,641 @@ class SQLiteDataManager:
             bool: True if the movie was successfully deleted, False otherwise.
         """
         try:
-            movie = self.session.query(Movie).get(movie_id)
-            if movie:
-                # Remove all relationships with users
-                self.session.query(UserMovie).filter_by(movie_id=movie_id).delete()
-
-                # Remove all reviews for this movie
-                self.session.query(Review).filter_by(movie_id=movie_id).delete()
-
-                # Remove the movie itself
-                self.session.delete(movie)
-                self.session.commit()
-                return True
-            return False
+            # Favorites, reviews and genre links go with it (ON DELETE CASCADE)
+            self._invalidate_user_stats([movie_id])
+            similar_lists = self._lists_containing([movie_id])
+            deleted = self.session.query(Movie).filter_by(id=movie_id).delete(synchronize_session=False)
+            self._commit()
+            if deleted:
+                self._unindex_movie(movie_id)
+                self._touch_similarity(similar_lists)
+            return bool(deleted)
         except Exception as e:
-            self.session.rollback()
-            print(f"Error in delete_movie: {str(e)}")
+            self._rollback()
+            logger.exception("Error in delete_movie for movie %s: %s", movie_id, e)
             return False
 
-    def search_movies(self, query):
+    def delete_movies(self, movie_ids):
+        """
+        Delete many movies and their favorites, reviews and genre links in one transaction.
+
+        Args:
+            movie_ids (iterable): The IDs of the movies to delete.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        movie_ids = list(dict.fromkeys(movie_ids))
+        similar_lists = self._lists_containing(movie_ids)
+        deleted = 0
+        try:
+            for start in range(0, len(movie_ids), DELETE_BATCH_SIZE):
+                batch = movie_ids[start:start + DELETE_BATCH_SIZE]
+                self._invalidate_user_stats(batch)
+                deleted += self.session.query(Movie).filter(Movie.id.in_(batch)).delete(synchronize_session=False)
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        for movie_id in movie_ids:
+            self._unindex_movie(movie_id)
+        self._touch_similarity(similar_lists)
+        return deleted
+
+    def delete_movies_matching(self, filters):
+        """
+        Delete all movies matching the /movies filters, with their dependent rows.
+
+        Args:
+            filters (MovieFilters): Genre, year, OMDb rating and community rating filters.
+
+        Returns:
+            int: The number of movies deleted.
+        """
+        where = [clause for clauses in self._filter_clauses(filters).values() for clause in clauses]
+        if not where:
+            raise ValueError("Refusing to delete movies without a filter")
+        try:
+            movie_ids = [movie_id for movie_id, in self.session.query(Movie.id).filter(*where)]
+            similar_lists = self._lists_containing(movie_ids)
+            self._invalidate_user_stats(select(Movie.id).where(*where))
+            deleted = self.session.query(Movie).filter(*where).delete(synchronize_session=False)
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        for movie_id in movie_ids:
+            self._unindex_movie(movie_id)
+        self._touch_similarity(similar_lists)
+        return deleted
+
+    def delete_users(self, user_ids):
+        """
+        Delete many users and their favorites, reviews and recommendations in one transaction.
+
+        Args:
+            user_ids (iterable): The IDs of the users to delete.
+
+        Returns:
+            int: The number of users deleted.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        favorites = Counter()  # Popularity lost per movie, for the autocomplete index
+        deleted = 0
+        try:
+            for start in range(0, len(user_ids), DELETE_BATCH_SIZE):
+                batch = user_ids[start:start + DELETE_BATCH_SIZE]
+                added = (self.session.query(UserMovie.movie_id, UserMovie.date_added)
+                         .filter(UserMovie.user_id.in_(batch)).all())
+                posted = self.session.query(Review.movie_id, Review.date_posted).filter(Review.user_id.in_(batch)).all()
+                favorites.update(movie_id for movie_id, _ in added)
+                self._record_trend([(movie_id, -FAVORITE_WEIGHT, date_added) for movie_id, date_added in added]
+                                   + [(movie_id, -REVIEW_WEIGHT, date_posted) for movie_id, date_posted in posted])
+                deleted += self.session.query(User).filter(User.id.in_(batch)).delete(synchronize_session=False)
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        for movie_id, count in favorites.items():
+            self.title_index.add_popularity(movie_id, -count)
+        return deleted
+
+    def search_movies(self, query, rows=False):
         """
         Search for movies based on a query string.
 
         Args:
             query (str): The search query.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
 
         Returns:
             list: A list of Movie objects that match the search query.
         """
         search = f"%{query}%"
-        return self.session.query(Movie).filter(
+        movies = self.session.query(Movie).filter(
             (Movie.name.ilike(search)) |
             (Movie.director.ilike(search))
-        ).all()
+        )
+        return self._movie_rows(movies) if rows else movies.all()
+
+    def _fuzzy_index_rows(self):
+        """
+        Stream (id, name, director) rows for building the trigram index.
+        """
+        return self.session.query(Movie.id, Movie.name, Movie.director).yield_per(10000)
+
+    def fuzzy_search_movies(self, query, limit=20, rows=False):
+        """
+        Search for movies by name or director, tolerating typos ("Incepton", "Nolen").
+
+        Candidates come from the in-memory trigram index; only the matching movies
+        are then loaded, in one query.
+
+        Args:
+            query (str): The search query.
+            limit (int, optional): The maximum number of results. Defaults to 20.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: Matching Movie objects, best match first.
+        """
+        ranked_ids = [movie_id for movie_id, _ in self.fuzzy_index.search(query, limit=limit)]
+        if not ranked_ids:
+            return []
+        matches = self.session.query(Movie).filter(Movie.id.in_(ranked_ids))
+        movies = {movie.id: movie for movie in (self._movie_rows(matches) if rows else matches)}
+        return [movies[movie_id] for movie_id in ranked_ids if movie_id in movies]
+
+    # Faceted movie listing
+    def _community_ratings(self):
+        """
+        Returns a subquery of (movie_id, average) review ratings, for the community
+        rating filter and sort order.
+        """
+        return select(Review.movie_id, func.avg(Review.rating).label('average')).group_by(Review.movie_id).subquery()
+
+    def _filter_clauses(self, filters):
+        """
+        Translate MovieFilters into WHERE clauses keyed by facet, so facet counts can
+        leave out their own dimension.
+        """
+        numeric_year = func.typeof(Movie.year).in_(('integer', 'real'))
+        numeric_rating = func.typeof(Movie.rating).in_(('integer', 'real'))
+        clauses = {}
+        if filters.genre_ids:
+            clauses['genre'] = [Movie.id.in_(
+                select(movie_genre.c.movie_id).where(movie_genre.c.genre_id.in_(filters.genre_ids))
+            )]
+        if filters.year_min is not None or filters.year_max is not None:
+            clauses['decade'] = [numeric_year]
+            if filters.year_min is not None:
+                clauses['decade'].append(Movie.year >= filters.year_min)
+            if filters.year_max is not None:
+                clauses['decade'].append(Movie.year <= filters.year_max)
+        if filters.rating_min is not None or filters.rating_max is not None:
+            clauses['rating'] = [numeric_rating]
+            if filters.rating_min is not None:
+                clauses['rating'].append(Movie.rating >= filters.rating_min)
+            if filters.rating_max is not None:
+                clauses['rating'].append(Movie.rating <= filters.rating_max)
+        if filters.community_min is not None:
+            community = self._community_ratings()
+            clauses['community'] = [Movie.id.in_(
+                select(community.c.movie_id).where(community.c.average >= filters.community_min)
+            )]
+        return clauses
+
+    def filter_movies(self, filters=MovieFilters(), sort='name', page=1, per_page=24, rows=False):
+        """
+        Retrieve one page of movies matching the filters, in the requested order.
 
-    def get_recently_added_movies(self, limit=5):
+        Args:
+            filters (MovieFilters, optional): Genre, year, OMDb rating and community rating filters.
+            sort (str, optional): A key of movie_filters.SORT_OPTIONS. Defaults to 'name'.
+            page (int, optional): The 1-based page number. Defaults to 1.
+            per_page (int, optional): Movies per page. Defaults to 24.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            tuple: (list of Movie objects, total number of matching movies).
+        """
+        where = [clause for clauses in self._filter_clauses(filters).values() for clause in clauses]
+        query = self.session.query(Movie).filter(*where)
+        total = query.count()
+
+        if sort == 'community_desc':
+            community = self._community_ratings()
+            query = (query.outerjoin(community, community.c.movie_id == Movie.id)
+                     .order_by(community.c.average.is_(None), community.c.average.desc(), Movie.id))
+        else:
+            query = query.order_by(*{
+                'newest': [Movie.id.desc()],
+                'year_desc': [Movie.year.is_(None), Movie.year.desc(), Movie.id],
+                'year_asc': [Movie.year.is_(None), Movie.year.asc(), Movie.id],
+                'rating_desc': [Movie.rating.is_(None), Movie.rating.desc(), Movie.id],
+            }.get(sort, [Movie.name, Movie.id]))
+        query = query.offset((max(page, 1) - 1) * per_page).limit(per_page)
+        return (self._movie_rows(query) if rows else query.all()), total
+
+    def get_community_ratings(self, movie_ids):
+        """
+        Retrieve the average review rating for each of the given movies.
+
+        Args:
+            movie_ids (list): The IDs of the movies.
+
+        Returns:
+            dict: movie_id -> average rating, for movies that have reviews.
+        """
+        rows = (self.session.query(Review.movie_id, func.avg(Review.rating))
+                .filter(Review.movie_id.in_(movie_ids)).group_by(Review.movie_id).all())
+        return dict(rows)
+
+    def get_movie_facets(self, filters=MovieFilters()):
+        """
+        Count the movies per genre, decade and whole OMDb rating in one aggregate query.
+
+        Each facet's counts apply all filters except the facet's own, so they show
+        how many movies selecting that value would match.
+
+        Args:
+            filters (MovieFilters, optional): The active filters.
+
+        Returns:
+            dict: 'genre', 'decade' and 'rating' -> list of FacetCount.
+        """
+        clauses = self._filter_clauses(filters)
+
+        def where(facet):
+            return [clause for name, group in clauses.items() if name != facet for clause in group]
+
+        decade = cast(Movie.year, Integer) // 10 * 10
+        rating = cast(Movie.rating, Integer)
+        statement = union_all(
+            select(literal('genre').label('facet'), Genre.id.label('value'), Genre.name.label('name'),
+                   func.count(Movie.id.distinct()).label('count'))
+            .select_from(Movie)
+            .join(movie_genre, movie_genre.c.movie_id == Movie.id)
+            .join(Genre, Genre.id == movie_genre.c.genre_id)
+            .where(*where('genre'))
+            .group_by(Genre.id, Genre.name),
+            select(literal('decade'), decade, literal(None), func.count())
+            .where(func.typeof(Movie.year).in_(('integer', 'real')), *where('decade'))
+            .group_by(decade),
+            select(literal('rating'), rating, literal(None), func.count())
+            .where(func.typeof(Movie.rating).in_(('integer', 'real')), *where('rating'))
+            .group_by(rating),
+        )
+        facets = {'genre': [], 'decade': [], 'rating': []}
+        for facet, value, name, count in self.session.execute(statement):
+            facets[facet].append(FacetCount(value, facet_label(facet, value, name), count))
+        facets['genre'].sort(key=lambda facet_count: facet_count.label)
+        facets['decade'].sort(key=lambda facet_count: facet_count.value, reverse=True)
+        facets['rating'].sort(key=lambda facet_count: facet_count.value, reverse=True)
+        return facets
+
+    def get_recently_added_movies(self, limit=5, rows=False):
         """
         Retrieve the most recently added movies.
 
         Args:
             limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
 
         Returns:
             list: A list of the most recently added Movie objects.
         """
-        return self.session.query(Movie).order_by(Movie.id.desc()).limit(limit).all()
+        query = self.session.query(Movie).order_by(Movie.id.desc()).limit(limit)
+        return self._movie_rows(query) if rows else query.all()
 
-    def get_top_rated_movies(self, limit=5):
+    def get_top_rated_movies(self, limit=5, rows=False):
         """
         Retrieve the top-rated movies.
 
         Args:
             limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
 
         Returns:
             list: A list of the top-rated Movie objects.
         """
-        return self.session.query(Movie).order_by(Movie.rating.desc()).limit(limit).all()
\ No newline at end of file
+        query = self.session.query(Movie).order_by(Movie.rating.desc()).limit(limit)
+        return self._movie_rows(query) if rows else query.all()
+
+    def get_genre_recommendations(self, user_id, limit=5):
+        """
+        Rank the movies a user has not favorited by how many of the user's favorites
+        share each of their genres, then by rating, in one query. Used as the local
+        fallback while the recommendation upstream is unavailable.
+
+        Args:
+            user_id (int): The ID of the user.
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+
+        Returns:
+            list: MovieRow tuples, best match first.
+        """
+        favorite_ids = select(UserMovie.movie_id).where(UserMovie.user_id == user_id)
+        weights = (select(movie_genre.c.genre_id, func.count().label('weight'))
+                   .where(movie_genre.c.movie_id.in_(favorite_ids))
+                   .group_by(movie_genre.c.genre_id).subquery())
+        links = movie_genre.alias()
+        shared = (select(links.c.movie_id, func.sum(weights.c.weight).label('shared'))
+                  .join(weights, weights.c.genre_id == links.c.genre_id)
+                  .group_by(links.c.movie_id).subquery())
+        query = (self.session.query(Movie)
+                 .outerjoin(shared, shared.c.movie_id == Movie.id)
+                 .filter(Movie.id.not_in(favorite_ids))
+                 .order_by(func.coalesce(shared.c.shared, 0).desc(), Movie.rating.desc(), Movie.id)
+                 .limit(limit))
+        return self._movie_rows(query)
+
+    # Trending movies
+    def get_trending_movies(self, limit=5, rows=False):
+        """
+        Retrieve the movies with the most favorites and reviews lately, older events
+        counting exponentially less (see trending.py).
+
+        Args:
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 5.
+            rows (bool, optional): Return read-only MovieRow tuples instead of Movie objects. Defaults to False.
+
+        Returns:
+            list: A list of Movie objects, most trending first.
+        """
+        query = (self.session.query(Movie)
+                 .join(MovieTrend, MovieTrend.movie_id == Movie.id)
+                 .filter(MovieTrend.score >= PRUNE_BELOW)
+                 .order_by(MovieTrend.score.desc())
+                 .limit(limit))
+        return self._movie_rows(query) if rows else query.all()
+
+    def rebuild_trending(self, movie_ids=None):
+        """
+        Recompute trending counters from the stored favorites and reviews, e.g. after
+        upgrading a database or changing the weights.
+
+        Args:
+            movie_ids (iterable, optional): The movies to recompute. Defaults to all.
+
+        Returns:
+            int: The number of movies with a trending counter among those recomputed.
+        """
+        table = MovieTrend.__table__
+        hours = event_hours()
+        self.session.execute(landmark_statement(), {'hours': hours})
+        favorites = select(UserMovie.movie_id, literal(FAVORITE_WEIGHT), UserMovie.date_added)
+        reviews = select(Review.movie_id, literal(REVIEW_WEIGHT), Review.date_posted)
+        if movie_ids is None:
+            self.session.execute(delete(table))
+            self.session.execute(update(TrendLandmark.__table__).values(hours=hours))
+            events = self.session.execute(union_all(favorites, reviews)).all()
+        else:
+            movie_ids = list(movie_ids)
+            events = []
+            for start in range(0, len(movie_ids), DELETE_BATCH_SIZE):
+                batch = movie_ids[start:start + DELETE_BATCH_SIZE]
+                self.session.execute(delete(table).where(table.c.movie_id.in_(batch)))
+                events.extend(self.session.execute(union_all(favorites.where(UserMovie.movie_id.in_(batch)),
+                                                             reviews.where(Review.movie_id.in_(batch)))))
+            hours = self.session.execute(landmark_query()).scalar()
+        # Counters are the scores decayed to the landmark
+        counters = [{'movie_id': movie_id, 'score': score}
+                    for movie_id, score in decayed_scores(events, hours).items() if score >= PRUNE_BELOW]
+        if counters:
+            self.session.execute(insert(table), counters)
+        self._commit()
+        return len(counters)
+
+    def _record_trend(self, events):
+        """
+        Add favorites and reviews to the movies' trending counters in the current
+        transaction, or remove them again with a negative weight. Each event is one
+        upsert, whatever the history.
+
+        Args:
+            events (list): (movie_id, weight, timestamp) tuples.
+        """
+        if not events:
+            return
+        hours = event_hours()
+        self.session.execute(landmark_statement(), {'hours': hours})
+        for statement in rebase_statements(self.session.execute(landmark_query()).scalar(), hours):
+            self.session.execute(statement)
+        self.session.execute(bump_statement(), [
+            {'movie_id': movie_id, 'weight': weight, 'hours': event_hours(timestamp)}
+            for movie_id, weight, timestamp in events
+        ])
+        removed = [{'movie_id': movie_id} for movie_id, weight, _ in events if weight < 0]
+        if removed:
+            self.session.execute(prune_statement(), removed)
+
+    # Similar movies
+    def get_similar_movies(self, movie_id, limit=6):
+        """
+        Retrieve the precomputed most similar movies of a movie.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            limit (int, optional): The maximum number of movies to retrieve. Defaults to 6.
+
+        Returns:
+            list: MovieRow tuples, most similar first.
+        """
+        query = (self.session.query(Movie)
+                 .join(MovieSimilarity, MovieSimilarity.neighbor_id == Movie.id)
+                 .filter(MovieSimilarity.movie_id == movie_id)
+                 .order_by(MovieSimilarity.score.desc(), Movie.id)
+                 .limit(limit))
+        return self._movie_rows(query)
+
+    def refresh_similar_movies(self, movie_ids=None):
+        """
+        Recompute the stored similar-movie lists.
+
+        Without IDs every list is rebuilt. With IDs only the lists that can have changed
+        are: those of the given movies, those they appeared in, and those they now
+        enter (they beat the list's weakest neighbour, or the list is not full). The
+        feature matrix is kept between calls and only the given movies' rows are
+        reloaded, so an incremental refresh does not read the whole catalog. All
+        lists are computed before the old ones are replaced, keeping the write short.
+
+        Args:
+            movie_ids (iterable, optional): The IDs of movies whose features changed.
+
+        Returns:
+            int: The number of lists rebuilt.
+        """
+        table = MovieSimilarity.__table__
+        with self._features_lock:
+            try:
+                if movie_ids is None:
+                    features = self._features = self._load_features()
+                    stale = set(features.position)
+                else:
+                    features, touched = self._patch_features(movie_ids)
+                    stale = (set(touched) | self._lists_containing(touched)) & features.position.keys()
+                    stale.update(features.entered([features.position[movie_id] for movie_id in touched]))
+                neighbours = features.top_k(features.position[movie_id] for movie_id in stale)
+                rows = [{'movie_id': movie_id, 'neighbor_id': neighbor_id, 'score': score}
+                        for movie_id, ranked in neighbours.items() for neighbor_id, score in ranked]
+                if movie_ids is None:
+                    self.session.execute(delete(table))
+                else:
+                    stale_ids = list(stale)
+                    for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+                        batch = stale_ids[start:start + DELETE_BATCH_SIZE]
+                        self.session.execute(delete(table).where(table.c.movie_id.in_(batch)))
+                if rows:
+                    self.session.execute(insert(table), rows)
+                self._commit()
+                features.set_lists(neighbours.items())
+            except BaseException:
+                self._features = None  # Possibly out of step with the stored lists; reload next time
+                raise
+        return len(stale)
+
+    def _load_features(self):
+        """
+        Build the similarity features of all movies.
+        """
+        return MovieFeatures(
+            self.session.query(Movie.id, Movie.director, Movie.year, Movie.rating).all(),
+            self.session.execute(select(movie_genre.c.movie_id, movie_genre.c.genre_id)).all(),
+        )
+
+    def _patch_features(self, movie_ids):
+        """
+        Bring the cached features up to date for the given movies, loading them all
+        (with the stored lists' weakest neighbours) on first use. Movies added or
+        deleted by another process are caught by comparing the movie count and
+        highest ID, and trigger a full reload.
+
+        Returns:
+            tuple: The features and the IDs of the given movies that still exist.
+        """
+        movie_ids = list(dict.fromkeys(movie_ids))
+        if self._features is None:
+            self._features = self._load_features()
+            self._load_weakest(self._features)
+        else:
+            movies, links = [], []
+            for start in range(0, len(movie_ids), DELETE_BATCH_SIZE):
+                batch = movie_ids[start:start + DELETE_BATCH_SIZE]
+                movies += self.session.query(Movie.id, Movie.director, Movie.year, Movie.rating).filter(
+                    Movie.id.in_(batch)).all()
+                links += self.session.execute(select(movie_genre.c.movie_id, movie_genre.c.genre_id).where(
+                    movie_genre.c.movie_id.in_(batch))).all()
+            found = {movie.id for movie in movies}
+            self._features.patch(movies, links, removed=[movie_id for movie_id in movie_ids if movie_id not in found])
+            count, highest = self.session.query(func.count(Movie.id), func.max(Movie.id)).one()
+            if count != len(self._features) or (count and highest != self._features.ids[-1]):
+                self._features = self._load_features()
+                self._load_weakest(self._features)
+        features = self._features
+        return features, [movie_id for movie_id in movie_ids if movie_id in features.position]
+
+    def _load_weakest(self, features):
+        """
+        Load the weakest neighbour of every full stored list into the features.
+        """
+        table = MovieSimilarity.__table__
+        full = (select(table.c.movie_id, func.min(table.c.score).label('weakest'))
+                .group_by(table.c.movie_id).having(func.count() >= TOP_K).subquery())
+        for movie_id, weakest, neighbor_id in self.session.execute(
+                select(table.c.movie_id, table.c.score, func.max(table.c.neighbor_id))
+                .join(full, (full.c.movie_id == table.c.movie_id) & (full.c.weakest == table.c.score))
+                .group_by(table.c.movie_id)):
+            if movie_id in features.position:
+                features.weakest[features.position[movie_id]] = weakest
+                features.weakest_ids[features.position[movie_id]] = neighbor_id
+
+    def _lists_containing(self, movie_ids):
+        """
+        Returns the IDs of the movies whose stored similar-movie lists include any of
+        the given movies.
+        """
+        movie_ids = list(movie_ids)
+        lists = set()
+        for start in range(0, len(movie_ids), DELETE_BATCH_SIZE):
+            lists.update(movie_id for movie_id, in self.session.execute(
+                select(MovieSimilarity.movie_id).where(
+                    MovieSimilarity.neighbor_id.in_(movie_ids[start:start + DELETE_BATCH_SIZE]))))
+        return lists
+
+    def _touch_similarity(self, movie_ids):
+        """
+        Schedule a similar-movie refresh for movies whose features changed in a
+        committed write. Inside a unit of work the refresh runs once after the outer
+        commit, for all movies the unit touched.
+        """
+        pending = getattr(self._units, 'similar', None)
+        if pending is None:
+            pending = self._units.similar = set()
+        pending.update(movie_ids)
+        if not getattr(self._units, 'depth', 0):
+            self._refresh_pending_similarity()
+
+    def _refresh_pending_similarity(self):
+        """
+        Run the scheduled similar-movie refresh in its own transaction. The lists are
+        derived data, so a failure is reported but does not fail the write that
+        scheduled it; refresh_similar_movies() can rebuild them later.
+        """
+        movie_ids = getattr(self._units, 'similar', None)
+        self._units.similar = set()
+        if not movie_ids:
+            return
+        try:
+            self.refresh_similar_movies(movie_ids)
+        except Exception as e:
+            self.session.rollback()
+            logger.exception("Error in refresh_similar_movies for movies %s: %s", sorted(movie_ids), e)
+
+    # Precomputed recommendations
+    def get_users_with_changed_favorites(self):
+        """
+        Retrieve the users whose favorites changed since their recommendations were generated.
+
+        Users without stored recommendations count as changed.
+
+        Returns:
+            list: The IDs of the users needing new recommendations.
+        """
+        generated_at = func.max(Recommendation.generated_at)
+        rows = (
+            self.session.query(UserMovie.user_id)
+            .outerjoin(Recommendation, Recommendation.user_id == UserMovie.user_id)
+            .group_by(UserMovie.user_id)
+            .having(or_(generated_at.is_(None), func.max(UserMovie.date_added) > generated_at))
+            .all()
+        )
+        return [row.user_id for row in rows]
+
+    def get_recommendation(self, user_id):
+        """
+        Retrieve the stored recommendations for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            Recommendation: The Recommendation object if found, None otherwise.
+        """
+        return self.session.get(Recommendation, user_id)
+
+    def save_recommendation(self, user_id, recommendations):
+        """
+        Store (or replace) the recommendations for a user.
+
+        Args:
+            user_id (int): The ID of the user.
+            recommendations (list): The recommended titles, one per entry.
+
+        Returns:
+            Recommendation: The stored Recommendation object.
+        """
+        recommendation = self.session.merge(Recommendation(
+            user_id=user_id, content='\n'.join(recommendations), generated_at=datetime.now(UTC)
+        ))
+        self._commit()
+        return recommendation
+
+    def add_recommendation_run(self, started_at, finished_at, succeeded, failed):
+        """
+        Record the outcome of a recommendation batch run.
+
+        Args:
+            started_at (datetime): When the run started.
+            finished_at (datetime): When the run finished.
+            succeeded (int): Users whose recommendations were stored.
+            failed (int): Users whose recommendations could not be computed.
+
+        Returns:
+            RecommendationRun: The newly created RecommendationRun object.
+        """
+        run = RecommendationRun(started_at=started_at, finished_at=finished_at,
+                                succeeded=succeeded, failed=failed)
+        self.session.add(run)
+        self._commit()
+        return run
@@ -0,0 +1,104 @@
+"""
+This module defines a user's taste profile (genres, directors and decades of their
+favorites, plus their review statistics), shared by all data manager backends.
+"""
+
+from collections import namedtuple
+from datamanager.movie_filters import is_number
+
+# Entries shown per ranked list of the profile
+TOP_COUNT = 5
+
+# One ranked value of the profile and how many favorites have it
+TasteCount = namedtuple('TasteCount', ['label', 'count'])
+
+TasteProfile = namedtuple(
+    'TasteProfile',
+    ['favorite_count', 'review_count', 'average_rating', 'genres', 'directors', 'decades']
+)
+
+
+def decade_of(year):
+    """
+    Returns the decade a stored year falls in.
+
+    Args:
+        year (int): The movie's year; OMDb values such as "N/A" or "2010–2012" have none.
+
+    Returns:
+        int: The decade start year, e.g. 1990, or None.
+    """
+    if isinstance(year, str) and year.isdigit():
+        year = int(year)
+    return int(year) // 10 * 10 if is_number(year) else None
+
+
+def split_directors(director):
+    """
+    Splits OMDb's director field ("Lana Wachowski, Lilly Wachowski") into names.
+    """
+    if not director or director == 'N/A':
+        return []
+    return [name.strip() for name in director.split(',') if name.strip()]
+
+
+def taste_keys(genre_ids, director, year):
+    """
+    Lists the profile counters a favorite movie adds to.
+
+    Args:
+        genre_ids (iterable): The IDs of the movie's genres.
+        director (str): The movie's director field.
+        year (int): The movie's year.
+
+    Returns:
+        list: (dimension, value) pairs; dimension is 'genre', 'director' or 'decade'.
+    """
+    keys = [('genre', str(genre_id)) for genre_id in genre_ids]
+    keys.extend(('director', name) for name in dict.fromkeys(split_directors(director)))
+    decade = decade_of(year)
+    if decade is not None:
+        keys.append(('decade', str(decade)))
+    return keys
+
+
+def build_profile(favorite_count, review_count, rating_sum, counts, genre_names, top=TOP_COUNT):
+    """
+    Assembles a TasteProfile from the stored counters.
+
+    Args:
+        favorite_count (int): The number of favorites.
+        review_count (int): The number of reviews.
+        rating_sum (float): The sum of the review ratings.
+        counts (iterable): (dimension, value, count) counters as built from taste_keys.
+        genre_names (dict): Genre ID -> name; counters of unknown genres are skipped.
+        top (int, optional): Entries per ranked list. Defaults to TOP_COUNT.
+
+    Returns:
+        TasteProfile: The profile; genres and directors are the top entries by count,
+        decades are all of them in chronological order.
+    """
+    ranked = {'genre': [], 'director': [], 'decade': []}
+    for dimension, value, count in counts:
+        if count <= 0:
+            continue
+        if dimension == 'genre':
+            label = genre_names.get(int(value))
+            if label is None:
+                continue
+        elif dimension == 'decade':
+            label = f"{value}s"
+        else:
+            label = value
+        ranked[dimension].append(TasteCount(label, count))
+    for dimension in ('genre', 'director'):
+        ranked[dimension].sort(key=lambda entry: (-entry.count, entry.label))
+    ranked['decade'].sort(key=lambda entry: entry.label)
+    return TasteProfile(
+        favorite_count=favorite_count,
+        review_count=review_count,
+        average_rating=rating_sum / review_count if review_count else None,
+        genres=ranked['genre'][:top],
+        directors=ranked['director'][:top],
+        decades=ranked['decade'],
+    )
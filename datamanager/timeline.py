@@ -0,0 +1,80 @@
+"""
+This module merges a user's favorites and reviews into one activity timeline,
+newest first, with opaque cursors for pagination.
+"""
+
+import base64
+import heapq
+from collections import namedtuple
+from datetime import datetime
+
+# One timeline entry; key is the movie ID for favorites and the review ID for reviews
+ActivityEvent = namedtuple('ActivityEvent', ['kind', 'timestamp', 'key', 'movie_id', 'movie_name',
+                                             'rating', 'text'])
+
+# Tie-break between events with the same timestamp (higher comes first)
+KIND_RANK = {'favorite': 0, 'review': 1}
+
+
+def order_key(event):
+    """
+    Returns the timeline sort key of an event; the timeline is in descending order.
+    """
+    return event.timestamp, KIND_RANK[event.kind], event.key
+
+
+def encode_cursor(event):
+    """
+    Encodes the position after an event as an opaque URL-safe string.
+
+    Args:
+        event (ActivityEvent): The last event of a page.
+
+    Returns:
+        str: The cursor for the next page.
+    """
+    raw = f"{event.timestamp.isoformat()}|{event.kind}|{event.key}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        tuple: (timestamp, kind rank, key), the order key of the last event seen.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        timestamp, kind, key = raw.split('|')
+        return datetime.fromisoformat(timestamp), KIND_RANK[kind], int(key)
+    except (KeyError, UnicodeDecodeError, ValueError, TypeError) as e:
+        raise ValueError(f"Invalid timeline cursor: {cursor}") from e
+
+
+def merge_timeline(streams, limit):
+    """
+    K-way merges event streams that are each newest first into one page.
+
+    Only as many events as the page needs are pulled from the streams.
+
+    Args:
+        streams (list): Iterables of ActivityEvent, each sorted by order_key descending.
+        limit (int): The page size.
+
+    Returns:
+        tuple: (list of up to limit ActivityEvent, cursor for the next page or None).
+    """
+    merged = heapq.merge(*streams, key=order_key, reverse=True)
+    page = []
+    for event in merged:
+        if len(page) == limit:
+            return page, encode_cursor(page[-1])
+        page.append(event)
+    return page, None
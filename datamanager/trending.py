@@ -0,0 +1,134 @@
+"""
+This module defines the trending score shared by the SQLite data manager backends:
+favorites and reviews count with exponential time decay, kept as one counter per
+movie that each event updates in O(1).
+
+Scores use forward decay: an event at time t adds weight * 2^((t - L) / half-life)
+for a fixed landmark L instead of decaying every counter as time passes. All scores
+would be scaled by the same factor to decay them to "now", so their order is already
+the decayed order, and the top movies are an index scan of movie_trend.score. The
+landmark is moved forward (rescaling all counters once) before the factors get too
+large for a float.
+"""
+
+from datetime import datetime, UTC
+from sqlalchemy import select, update, delete, bindparam, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datamanager.data_models import MovieTrend, TrendLandmark
+
+# Hours after which an event counts half as much
+HALF_LIFE_HOURS = 72.0
+
+# Weight of each kind of event
+FAVORITE_WEIGHT = 1.0
+REVIEW_WEIGHT = 2.0
+
+# Half-lives after which the landmark is moved forward (2^64 is far from float overflow)
+REBASE_HALF_LIVES = 64
+
+# Counters below this (in landmark units) are dropped; they are no longer trending
+PRUNE_BELOW = 1e-9
+
+_landmark = select(TrendLandmark.hours).where(TrendLandmark.id == 1).scalar_subquery()
+
+
+def event_hours(timestamp=None):
+    """
+    Returns a timestamp as hours since the Unix epoch; stored (naive) datetimes are UTC.
+
+    Args:
+        timestamp (datetime, optional): The event time. Defaults to now.
+    """
+    if timestamp is None:
+        timestamp = datetime.now(UTC)
+    elif timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=UTC)
+    return timestamp.timestamp() / 3600
+
+
+def register_functions(dbapi_connection):
+    """
+    Adds the exp2() SQL function the trending statements use to a new connection.
+    """
+    dbapi_connection.create_function('exp2', 1, lambda exponent: 2.0 ** exponent, deterministic=True)
+
+
+def landmark_statement():
+    """
+    INSERT of the landmark row (if there is none yet) at hours :hours. As the first
+    statement of an update it also takes SQLite's write lock, so the landmark cannot
+    move between reading it and adding to the counters.
+    """
+    return (sqlite_insert(TrendLandmark.__table__)
+            .values(id=1, hours=bindparam('hours'))
+            .on_conflict_do_nothing())
+
+
+def bump_statement():
+    """
+    Upsert adding an event to a movie's counter; run it with (or executemany over)
+    movie_id, weight and hours parameters. A negative weight removes the event again.
+    """
+    table = MovieTrend.__table__
+    statement = sqlite_insert(table).values(
+        movie_id=bindparam('movie_id'),
+        score=bindparam('weight') * func.exp2((bindparam('hours') - _landmark) / HALF_LIFE_HOURS),
+    )
+    return statement.on_conflict_do_update(index_elements=[table.c.movie_id],
+                                           set_={'score': table.c.score + statement.excluded.score})
+
+
+def prune_statement():
+    """
+    DELETE of a movie's counter (parameter movie_id) once removals have brought it to zero.
+    """
+    table = MovieTrend.__table__
+    return delete(table).where(table.c.movie_id == bindparam('movie_id'), table.c.score < PRUNE_BELOW)
+
+
+def rebase_statements(landmark, hours):
+    """
+    Lists the statements that move the landmark to hours, if it is due.
+
+    Args:
+        landmark (float): The stored landmark.
+        hours (float): The current time, from event_hours().
+
+    Returns:
+        list: The statements to run in order; empty while the landmark is recent enough.
+    """
+    if landmark is None or hours - landmark < REBASE_HALF_LIVES * HALF_LIFE_HOURS:
+        return []
+    table = MovieTrend.__table__
+    return [
+        update(table).values(score=table.c.score * 2.0 ** ((landmark - hours) / HALF_LIFE_HOURS)),
+        update(TrendLandmark.__table__).where(TrendLandmark.id == 1).values(hours=hours),
+        delete(table).where(table.c.score < PRUNE_BELOW),
+    ]
+
+
+def landmark_query():
+    """
+    SELECT of the stored landmark (None before the first event).
+    """
+    return select(_landmark)
+
+
+def decayed_scores(events, hours=None):
+    """
+    Computes trending scores from scratch, decayed to the given time.
+
+    Args:
+        events (iterable): (movie_id, weight, timestamp) tuples.
+        hours (float, optional): The time to decay to, from event_hours(). Defaults to now.
+
+    Returns:
+        dict: Movie ID -> score; the order matches the stored counters'.
+    """
+    if hours is None:
+        hours = event_hours()
+    scores = {}
+    for movie_id, weight, timestamp in events:
+        scores[movie_id] = scores.get(movie_id, 0.0) + weight * 2.0 ** ((event_hours(timestamp) - hours)
+                                                                        / HALF_LIFE_HOURS)
+    return scores
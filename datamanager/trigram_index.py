@@ -0,0 +1,179 @@
+"""
+This module implements the in-memory trigram index behind typo-tolerant movie search.
+"""
+
+import heapq
+import threading
+from array import array
+from collections import Counter, defaultdict
+from datamanager.prefix_index import normalize
+
+# Minimum trigram similarity for a word to count as a match (pg_trgm's default)
+SIMILARITY_THRESHOLD = 0.3
+
+# Query words matching more movies than this are treated as stop words ("the", "of")
+MAX_WORD_POSTINGS = 50000
+
+
+def trigrams(word):
+    """
+    Returns the trigrams of a word, padded like PostgreSQL's pg_trgm so that word
+    starts weigh more: "nolan" -> {"  n", " no", "nol", "ola", "lan", "an "}.
+
+    Args:
+        word (str): A normalized word.
+
+    Returns:
+        set: The word's trigrams.
+    """
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """
+    Trigram similarity of two words: shared trigrams over all distinct trigrams.
+
+    Args:
+        a (str): A normalized word.
+        b (str): Another normalized word.
+
+    Returns:
+        float: Similarity between 0 and 1.
+    """
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb)
+
+
+class TrigramIndex:
+    """
+    Two-level inverted index for fuzzy search over movie names and directors.
+
+    The words of all names and directors form a vocabulary, and each trigram maps to
+    the vocabulary words containing it. A query word is matched against the
+    vocabulary (not the whole catalog) by counting shared trigrams, which keeps
+    candidate generation proportional to the vocabulary size even for a very large
+    catalog. Movies are then scored by the average best similarity of the query words
+    they contain.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self._word_ids = {}                        # word -> word_id
+        self._words = []                           # word_id -> word
+        self._word_sizes = array('H')              # word_id -> number of trigrams
+        self._trigram_words = defaultdict(lambda: array('l'))  # trigram -> word_ids
+        self._word_movies = defaultdict(lambda: array('l'))    # word_id -> movie_ids
+        self._movie_words = {}                     # movie_id -> word_ids
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """
+        Returns the number of indexed movies.
+        """
+        return len(self._movie_words)
+
+    def _word_id(self, word):
+        """
+        Return the vocabulary id of a word, adding it to the vocabulary if needed.
+        """
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._words)
+            self._words.append(word)
+            grams = trigrams(word)
+            self._word_sizes.append(len(grams))
+            for gram in grams:
+                self._trigram_words[gram].append(word_id)
+        return word_id
+
+    def add(self, movie_id, name, director):
+        """
+        Index a movie's name and director, replacing any previous entry for it.
+
+        Args:
+            movie_id (int): The ID of the movie.
+            name (str): The movie's name.
+            director (str): The movie's director.
+        """
+        words = set(normalize(f"{name or ''} {director or ''}").split())
+        with self._lock:
+            self.remove(movie_id)
+            word_ids = {self._word_id(word) for word in words}
+            for word_id in word_ids:
+                self._word_movies[word_id].append(movie_id)
+            self._movie_words[movie_id] = word_ids
+
+    def build(self, rows):
+        """
+        Index many movies at once.
+
+        Args:
+            rows (iterable): (id, name, director) tuples.
+        """
+        with self._lock:
+            for movie_id, name, director in rows:
+                self.add(movie_id, name, director)
+
+    def remove(self, movie_id):
+        """
+        Drop a movie from the index.
+
+        Args:
+            movie_id (int): The ID of the movie.
+        """
+        with self._lock:
+            for word_id in self._movie_words.pop(movie_id, ()):
+                self._word_movies[word_id].remove(movie_id)
+
+    def _similar_words(self, word):
+        """
+        Find vocabulary words at least SIMILARITY_THRESHOLD similar to word.
+
+        Returns:
+            dict: word_id -> similarity.
+        """
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            postings = self._trigram_words.get(gram)
+            if postings:
+                shared.update(postings)
+        matches = {}
+        for word_id, count in shared.items():
+            score = count / (len(grams) + self._word_sizes[word_id] - count)
+            if score >= SIMILARITY_THRESHOLD:
+                matches[word_id] = score
+        return matches
+
+    def search(self, query, limit=20):
+        """
+        Find the movies whose names and directors best match query, tolerating typos.
+
+        Args:
+            query (str): The search query, e.g. "incepton" or "nolen".
+            limit (int, optional): The maximum number of results. Defaults to 20.
+
+        Returns:
+            list: (movie_id, score) pairs, best first; score is between 0 and 1.
+        """
+        query_words = [word for word in normalize(query).split() if word]
+        if not query_words:
+            return []
+        with self._lock:
+            scores = defaultdict(float)
+            for word in query_words:
+                best = {}
+                for word_id, score in self._similar_words(word).items():
+                    movie_ids = self._word_movies.get(word_id, ())
+                    if len(movie_ids) > MAX_WORD_POSTINGS and len(query_words) > 1:
+                        continue
+                    for movie_id in movie_ids:
+                        if score > best.get(movie_id, 0.0):
+                            best[movie_id] = score
+                for movie_id, score in best.items():
+                    scores[movie_id] += score
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [(movie_id, score / len(query_words)) for movie_id, score in top]
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration for running the MovieWeb app with several worker processes.
+
+    gunicorn app:app
+
+SQLite allows one writer at a time, so the app scales by spreading reads over
+worker processes (each with its own engine and connection pool, created after
+fork) and keeping the thread count per worker small. Writes queue on SQLite's
+busy timeout instead of failing. Tune with WEB_CONCURRENCY and GUNICORN_THREADS.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+
+# One process per core for reads; a handful of threads per process covers the
+# time spent waiting on OMDb/RapidAPI without piling up writers on the lock.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+
+# Import the app once in the master so workers fork with the code already loaded.
+# This is safe because the data manager is created lazily and reset after fork.
+preload_app = True
+
+# Upstream calls can be slow; don't kill workers that are waiting on them.
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then so long-lived processes don't accumulate memory.
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """
+    Drop any engine inherited from the master so each worker opens its own pool.
+    """
+    from app import app
+    from datamanager import reset_data_manager
+
+    reset_data_manager(app)
+    server.log.info("Worker %s: data manager reset after fork", worker.pid)
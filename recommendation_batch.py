@@ -0,0 +1,58 @@
+"""
+This module implements the batch job that precomputes movie recommendations.
+
+Only users whose favorites changed since their recommendations were generated are
+processed. The slow upstream calls run on a bounded thread pool while all database
+access stays on the calling thread. Each run is recorded with its throughput and
+failure count in the recommendation_run table.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, UTC
+
+logger = logging.getLogger(__name__)
+
+
+def run_recommendation_batch(data_manager, generate, max_workers=4, validate=None):
+    """
+    Recompute and store recommendations for all users with changed favorites.
+
+    Args:
+        data_manager (DataManagerInterface): The data manager to read from and write to.
+        generate (callable): Takes a user's favorites (FavoriteRow tuples) and returns
+            their recommendations, or None if they could not be computed.
+        max_workers (int, optional): Maximum concurrent upstream calls. Defaults to 4.
+        validate (callable, optional): Takes the favorites and generate's result and
+            returns the recommendations to store; runs on the calling thread, so it
+            may query the database.
+
+    Returns:
+        RecommendationRun: The recorded run.
+    """
+    started_at = datetime.now(UTC)
+    user_ids = data_manager.get_users_with_changed_favorites()
+    favorites = {user_id: data_manager.get_favorite_details(user_id) for user_id in user_ids}
+
+    succeeded = failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(generate, favorites[user_id]): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                recommendations = future.result()
+                if recommendations and validate:
+                    recommendations = validate(favorites[user_id], recommendations)
+            except Exception as e:
+                logger.error(f"Error computing recommendations for user {user_id}: {e}")
+                recommendations = None
+            if recommendations:
+                data_manager.save_recommendation(user_id, recommendations)
+                succeeded += 1
+            else:
+                failed += 1
+
+    run = data_manager.add_recommendation_run(started_at, datetime.now(UTC), succeeded, failed)
+    logger.info(f"Recommendation run {run.id}: {succeeded} succeeded, {failed} failed, "
+                f"{run.users_per_second:.2f} users/s")
+    return run
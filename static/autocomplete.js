@@ -0,0 +1,23 @@
+// Search-as-you-type: fills the navbar search's datalist from /autocomplete.
+document.querySelectorAll('input[data-autocomplete-url]').forEach(function (input) {
+    var datalist = document.getElementById(input.getAttribute('list'));
+    var pending = null;
+
+    input.addEventListener('input', function () {
+        clearTimeout(pending);
+        pending = setTimeout(function () {
+            var url = input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value);
+            fetch(url)
+                .then(function (response) { return response.json(); })
+                .then(function (suggestions) {
+                    datalist.replaceChildren.apply(datalist, suggestions.map(function (movie) {
+                        var option = document.createElement('option');
+                        option.value = movie.name;
+                        option.label = movie.director ? movie.name + ' (' + movie.director + ')' : movie.name;
+                        return option;
+                    }));
+                })
+                .catch(function () {});
+        }, 100);
+    });
+});
@@ -0,0 +1,59 @@
+// Add-movie search preview: lists the OMDb films matching the title from /omdb_search;
+// picking one fills the form and sends its imdbID, so the exact film is added.
+(function () {
+    var button = document.getElementById('omdb-search');
+    if (!button) {
+        return;
+    }
+    var title = document.getElementById('name');
+    var imdbId = document.getElementById('imdb_id');
+    var choices = document.getElementById('omdb-choices');
+
+    function setField(id, value) {
+        if (value && value !== 'N/A') {
+            document.getElementById(id).value = value;
+        }
+    }
+
+    function pick(choice, item) {
+        title.value = choice.title;
+        imdbId.value = choice.imdb_id;
+        setField('director', choice.director);
+        setField('year', String(choice.year || '').slice(0, 4));  // "2010–2012" -> 2010
+        setField('rating', choice.rating);
+        choices.querySelectorAll('.active').forEach(function (other) { other.classList.remove('active'); });
+        item.classList.add('active');
+    }
+
+    title.addEventListener('input', function () {
+        imdbId.value = '';  // A typed title is looked up by name again
+    });
+
+    button.addEventListener('click', function () {
+        var url = button.dataset.searchUrl + '?q=' + encodeURIComponent(title.value.trim());
+        button.disabled = true;
+        fetch(url)
+            .then(function (response) { return response.json(); })
+            .then(function (results) {
+                var items = Array.isArray(results) ? results.map(function (choice) {
+                    var item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action';
+                    item.textContent = choice.title + ' (' + choice.year + ')' +
+                        (choice.director ? ' – ' + choice.director : '') +
+                        (choice.rating && choice.rating !== 'N/A' ? ' – ★ ' + choice.rating : '');
+                    item.addEventListener('click', function () { pick(choice, item); });
+                    return item;
+                }) : [];
+                if (!items.length) {
+                    var empty = document.createElement('div');
+                    empty.className = 'list-group-item text-muted';
+                    empty.textContent = results.error || 'No matching films found.';
+                    items = [empty];
+                }
+                choices.replaceChildren.apply(choices, items);
+            })
+            .catch(function () {})
+            .finally(function () { button.disabled = false; });
+    });
+})();
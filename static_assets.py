@@ -0,0 +1,120 @@
+"""
+This module fingerprints the static assets and serves the fingerprinted copies
+with far-future caching.
+
+`flask build-assets` copies every file under static/ to static/dist/ with a content
+hash in its name (style.css -> style.3f2a9c1e7b.css) and records the mapping in
+static/dist/manifest.json. While that manifest exists, url_for('static', ...) resolves
+to the hashed names, which never change content and can be cached forever.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from flask import request
+
+# Hashed copies and their manifest live in this subdirectory of the static folder
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Hex digits of the content hash kept in the file name
+HASH_LENGTH = 10
+
+# A hashed name always has the same content, so browsers need never revalidate it
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def fingerprinted_name(path, content):
+    """
+    Returns the hashed name for a static file.
+
+    Args:
+        path (str): The file path relative to the static folder, e.g. "images/MovieWeb.png".
+        content (bytes): The file content.
+
+    Returns:
+        str: The path with the content hash before the extension, e.g. "images/MovieWeb.1a2b3c4d5e.png".
+    """
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, extension = os.path.splitext(path)
+    return f"{root}.{digest}{extension}"
+
+
+def build_assets(static_folder):
+    """
+    Writes fingerprinted copies of all static files and the manifest, replacing any previous build.
+
+    Args:
+        static_folder (str): The app's static folder.
+
+    Returns:
+        dict: The manifest, original path -> path of the hashed copy (both relative to static_folder).
+    """
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+    manifest = {}
+    for directory, subdirectories, files in os.walk(static_folder):
+        subdirectories[:] = [name for name in subdirectories
+                             if os.path.join(directory, name) != dist_folder and not name.startswith('.')]
+        for name in sorted(name for name in files if not name.startswith('.')):
+            source = os.path.join(directory, name)
+            path = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as file:
+                content = file.read()
+            hashed = f"{DIST_DIR}/{fingerprinted_name(path, content)}"
+            os.makedirs(os.path.dirname(os.path.join(static_folder, hashed)), exist_ok=True)
+            with open(os.path.join(static_folder, hashed), 'wb') as file:
+                file.write(content)
+            manifest[path] = hashed
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """
+    Reads the manifest of the last build.
+
+    Args:
+        static_folder (str): The app's static folder.
+
+    Returns:
+        dict: The manifest, or an empty dict if the assets were never built.
+    """
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def init_static_assets(app):
+    """
+    Makes url_for('static', ...) resolve to the fingerprinted names and serves those
+    with an immutable Cache-Control header.
+
+    Args:
+        app (Flask): The application.
+    """
+    app.extensions['static_manifest'] = load_manifest(app.static_folder)
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        """
+        Swaps a static filename for its hashed copy, if there is one.
+        """
+        if endpoint == 'static':
+            hashed = app.extensions['static_manifest'].get(values.get('filename'))
+            if hashed:
+                values['filename'] = hashed
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        """
+        Lets browsers cache hashed assets for a year without revalidating.
+        """
+        if (request.endpoint == 'static' and response.status_code == 200
+                and request.view_args.get('filename', '').startswith(f"{DIST_DIR}/")):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
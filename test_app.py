@@ -1,10 +1,19 @@
+import gzip
+import brotli
 import pytest
-from app import app
+from flask import url_for
+from app import app, get_omdb_pool
+from datamanager import get_group_commit_writer, reset_data_manager
+from recommendation_batch import run_recommendation_batch
+from datamanager.movie_filters import MovieFilters
+from static_assets import build_assets
+from upstream.flow_control import TokenBucket, TTLCache
 
 
 @pytest.fixture
-def client():
-    """Fixture for the Flask test client."""
+def client(monkeypatch, data_manager):
+    """Fixture for the Flask test client, backed by the in-memory data manager."""
+    monkeypatch.setattr('app.data_manager', data_manager)
     with app.test_client() as client:
         yield client
 
@@ -40,4 +49,256 @@ def test_add_user(client):
 def test_add_movie_invalid_user(client):
     """Test adding a movie for a non-existent user."""
     response = client.post('/users/9999/add_movie', data={'name': 'Inception'}, follow_redirects=True)
-    assert response.status_code == 404
\ No newline at end of file
+    assert response.status_code == 404
+
+
+def test_recommendations_fall_back_when_upstream_fails(client, data_manager, monkeypatch):
+    """Test that a failing recommendation upstream yields stale local suggestions."""
+    monkeypatch.setattr('app.get_chatgpt_response', lambda prompt: None)
+    user = data_manager.add_user("Test User")
+    drama = data_manager.add_genre("Drama")
+    liked = data_manager.add_movie(name="Heat", year=1995, rating=8.3, genres=[drama])
+    data_manager.add_movie(name="Collateral", year=2004, rating=7.5, genres=[drama])
+    data_manager.add_favorite_movie(user.id, liked.id)
+
+    response = client.get(f'/recommend_movies/{user.id}')
+    assert response.status_code == 200
+    assert b"currently unavailable" in response.data
+    assert b"Collateral (2004)" in response.data
+
+
+def test_batch_precomputes_recommendations(client, data_manager, monkeypatch):
+    """Test that the batch job stores recommendations that the route then serves."""
+    monkeypatch.setattr('app.get_chatgpt_response', lambda prompt: pytest.fail("upstream called"))
+    user = data_manager.add_user("Test User")
+    movie = data_manager.add_movie(name="Heat", year=1995)
+    data_manager.add_favorite_movie(user.id, movie.id)
+
+    run = run_recommendation_batch(data_manager, lambda favorites: [f"More like {favorites[0].name}"])
+    assert (run.succeeded, run.failed) == (1, 0)
+    assert run_recommendation_batch(data_manager, lambda favorites: None).failed == 0
+
+    response = client.get(f'/recommend_movies/{user.id}')
+    assert b"More like Heat" in response.data
+    assert b"Generated on" in response.data
+
+
+def test_recommendations_are_checked_against_the_catalog(client, data_manager, monkeypatch):
+    """Test that the reply is parsed, known movies are respelled and favorites dropped."""
+    prompts = []
+    reply = ("Hier sind meine Vorschläge:\n1. **Heat** (1995) - ein Klassiker\n2. collateral (2004)\n"
+             "3. \"Thief\" (1981)\nViel Spaß!")
+    monkeypatch.setattr('app.get_chatgpt_response', lambda prompt: prompts.append(prompt) or reply)
+    user = data_manager.add_user("Test User")
+    heat = data_manager.add_movie(name="Heat", year=1995)
+    data_manager.add_movie(name="Collateral", year=2004)
+    data_manager.add_favorite_movie(user.id, heat.id)
+
+    response = client.get(f'/recommend_movies/{user.id}')
+    assert "Heat (1995)" in prompts[0]
+    assert data_manager.get_recommendation(user.id).items == ["Collateral (2004)", "Thief (1981)"]
+    assert b"Collateral (2004)" in response.data
+
+
+def test_omdb_search_preview_ranks_and_caches_candidates(client, data_manager, monkeypatch):
+    """Test that the preview ranks OMDb matches and adding a picked one needs no new OMDb call."""
+    films = {f"tt{index:07d}": (f"Heat {index}" if index % 7 else "Heat", str(1950 + index), str(index * 10))
+             for index in range(1, 26)}
+    calls = []
+
+    class Response:
+        def __init__(self, data):
+            self.data = data
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self.data
+
+    def fake_get(url, params):
+        calls.append(params)
+        if "s" in params:
+            page = sorted(films)[(params["page"] - 1) * 10:params["page"] * 10]
+            return Response({"Response": "True", "totalResults": str(len(films)), "Search": [
+                {"Title": films[imdb_id][0], "Year": films[imdb_id][1], "imdbID": imdb_id} for imdb_id in page]})
+        title, year, votes = films[params["i"]]
+        return Response({"Response": "True", "Title": title, "Year": year, "imdbID": params["i"],
+                         "imdbVotes": votes, "Genre": "Crime, Drama"})
+
+    monkeypatch.setattr('requests.get', fake_get)
+    monkeypatch.setattr('app.omdb_cache', TTLCache())
+    monkeypatch.setattr('app.omdb_limiter', TokenBucket(rate=100, capacity=100))
+    choices = client.get('/omdb_search?q=heat').get_json()
+    # Exact titles first, each group by IMDb votes
+    assert [choice["imdb_id"] for choice in choices] == [f"tt{index:07d}" for index in (21, 14, 7, 2, 1)]
+    assert len(calls) == 3 + 5
+
+    user = data_manager.add_user("Test User")
+    client.post(f'/users/{user.id}/add_movie', data={'name': 'Heat', 'imdb_id': 'tt0000014', 'director': '',
+                                                      'year': '', 'rating': '', 'genres': ['Crime']})
+    assert len(calls) == 8
+    assert [(movie.name, movie.imdb_id) for movie in data_manager.get_favorite_movies_by_user(user.id)] == [
+        ("Heat", "tt0000014")]
+    assert client.get('/omdb_search?q=h').status_code == 400
+
+
+def test_autocomplete_tracks_movie_changes(client, data_manager):
+    """Test that autocomplete reflects added, updated and deleted movies."""
+    dark = data_manager.add_movie(name="The Dark Knight", director="Christopher Nolan", rating=9.0)
+    data_manager.add_movie(name="Dark City", director="Alex Proyas", rating=7.6)
+
+    response = client.get('/autocomplete?q=dark')
+    assert [movie['name'] for movie in response.get_json()] == ["The Dark Knight", "Dark City"]
+    assert client.get('/autocomplete?q=NOL').get_json()[0]['id'] == dark.id
+    assert len(client.get('/autocomplete?q=dark&limit=-1').get_json()) == 1
+    assert [movie['name'] for movie in client.get('/autocomplete?q=da').get_json()] == ["The Dark Knight", "Dark City"]
+
+    data_manager.update_movie(dark.id, name="Batman Begins")
+    assert [movie['name'] for movie in client.get('/autocomplete?q=dark').get_json()] == ["Dark City"]
+    assert [movie['name'] for movie in client.get('/autocomplete?q=da').get_json()] == ["Dark City"]
+    data_manager.add_movie(name="Dances with Wolves", rating=8.0)
+    assert [movie['name'] for movie in client.get('/autocomplete?q=da').get_json()] == ["Dances with Wolves",
+                                                                                     "Dark City"]
+    data_manager.delete_movie(dark.id)
+    assert client.get('/autocomplete?q=batman').get_json() == []
+
+
+def test_search_falls_back_to_fuzzy_matches(client, data_manager):
+    """Test that misspelled searches still find the movie."""
+    data_manager.add_movie(name="Inception", director="Christopher Nolan")
+    data_manager.add_movie(name="Alien", director="Ridley Scott")
+
+    for query in ("Incepton", "Nolen"):
+        response = client.get(f'/search_movies?query={query}')
+        assert b"No exact matches" in response.data
+        assert b"Inception" in response.data
+        assert b"Alien" not in response.data
+
+    data_manager.add_movie(name="Interstellar", director="Christopher Nolan")
+    assert b"Interstellar" in client.get('/search_movies?query=Intersteller').data
+
+
+def test_list_movies_filters_sorts_and_counts_facets(client, data_manager, user):
+    """Test genre/year/rating filters, sorting and facet counts on /movies."""
+    drama = data_manager.add_genre("Drama")
+    comedy = data_manager.add_genre("Comedy")
+    data_manager.add_movie(name="Heat", year=1995, rating=8.3, genres=[drama])
+    data_manager.add_movie(name="Fargo", year=1996, rating=8.1, genres=[drama, comedy])
+    airplane = data_manager.add_movie(name="Airplane!", year=1980, rating=7.7, genres=[comedy])
+    data_manager.add_movie(name="Unknown", year="N/A", rating="N/A")
+    data_manager.add_review("Classic", 9.0, user.id, airplane.id)
+
+    response = client.get(f'/movies?genre={drama.id}&year_min=1990&sort=rating_desc')
+    assert response.status_code == 200
+    assert response.data.index(b"Heat") < response.data.index(b"Fargo")
+    assert b"Airplane!" not in response.data and b"2 movies" in response.data
+    # Facets ignore their own filter: Comedy still counts Fargo (and not Airplane!, from 1980)
+    assert b"Comedy (1)" in response.data and b"Drama (2)" in response.data
+
+    assert data_manager.filter_movies(MovieFilters(year_min=1990, rating_max=8.2))[1] == 1
+    movies, total = data_manager.filter_movies(MovieFilters(community_min=8), sort='community_desc')
+    assert (movies, total) == ([airplane], 1)
+    facets = data_manager.get_movie_facets(MovieFilters(rating_min=7, year_min=1990))
+    assert [(facet.label, facet.count) for facet in facets['decade']] == [("1990s", 2), ("1980s", 1)]
+    assert b"Unknown" not in client.get('/movies?year_max=2030').data
+    assert b"Page 1 of 1" not in client.get('/movies?page=5').data
+
+
+def test_pages_are_compressed_for_accepting_clients(client, data_manager):
+    """Test brotli/gzip compression of rendered pages above the size threshold."""
+    for i in range(20):
+        data_manager.add_movie(name=f"Movie {i}", director="Somebody")
+    plain = client.get('/movies').data
+
+    response = client.get('/movies', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == plain
+    response = client.get('/movies', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(response.data) == plain and 'Accept-Encoding' in response.headers['Vary']
+    assert 'Content-Encoding' not in client.get('/autocomplete?q=x', headers={'Accept-Encoding': 'br'}).headers
+
+
+def test_static_urls_point_to_immutable_fingerprinted_copies(client, monkeypatch, tmp_path):
+    """Test that built assets are linked by hashed name and cached forever."""
+    (tmp_path / "style.css").write_text("body { color: red; }")
+    monkeypatch.setattr(app, 'static_folder', str(tmp_path))
+    monkeypatch.setitem(app.extensions, 'static_manifest', build_assets(str(tmp_path)))
+
+    with app.test_request_context():
+        url = url_for('static', filename='style.css')
+    assert url.startswith('/static/dist/style.') and url.endswith('.css')
+    response = client.get(url)
+    assert response.data == b"body { color: red; }"
+    assert response.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+    assert 'immutable' not in client.get('/static/style.css').headers['Cache-Control']
+
+
+def test_admin_bulk_delete(client, data_manager, user, monkeypatch):
+    """Test bulk deletes by ID and by filter through the admin endpoints."""
+    monkeypatch.setitem(app.config, 'ADMIN_TOKEN', 'secret')
+    headers = {'X-Admin-Token': 'secret'}
+    old = [data_manager.add_movie(name=f"Old {i}", year=1950 + i) for i in range(3)]
+    new = data_manager.add_movie(name="New", year=2020)
+    data_manager.add_favorite_movie(user.id, old[0].id)
+    data_manager.add_review("Dated", 4, user.id, old[1].id)
+
+    assert client.post('/admin/movies/delete', data={'id': old[2].id}).status_code == 403
+    response = client.post('/admin/movies/delete', data={'id': [old[2].id, 999]}, headers=headers)
+    assert response.get_json() == {"deleted": 1}
+    assert client.post('/admin/movies/delete', headers=headers).status_code == 400
+
+    response = client.post('/admin/movies/delete', data={'year_max': 1999}, headers=headers)
+    assert response.get_json() == {"deleted": 2}
+    assert data_manager.get_all_movies() == [new]
+    assert data_manager.get_favorite_movies_by_user(user.id) == []
+    assert data_manager.get_reviews_by_user(user.id) == []
+
+    assert client.post('/admin/users/delete', data={'id': user.id}, headers=headers).get_json() == {"deleted": 1}
+    assert data_manager.get_all_users() == []
+
+
+def test_user_timeline_merges_favorites_and_reviews(client, data_manager, user):
+    """Test the activity timeline order and its cursor pagination."""
+    movies = [data_manager.add_movie(name=f"Movie {i}") for i in range(5)]
+    for movie in movies:
+        data_manager.add_favorite_movie(user.id, movie.id)
+        data_manager.add_review(f"Thoughts on {movie.name}", 4, user.id, movie.id)
+
+    events, cursor = [], None
+    while True:
+        page = client.get(f'/users/{user.id}/timeline', query_string={'limit': 3, 'cursor': cursor}).get_json()
+        assert len(page['events']) <= 3
+        events += page['events']
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert len(events) == 10
+    assert [event['timestamp'] for event in events] == sorted((event['timestamp'] for event in events), reverse=True)
+    assert events[0] == dict(events[0], kind='review', movie_name="Movie 4", text="Thoughts on Movie 4")
+
+    assert client.get(f'/users/{user.id}/timeline?cursor=bogus').status_code == 400
+    assert b"Reviewed" in client.get(f'/users/{user.id}').data
+
+
+def test_post_fork_reset_rebuilds_per_process_state(monkeypatch, db_file):
+    """Test that reset_data_manager drops the inherited data manager, writer and pool."""
+    monkeypatch.setattr(app, 'extensions', dict(app.extensions))
+    monkeypatch.setitem(app.config, 'DATABASE_FILE', db_file)
+    monkeypatch.setitem(app.config, 'DATA_MANAGER_BACKEND', 'sqlite')
+    with app.test_client() as client:
+        assert client.get('/users').status_code == 200
+    with app.app_context():
+        parent = (app.extensions['data_manager'], get_group_commit_writer(), get_omdb_pool())
+    disposed = []
+    monkeypatch.setattr(parent[0], 'dispose', lambda: disposed.append(True))
+
+    reset_data_manager(app)
+    assert disposed == [True]
+    with app.test_client() as client:
+        assert client.get('/users').status_code == 200
+    with app.app_context():
+        child = (app.extensions['data_manager'], get_group_commit_writer(), get_omdb_pool())
+    assert all(new is not old for new, old in zip(child, parent))
+    for writer in (parent[1], child[1]):
+        writer.stop()
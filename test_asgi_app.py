@@ -0,0 +1,55 @@
+import pytest
+from starlette.testclient import TestClient
+import asgi_app
+from datamanager.async_sqlite_data_manager import AsyncSQLiteDataManager
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Fixture for the ASGI test client, backed by a throwaway database."""
+    monkeypatch.setattr(asgi_app, 'data_manager', AsyncSQLiteDataManager(tmp_path / 'test.db'))
+    with TestClient(asgi_app.app) as client:
+        yield client
+
+
+def test_home(client):
+    """Test the home page."""
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b"Welcome to MovieWeb App" in response.content
+
+
+def test_add_user(client):
+    """Test adding a new user."""
+    response = client.post('/add_user', data={'name': 'Test User'})
+    assert response.status_code == 200
+    assert b"Test User" in response.content
+
+
+def test_user_movies_not_found(client):
+    """Test accessing a non-existent user's movies."""
+    response = client.get('/users/9999')
+    assert response.status_code == 404
+    assert b"Page Not Found" in response.content
+
+
+def test_list_movies_ignores_query_parameters(client):
+    """Test that the movie list renders with the Flask app's paging parameters."""
+    response = client.get('/movies?page=2&sort=name')
+    assert response.status_code == 200
+
+
+def test_add_movie_uses_async_omdb_client(client, monkeypatch):
+    """Test adding a movie with the OMDb lookup stubbed out."""
+    async def fake_fetch(http, title):
+        return {"title": title, "year": "2010", "director": "Christopher Nolan",
+                "rating": "8.8", "plot": "", "poster": "", "genre": ["Sci-Fi"]}
+
+    monkeypatch.setattr(asgi_app, 'fetch_movie_details', fake_fetch)
+    client.post('/add_user', data={'name': 'Test User'})
+    response = client.post('/users/1/add_movie', data={'name': 'Inception', 'genres': ['Sci-Fi']})
+    assert response.status_code == 200
+    assert b"Inception" in response.content
+
+    response = client.get('/movies/1')
+    assert b"Sci-Fi" in response.content
@@ -1,10 +1,44 @@
 """
-This script tests the basic CRUD operations of the SQLiteDataManager.
-It demonstrates adding users and movies, marking favorites, and retrieving data.
+This module tests the SQLite-backed data managers: lazy startup and schema upgrades,
+basic CRUD operations, cascading and bulk deletes, units of work and group commit,
+cached user statistics, row projections, similar movies, trending counters,
+snapshots and sharding.
+
+Run directly, it demonstrates adding users and movies, marking favorites, and
+retrieving data against the app's database.
 """
 
+import os
+import sqlite3
+from datetime import datetime, timedelta, UTC
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+from datamanager import create_app, get_data_manager
+from datamanager.backup import create_snapshot, list_snapshots, prune_snapshots, restore_snapshot
+from datamanager.data_models import SCHEMA_VERSION, UserMovie, ensure_schema
+from datamanager.group_commit import GroupCommitWriter
+from datamanager.movie_filters import MovieFilters
+from datamanager.movie_rows import MovieRow
+from datamanager.sharded_data_manager import ShardedDataManager, shard_files, shard_index
 from datamanager.sqlite_data_manager import SQLiteDataManager
 
+# The tables as created by the first release, before schema versioning
+BASELINE_SCHEMA = """
+    CREATE TABLE user (id INTEGER NOT NULL, name VARCHAR(50) NOT NULL, PRIMARY KEY (id));
+    CREATE TABLE movie (id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, director VARCHAR(50), year INTEGER,
+                        rating FLOAT, poster VARCHAR(255), PRIMARY KEY (id));
+    CREATE TABLE genre (id INTEGER NOT NULL, name VARCHAR(30) NOT NULL, PRIMARY KEY (id), UNIQUE (name));
+    CREATE TABLE movie_genre (movie_id INTEGER NOT NULL, genre_id INTEGER NOT NULL, PRIMARY KEY (movie_id, genre_id),
+                              FOREIGN KEY(movie_id) REFERENCES movie (id), FOREIGN KEY(genre_id) REFERENCES genre (id));
+    CREATE TABLE user_movie (user_id INTEGER NOT NULL, movie_id INTEGER NOT NULL, date_added DATETIME,
+                             PRIMARY KEY (user_id, movie_id), FOREIGN KEY(user_id) REFERENCES user (id),
+                             FOREIGN KEY(movie_id) REFERENCES movie (id));
+    CREATE TABLE review (id INTEGER NOT NULL, text TEXT NOT NULL, rating FLOAT NOT NULL, user_id INTEGER NOT NULL,
+                         movie_id INTEGER NOT NULL, date_posted DATETIME, PRIMARY KEY (id),
+                         FOREIGN KEY(user_id) REFERENCES user (id), FOREIGN KEY(movie_id) REFERENCES movie (id));
+"""
+
 
 def test_user_operations(data_manager):
     """Test user-related operations."""
@@ -44,6 +78,290 @@ def test_favorite_movie_operations(data_manager, user, movie):
         print(f"- {fav_user.name}")
 
 
+def test_create_app_opens_no_database(db_file, monkeypatch):
+    """Test that creating the app builds no engine; the first use of the data manager does."""
+    app = create_app({'DATA_MANAGER_BACKEND': 'sqlite', 'DATABASE_FILE': db_file})
+    assert 'data_manager' not in app.extensions
+    assert not os.path.exists(db_file)
+
+    with app.app_context():
+        assert isinstance(get_data_manager(), SQLiteDataManager)
+    assert os.path.exists(db_file)
+
+
+def test_current_schema_runs_no_ddl(sqlite_data_manager):
+    """Test that opening a database at SCHEMA_VERSION only reads the version pragma."""
+    statements = []
+    event.listen(sqlite_data_manager.engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    with sqlite_data_manager.engine.begin() as connection:
+        assert connection.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION
+        statements.clear()
+        assert not ensure_schema(connection)
+    assert statements == ["PRAGMA user_version"]
+
+
+def test_baseline_schema_is_upgraded_keeping_rows(db_file):
+    """Test that a database created by the original schema gets the current one and keeps its data."""
+    connection = sqlite3.connect(db_file)
+    connection.executescript(BASELINE_SCHEMA + """
+        INSERT INTO user (id, name) VALUES (1, 'Jane Doe');
+        INSERT INTO movie (id, name, director, year, rating) VALUES (1, 'Heat', 'Michael Mann', 1995, 8.3);
+        INSERT INTO genre (id, name) VALUES (1, 'Crime');
+        INSERT INTO movie_genre (movie_id, genre_id) VALUES (1, 1);
+        INSERT INTO user_movie (user_id, movie_id) VALUES (1, 1);
+        INSERT INTO review (id, text, rating, user_id, movie_id) VALUES (1, 'Tense', 8, 1, 1);
+    """)
+    connection.close()
+
+    data_manager = SQLiteDataManager(db_file)
+    with data_manager.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION
+    heat = data_manager.get_movie_by_id(1)
+    assert (heat.name, heat.imdb_id, [genre.name for genre in heat.genres]) == ("Heat", None, ["Crime"])
+    assert [movie.name for movie in data_manager.get_favorite_movies_by_user(1)] == ["Heat"]
+    assert [review.text for review in data_manager.get_reviews_by_movie(1)] == ["Tense"]
+
+    assert data_manager.delete_movie(1)  # The rebuilt tables cascade
+    assert data_manager.get_reviews_by_user(1) == []
+    assert data_manager.get_favorite_movies_by_user(1) == []
+
+
+def test_deletes_cascade_in_sqlite(sqlite_data_manager):
+    """Test that deleting movies and users removes their dependent rows in the database."""
+    user = sqlite_data_manager.add_user("Jane Doe")
+    genre = sqlite_data_manager.add_genre("Drama")
+    movies = [sqlite_data_manager.add_movie(name=f"Movie {i}", genres=[genre]) for i in range(3)]
+    for movie in movies:
+        sqlite_data_manager.add_favorite_movie(user.id, movie.id)
+        sqlite_data_manager.add_review("Fine", 7, user.id, movie.id)
+
+    assert sqlite_data_manager.delete_movie(movies[0].id)
+    assert sqlite_data_manager.delete_movies([movie.id for movie in movies[1:]]) == 2
+    assert sqlite_data_manager.get_all_movies() == []
+    assert sqlite_data_manager.get_reviews_by_user(user.id) == []
+    assert sqlite_data_manager.get_favorite_movies_by_user(user.id) == []
+    assert sqlite_data_manager.get_genre_by_id(genre.id).movies == []
+    assert sqlite_data_manager.delete_users([user.id]) == 1
+
+
+def test_genre_recommendations_rank_by_shared_genres(sqlite_data_manager):
+    """Test that fallback recommendations skip favorites and rank by genre overlap, then rating."""
+    user = sqlite_data_manager.add_user("Jane Doe")
+    drama = sqlite_data_manager.add_genre("Drama")
+    crime = sqlite_data_manager.add_genre("Crime")
+    heat = sqlite_data_manager.add_movie(name="Heat", rating=8.3, genres=[drama, crime])
+    sqlite_data_manager.add_movie(name="Collateral", rating=7.5, genres=[crime])
+    sqlite_data_manager.add_movie(name="Thief", rating=7.3, genres=[drama, crime])
+    sqlite_data_manager.add_movie(name="Casino", rating=8.2)
+    sqlite_data_manager.add_movie(name="Unrated", genres=[drama])
+    sqlite_data_manager.add_favorite_movie(user.id, heat.id)
+
+    names = [movie.name for movie in sqlite_data_manager.get_genre_recommendations(user.id, limit=10)]
+    assert names == ["Thief", "Collateral", "Unrated", "Casino"]
+    assert len(sqlite_data_manager.get_genre_recommendations(user.id, limit=2)) == 2
+
+
+def test_unit_of_work_commits_once_or_rolls_back(sqlite_data_manager):
+    """Test that a unit of work commits all its writes together, or none of them."""
+    with sqlite_data_manager.unit_of_work():
+        user = sqlite_data_manager.add_user("Jane Doe")
+        movie = sqlite_data_manager.add_movie(name="Heat")
+        sqlite_data_manager.add_review("Tense", 8, user.id, movie.id)
+    assert len(sqlite_data_manager.get_reviews_by_movie(movie.id)) == 1
+
+    try:
+        with sqlite_data_manager.unit_of_work():
+            sqlite_data_manager.add_movie(name="Ronin")
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert [movie.name for movie in sqlite_data_manager.get_all_movies()] == ["Heat"]
+    assert sqlite_data_manager.autocomplete_movies("ronin") == []
+
+
+def test_group_commit_writer_batches_concurrent_writes(sqlite_data_manager):
+    """Test that queued writes are committed together and failures stay isolated."""
+    user = sqlite_data_manager.add_user("Jane Doe")
+    movie = sqlite_data_manager.add_movie(name="Heat")
+    writer = GroupCommitWriter(sqlite_data_manager, max_batch=50, max_delay=0.05).start()
+
+    futures = [writer.submit('add_review', f"Review {i}", 7, user.id, movie.id) for i in range(20)]
+    bad = writer.submit('add_review', None, 7, user.id, movie.id)  # text is NOT NULL
+    reviews = [future.result(timeout=5) for future in futures]
+    writer.stop(timeout=5)
+
+    assert [review.text for review in reviews] == [f"Review {i}" for i in range(20)]
+    assert isinstance(bad.exception(timeout=5), IntegrityError)
+    assert len(sqlite_data_manager.get_reviews_by_movie(movie.id)) == 20
+
+
+def test_cached_user_stats_follow_writes(sqlite_data_manager):
+    """Test that the cached taste profile is updated incrementally and matches a rebuild."""
+    user = sqlite_data_manager.add_user("Jane Doe")
+    drama = sqlite_data_manager.add_genre("Drama")
+    crime = sqlite_data_manager.add_genre("Crime")
+    heat = sqlite_data_manager.add_movie(name="Heat", director="Michael Mann", year=1995, genres=[drama, crime])
+    matrix = sqlite_data_manager.add_movie(name="The Matrix", director="Lana Wachowski, Lilly Wachowski",
+                                    year=1999, genres=[drama])
+    collateral = sqlite_data_manager.add_movie(name="Collateral", director="Michael Mann", year=2004)
+    sqlite_data_manager.add_favorite_movie(user.id, heat.id)
+    assert sqlite_data_manager.get_user_stats(user.id).favorite_count == 1  # Builds the cache
+
+    sqlite_data_manager.add_favorite_movie(user.id, matrix.id)
+    sqlite_data_manager.add_favorite_movie(user.id, collateral.id)
+    review = sqlite_data_manager.add_review("Tense", 8, user.id, heat.id)
+    sqlite_data_manager.add_review("Great", 6, user.id, matrix.id)
+    sqlite_data_manager.update_review(review.id, new_rating=9)
+    sqlite_data_manager.remove_favorite_movie(user.id, matrix.id)
+    sqlite_data_manager.add_favorite_movie(user.id, matrix.id)
+
+    stats = sqlite_data_manager.get_user_stats(user.id)
+    assert (stats.favorite_count, stats.review_count, stats.average_rating) == (3, 2, 7.5)
+    assert stats.genres[0] == ("Drama", 2)
+    assert stats.directors[0] == ("Michael Mann", 2)
+    assert [decade.label for decade in stats.decades] == ["1990s", "2000s"]
+
+    sqlite_data_manager.delete_movie(collateral.id)  # Invalidates the cache
+    rebuilt = sqlite_data_manager.get_user_stats(user.id)
+    assert rebuilt.favorite_count == 2 and ("Michael Mann", 1) in rebuilt.directors
+    assert sqlite_data_manager.get_user_stats(user.id + 1) is None
+
+
+def test_list_queries_return_read_only_rows(sqlite_data_manager):
+    """Test that rows=True returns MovieRow tuples with the same data as the ORM objects."""
+    user = sqlite_data_manager.add_user("Jane Doe")
+    drama = sqlite_data_manager.add_genre("Drama")
+    heat = sqlite_data_manager.add_movie(name="Heat", director="Michael Mann", year=1995, rating=8.3, genres=[drama])
+    sqlite_data_manager.add_favorite_movie(user.id, heat.id)
+
+    expected = [MovieRow(heat.id, "Heat", "Michael Mann", 1995, 8.3, None)]
+    assert sqlite_data_manager.filter_movies(rows=True) == (expected, 1)
+    assert sqlite_data_manager.get_favorite_movies_by_user(user.id, rows=True) == expected
+    assert sqlite_data_manager.get_movies_by_genre(drama.id, rows=True) == expected
+    assert sqlite_data_manager.search_movies("mann", rows=True) == expected
+    assert sqlite_data_manager.get_top_rated_movies(rows=True) == expected
+
+
+def test_similar_movies_refresh_incrementally(sqlite_data_manager):
+    """Test that the stored similar-movie lists follow writes and match a full rebuild."""
+    drama = sqlite_data_manager.add_genre("Drama")
+    crime = sqlite_data_manager.add_genre("Crime")
+    scifi = sqlite_data_manager.add_genre("Sci-Fi")
+    heat = sqlite_data_manager.add_movie(name="Heat", director="Michael Mann", year=1995, rating=8.3,
+                                  genres=[drama, crime])
+    collateral = sqlite_data_manager.add_movie(name="Collateral", director="Michael Mann", year=2004, rating=7.5,
+                                        genres=[crime])
+    matrix = sqlite_data_manager.add_movie(name="The Matrix", director="Lana Wachowski, Lilly Wachowski",
+                                    year=1999, rating=8.7, genres=[scifi])
+    casino = sqlite_data_manager.add_movie(name="Casino", director="Martin Scorsese", year=1995, rating=8.2)
+    collateral_id = collateral.id
+    assert [movie.id for movie in sqlite_data_manager.get_similar_movies(heat.id)][0] == collateral_id
+
+    sqlite_data_manager.add_movie_to_genre(casino.id, crime.id)
+    sqlite_data_manager.update_movie(matrix.id, rating=8.8)
+    sqlite_data_manager.delete_movie(collateral_id)
+    with sqlite_data_manager.unit_of_work():
+        sqlite_data_manager.add_movie(name="Thief", director="Michael Mann", year=1981, genres=[drama, crime])
+
+    def stored():
+        return {movie.id: sqlite_data_manager.get_similar_movies(movie.id, limit=10)
+                for movie in sqlite_data_manager.get_all_movies()}
+
+    incremental = stored()
+    assert incremental[heat.id][0].name == "Thief"
+    assert collateral_id not in {row.id for rows in incremental.values() for row in rows}
+    sqlite_data_manager.refresh_similar_movies()
+    assert stored() == incremental
+
+
+def test_trending_counters_follow_events(sqlite_data_manager):
+    """Test that trending counters are updated per event and match a rebuild with decay."""
+    jane = sqlite_data_manager.add_user("Jane Doe")
+    john = sqlite_data_manager.add_user("John Doe")
+    heat = sqlite_data_manager.add_movie(name="Heat")
+    thief = sqlite_data_manager.add_movie(name="Thief")
+    casino = sqlite_data_manager.add_movie(name="Casino")
+    sqlite_data_manager.add_favorite_movie(jane.id, heat.id)
+    sqlite_data_manager.add_favorite_movie(john.id, thief.id)
+    sqlite_data_manager.add_review("Great", 8, john.id, thief.id)
+    review = sqlite_data_manager.add_review("Fine", 6, jane.id, casino.id)
+    assert [movie.name for movie in sqlite_data_manager.get_trending_movies()] == ["Thief", "Casino", "Heat"]
+
+    sqlite_data_manager.delete_review(review.id)
+    sqlite_data_manager.remove_favorite_movie(john.id, thief.id)
+    assert [movie.name for movie in sqlite_data_manager.get_trending_movies(rows=True)] == ["Thief", "Heat"]
+
+    # Three favorites a month ago count less than one from today
+    old = datetime.now(UTC) - timedelta(days=30)
+    for user in (jane, john, sqlite_data_manager.add_user("Max Doe")):
+        sqlite_data_manager.session.add(UserMovie(user_id=user.id, movie_id=casino.id, date_added=old))
+    sqlite_data_manager.session.commit()
+    assert sqlite_data_manager.rebuild_trending() == 3
+    assert [movie.name for movie in sqlite_data_manager.get_trending_movies()] == ["Thief", "Heat", "Casino"]
+
+
+def test_online_snapshot_and_restore(tmp_path, sqlite_data_manager, db_file):
+    """Test that snapshots are consistent, checksummed and pruned, and can be restored."""
+    backup_dir = str(tmp_path / "backups")
+    sqlite_data_manager.add_movie(name="Heat")
+    first = create_snapshot(db_file, backup_dir, pages=1)
+    sqlite_data_manager.add_movie(name="Thief")
+    latest = create_snapshot(db_file, backup_dir, compress=False)
+    sqlite_data_manager.add_movie(name="Casino")
+
+    assert [snapshot.path for snapshot in list_snapshots(db_file, backup_dir)] == [latest.path, first.path]
+    restore_snapshot(first.path, db_file)
+    assert [movie.name for movie in SQLiteDataManager(db_file).get_all_movies()] == ["Heat"]
+
+    replica = str(tmp_path / "replica.db")
+    restore_snapshot(latest.path, replica)
+    assert len(SQLiteDataManager(replica).get_all_movies()) == 2
+
+    assert [snapshot.path for snapshot in prune_snapshots(db_file, backup_dir, keep=1)] == [first.path]
+    with open(latest.path, "r+b") as file:
+        file.write(b"X")
+    with pytest.raises(ValueError):
+        restore_snapshot(latest.path, replica)
+
+
+def test_sharded_data_manager_routes_and_fans_out(db_file):
+    """Test that users are spread over shard files and cross-user queries merge all shards."""
+    data_manager = ShardedDataManager(db_file, shard_count=3)
+    users = [data_manager.add_user(f"User {index}") for index in range(12)]
+    drama = data_manager.add_genre("Drama")
+    heat = data_manager.add_movie(name="Heat", director="Michael Mann", genres=[drama])
+    thief = data_manager.add_movie(name="Thief", director="Michael Mann")
+
+    assert len({user.id for user in users}) == 12
+    assert len({shard_index(user.id, 3) for user in users}) == 3
+    for index, file_name in enumerate(shard_files(db_file, 3)):
+        shard = SQLiteDataManager(file_name)
+        assert {user.id for user in shard.get_all_users()} == {
+            user.id for user in users if shard_index(user.id, 3) == index}
+        assert [movie.name for movie in shard.get_movies_by_genre(drama.id)] == ["Heat"]
+
+    for user in users:
+        data_manager.add_favorite_movie(user.id, heat.id)
+        data_manager.add_review("Great", 8 if user.id % 2 else 6, user.id, heat.id)
+    data_manager.add_review("Fine", 5, users[0].id, thief.id)
+    assert [user.id for user in data_manager.get_users_by_favorite_movie(heat.id)] == [user.id for user in users]
+    assert [review.user.name for review in data_manager.get_reviews_by_movie(heat.id)] == [
+        user.name for user in users]
+    assert data_manager.get_community_ratings([heat.id, thief.id]) == {heat.id: 7.0, thief.id: 5.0}
+    movies, total = data_manager.filter_movies(MovieFilters(community_min=6), sort='community_desc')
+    assert ([movie.name for movie in movies], total) == (["Heat"], 1)
+    assert [movie.name for movie in data_manager.get_trending_movies()] == ["Heat", "Thief"]
+    assert data_manager.get_user_stats(users[0].id).directors[0].label == "Michael Mann"
+
+    data_manager.update_movie(heat.id, director="Mann")
+    assert data_manager.get_user_stats(users[0].id).directors[0].label == "Mann"
+    data_manager.delete_movie(thief.id)
+    assert data_manager.get_reviews_by_user(users[0].id)[0].movie_id == heat.id
+    assert data_manager.delete_users([user.id for user in users[:6]]) == 6
+    assert len(data_manager.get_users_by_favorite_movie(heat.id)) == 6
+
+
 def main():
     """Main function to run all tests."""
     # Initialize the data manager with the database
@@ -56,4 +374,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,79 @@
+import pytest
+from app import app
+from datamanager import create_data_manager
+from datamanager.memory_data_manager import InMemoryDataManager
+
+
+def test_create_data_manager_selects_backend():
+    """Test that the backend registry honours DATA_MANAGER_BACKEND."""
+    assert isinstance(create_data_manager({'DATA_MANAGER_BACKEND': 'memory'}), InMemoryDataManager)
+    with pytest.raises(ValueError):
+        create_data_manager({'DATA_MANAGER_BACKEND': 'nope'})
+
+
+def test_favorites_are_indexed_both_ways(data_manager, user, movie):
+    """Test favorites lookups by user and by movie."""
+    data_manager.add_favorite_movie(user.id, movie.id)
+    data_manager.add_favorite_movie(user.id, movie.id)
+    assert data_manager.get_favorite_movies_by_user(user.id) == [movie]
+    assert data_manager.get_users_by_favorite_movie(movie.id) == [user]
+
+    data_manager.remove_favorite_movie(user.id, movie.id)
+    assert data_manager.get_favorite_movies_by_user(user.id) == []
+    assert data_manager.get_users_by_favorite_movie(movie.id) == []
+
+
+def test_delete_movie_removes_related_rows(data_manager, user, movie):
+    """Test that deleting a movie drops its favorites, reviews and genre links."""
+    genre = data_manager.add_genre("Thriller")
+    data_manager.add_movie_to_genre(movie.id, genre.id)
+    data_manager.add_favorite_movie(user.id, movie.id)
+    data_manager.add_review("Great", 5, user.id, movie.id)
+
+    assert data_manager.delete_movie(movie.id)
+    assert data_manager.get_movie_by_id(movie.id) is None
+    assert data_manager.get_favorite_movies_by_user(user.id) == []
+    assert data_manager.get_reviews_by_user(user.id) == []
+    assert genre.movies == []
+    assert not data_manager.delete_movie(movie.id)
+
+
+def test_search_and_rankings(data_manager, movie):
+    """Test search, recently added and top rated queries."""
+    newer = data_manager.add_movie(name="Alien", director="Ridley Scott", rating="8.5")
+    data_manager.add_movie(name="Unrated", rating="N/A")
+    assert data_manager.search_movies("nolan") == [movie]
+    assert data_manager.get_recently_added_movies(limit=2)[1] == newer
+    assert data_manager.get_top_rated_movies(limit=2) == [newer, movie]
+
+
+def test_movies_are_canonical_by_imdb_id(data_manager, user, movie):
+    """Test that adds resolve to the stored film and the merge job collapses copies."""
+    matrix = data_manager.add_movie(name="The Matrix", year=1999, imdb_id="tt0133093")
+    assert data_manager.add_movie(name="Matrix", imdb_id="tt0133093") is matrix
+
+    other = data_manager.add_user("John Doe")
+    copy = data_manager.add_movie(name="memento ", director="Christopher Nolan", year=2000)
+    data_manager.add_favorite_movie(user.id, movie.id)
+    data_manager.add_favorite_movie(user.id, copy.id)
+    data_manager.add_favorite_movie(other.id, copy.id)
+    review = data_manager.add_review("Backwards", 9, other.id, copy.id)
+
+    assert data_manager.merge_duplicate_movies() == 1
+    assert data_manager.get_movie_by_id(copy.id) is None
+    assert data_manager.get_users_by_favorite_movie(movie.id) == [user, other]
+    assert data_manager.get_reviews_by_movie(movie.id) == [review]
+    assert data_manager.autocomplete_movies("memento")[0].popularity == 2
+    assert data_manager.merge_duplicate_movies() == 0
+
+
+def test_review_form_ratings_are_stored_as_numbers(data_manager, user, movie, monkeypatch):
+    """Test that a review posted through the form leaves rating aggregates working."""
+    monkeypatch.setattr('app.data_manager', data_manager)
+    with app.test_client() as client:
+        response = client.post(f'/movies/{movie.id}/add_review', data={'text': 'Great', 'rating': '8'})
+        assert response.status_code == 302
+        assert data_manager.get_reviews_by_movie(movie.id)[0].rating == 8.0
+        assert client.get('/movies').status_code == 200
+        assert client.get('/movies?community_min=5').status_code == 200
+        assert client.get(f'/users/{user.id}/stats').status_code == 200
@@ -0,0 +1,164 @@
+import threading
+import time
+import pytest
+from upstream.flow_control import SingleFlight, TokenBucket, TTLCache, RateLimitExceeded
+from upstream.circuit_breaker import CircuitBreaker, CircuitOpenError
+from upstream.metadata import CallableProvider, FallbackProvider
+from upstream.title_index import OfflineMetadataProvider, build_title_index
+from upstream.recommendation_prompt import build_prompt, parse_suggestions, select_favorites, Suggestion
+from datamanager.favorite_rows import FavoriteRow
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    """Test that concurrent calls with one key run the function once."""
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow_lookup(title):
+        calls.append(title)
+        release.wait(1)
+        return {"title": title}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do('inception', slow_lookup, 'Inception')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.in_flight() == 0:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['Inception']
+    assert results == [{"title": "Inception"}] * 8
+    assert flight.in_flight() == 0
+
+
+def test_single_flight_shares_exceptions():
+    """Test that a failing call raises for the caller and leaves no entry behind."""
+    flight = SingleFlight()
+    with pytest.raises(ValueError):
+        flight.do('key', lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flight.do('key', lambda: 42) == 42
+
+
+def test_token_bucket_waits_up_to_deadline():
+    """Test burst, queued waiting and rejection past the deadline."""
+    now = [0.0]
+    bucket = TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    bucket.acquire()
+    bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire(max_wait=0.05)
+
+    now[0] += 0.1
+    bucket.acquire()
+    with pytest.raises(RateLimitExceeded):
+        bucket.acquire()
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    """Test that entries expire after the TTL and the least recently used one is evicted."""
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+    now[0] += 10
+    assert cache.get('a', 'missing') == 'missing'
+    assert len(cache) == 1
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test opening after consecutive failures, failing fast, and half-open recovery."""
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_seconds=5, reset_timeout=30,
+                             is_failure=lambda result: result is None, clock=lambda: now[0])
+    breaker.call(lambda: None)
+    breaker.call(lambda: None)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "never called")
+
+    now[0] += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_counts_slow_calls():
+    """Test that slow successful calls count as failures."""
+    now = [0.0]
+
+    def slow_call():
+        now[0] += 6
+        return "late"
+
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=5, clock=lambda: now[0])
+    assert breaker.call(slow_call) == "late"
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_title_index_answers_lookups_offline(tmp_path):
+    """Test building the title index from IMDb TSV dumps and looking titles up in it."""
+    files = {
+        'title.basics.tsv': "tconst\ttitleType\tprimaryTitle\toriginalTitle\tisAdult\tstartYear\tendYear\t"
+                            "runtimeMinutes\tgenres\n"
+                            "tt0133093\tmovie\tThe Matrix\tThe Matrix\t0\t1999\t\\N\t136\tAction,Sci-Fi\n"
+                            "tt0000001\tmovie\tThe Matrix\tThe Matrix\t0\t1987\t\\N\t90\tDrama\n"
+                            "tt0999999\ttvEpisode\tHeat\tHeat\t0\t2001\t\\N\t40\tDrama\n",
+        'title.ratings.tsv': "tconst\taverageRating\tnumVotes\ntt0133093\t8.7\t2000000\ntt0000001\t5.1\t12\n",
+        'title.crew.tsv': "tconst\tdirectors\twriters\ntt0133093\tnm0905154,nm0905152\t\\N\n",
+        'name.basics.tsv': "nconst\tprimaryName\tbirthYear\tdeathYear\tprimaryProfession\tknownForTitles\n"
+                           "nm0905154\tLana Wachowski\t1965\t\\N\tdirector\t\\N\n"
+                           "nm0905152\tLilly Wachowski\t1967\t\\N\tdirector\t\\N\n",
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    index_file = str(tmp_path / 'title_index.db')
+    count = build_title_index(index_file, *(str(tmp_path / name) for name in files))
+    assert count == 2
+
+    offline = OfflineMetadataProvider(index_file)
+    assert offline.lookup('the  MATRIX') == {
+        "title": "The Matrix", "year": 1999, "director": "Lana Wachowski, Lilly Wachowski",
+        "rating": 8.7, "imdb_id": "tt0133093", "plot": None, "poster": None, "genre": ["Action", "Sci-Fi"]
+    }
+    remote_calls = []
+    provider = FallbackProvider([offline, CallableProvider(lambda title: remote_calls.append(title))])
+    assert provider.lookup('The Matrix')["imdb_id"] == "tt0133093"
+    assert provider.lookup('Heat') is None and remote_calls == ['Heat']
+    assert OfflineMetadataProvider(str(tmp_path / 'missing.db')).lookup('The Matrix') is None
+
+
+def test_recommendation_prompt_fits_budget_and_mixes_favorites():
+    """Test that big favorite lists are cut to the budget with recent, top-rated and diverse picks."""
+    favorites = [FavoriteRow(movie_id, f"Movie {movie_id}", 2000, 5.0, ("Drama",), None, None)
+                 for movie_id in range(2000, 0, -1)]
+    favorites[-1] = favorites[-1]._replace(rating=9.5)
+    favorites[-2] = favorites[-2]._replace(genres=("Horror",))
+    picked = select_favorites(favorites, token_budget=20)
+    assert [favorite.id for favorite in picked] == [2000, 1, 2, 1999]
+
+    prompt = build_prompt(favorites, token_budget=200)
+    assert len(prompt) <= 200 * 4
+    assert "Movie 1 (2000)" in prompt and "Movie 2 (2000)" in prompt
+    assert prompt.count("(2000)") + int(prompt.split(" und ")[1].split()[0]) == 2000
+
+
+def test_recommendation_reply_is_parsed_into_suggestions():
+    """Test that list items are read with their year and without decoration."""
+    reply = ("Gerne! Hier sind fünf Filme:\n\n1. **Heat** (1995) – Ein Thriller von Michael Mann\n"
+             "2) „Collateral“ (2004)\n- Thief - weil du Mann magst\n* Heat (1995)\n"
+             "5. The Insider (1999)\n6. Ali (2001)\nViel Spaß beim Schauen!")
+    assert parse_suggestions(reply) == [Suggestion("Heat", 1995), Suggestion("Collateral", 2004),
+                                        Suggestion("Thief", None), Suggestion("The Insider", 1999),
+                                        Suggestion("Ali", 2001)]
+    assert parse_suggestions("Heat\nThief") == [Suggestion("Heat", None), Suggestion("Thief", None)]
+    assert parse_suggestions(None) == []
@@ -0,0 +1,3 @@
+"""
+This package contains helpers for calling the app's upstream services (OMDb and RapidAPI).
+"""
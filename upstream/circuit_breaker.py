@@ -0,0 +1,111 @@
+"""
+This module provides a circuit breaker for calls to a flaky upstream service.
+"""
+
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling the upstream while the breaker is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker with half-open probing.
+
+    Closed: calls go through; errors, results rejected by ``is_failure`` and calls
+    slower than ``slow_call_seconds`` count as failures. After ``failure_threshold``
+    consecutive failures the breaker opens and calls fail fast with CircuitOpenError.
+    After ``reset_timeout`` seconds one probe call is let through (half-open): if it
+    succeeds the breaker closes, otherwise it opens again for another timeout.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=3, slow_call_seconds=10.0, reset_timeout=30.0,
+                 is_failure=lambda result: False, clock=time.monotonic):
+        """
+        Initialize a closed breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the breaker.
+            slow_call_seconds (float): Calls taking longer than this count as failures.
+            reset_timeout (float): Seconds to stay open before probing again.
+            is_failure (callable, optional): Marks a returned result as a failure.
+            clock (callable, optional): Monotonic time source, for tests.
+        """
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self):
+        """
+        Returns the current state, moving from open to half-open once the timeout passed.
+        """
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+            return self._state
+
+    def _before_call(self):
+        """
+        Decide whether a call may go through; raises CircuitOpenError if not.
+        """
+        state = self.state
+        with self._lock:
+            if state == self.OPEN or (state == self.HALF_OPEN and self._probing):
+                raise CircuitOpenError("Upstream circuit is open")
+            if state == self.HALF_OPEN:
+                self._probing = True
+
+    def _record(self, success):
+        """
+        Update the state after a call finished.
+        """
+        with self._lock:
+            self._probing = False
+            if success:
+                self._state = self.CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call fn through the breaker.
+
+        Args:
+            fn (callable): The upstream call.
+
+        Returns:
+            The result of fn, even if it was slow or flagged by is_failure.
+
+        Raises:
+            CircuitOpenError: If the breaker is open.
+        """
+        self._before_call()
+        started = self._clock()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self._record(success=False)
+            raise
+        slow = self._clock() - started > self.slow_call_seconds
+        self._record(success=not slow and not self.is_failure(result))
+        return result
@@ -0,0 +1,228 @@
+"""
+This module provides in-process flow control for upstream calls: request coalescing
+(single-flight), a token-bucket rate limiter and a response cache. All of them work
+for threads and asyncio.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class RateLimitExceeded(Exception):
+    """
+    Raised when a caller could not get a token before its deadline.
+    """
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into a single execution.
+
+    The first caller for a key runs the function; callers arriving while it is
+    in flight wait for and share its result (or exception). Nothing is cached
+    after the call completes.
+    """
+
+    def __init__(self):
+        """
+        Initialize the table of in-flight calls.
+        """
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless a call for key is already in flight.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            fn (callable): The function to run.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def in_flight(self):
+        """
+        Returns the number of keys currently being fetched.
+        """
+        return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight for coroutine functions.
+    """
+
+    def __init__(self):
+        """
+        Initialize the table of in-flight tasks.
+        """
+        self._tasks = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Await fn(*args, **kwargs) unless a call for key is already in flight.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            fn (callable): The coroutine function to run.
+
+        Returns:
+            The result of the (possibly shared) call.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter with bounded waiting.
+
+    Tokens refill at ``rate`` per second up to ``capacity``. A caller that finds the
+    bucket empty reserves the next token and sleeps until it is due, as long as that
+    is within its deadline; otherwise it is rejected without consuming anything.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        """
+        Initialize a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum burst size.
+            clock (callable, optional): Monotonic time source, for tests.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _reserve(self, max_wait):
+        """
+        Take a token, possibly in advance, and return how long to wait for it.
+
+        Returns:
+            float or None: Seconds to wait, or None if that would exceed max_wait.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def acquire(self, max_wait=0.0):
+        """
+        Take a token, blocking the thread for at most max_wait seconds.
+
+        Args:
+            max_wait (float): The longest the caller is willing to queue.
+
+        Raises:
+            RateLimitExceeded: If no token becomes available within max_wait.
+        """
+        wait = self._reserve(max_wait)
+        if wait is None:
+            raise RateLimitExceeded(f"No token available within {max_wait:.1f}s")
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, max_wait=0.0):
+        """
+        Take a token, suspending the coroutine for at most max_wait seconds.
+
+        Args:
+            max_wait (float): The longest the caller is willing to queue.
+
+        Raises:
+            RateLimitExceeded: If no token becomes available within max_wait.
+        """
+        wait = self._reserve(max_wait)
+        if wait is None:
+            raise RateLimitExceeded(f"No token available within {max_wait:.1f}s")
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache of upstream responses that expire after a fixed time.
+
+    Holds at most ``maxsize`` entries; adding one more evicts the least recently
+    used. Entries older than ``ttl`` seconds are treated as missing.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600.0, clock=time.monotonic):
+        """
+        Initialize an empty cache.
+
+        Args:
+            maxsize (int, optional): Maximum number of entries. Defaults to 1024.
+            ttl (float, optional): Seconds an entry stays valid. Defaults to 3600.
+            clock (callable, optional): Monotonic time source, for tests.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        """
+        Stores a value for key, evicting the least recently used entry if the cache is full.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        """
+        Returns the number of stored entries, including expired ones not yet evicted.
+        """
+        return len(self._entries)
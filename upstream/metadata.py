@@ -0,0 +1,71 @@
+"""
+This module defines the movie metadata provider interface used for title lookups,
+and a provider that tries several providers in turn (e.g. a local index, then OMDb).
+"""
+
+from abc import ABC, abstractmethod
+
+
+class MetadataProvider(ABC):
+    """
+    Abstract base class for sources of movie metadata.
+
+    Lookups return the dictionary add_movie expects: "title", "year", "director",
+    "rating", "imdb_id", "plot", "poster" and "genre" (a list of genre names).
+    """
+
+    @abstractmethod
+    def lookup(self, title):
+        """
+        Looks up a movie by title.
+
+        Args:
+            title (str): The title as entered by the user.
+
+        Returns:
+            dict or None: The movie details, or None if the title is unknown.
+        """
+        pass
+
+
+class CallableProvider(MetadataProvider):
+    """
+    Adapts a lookup function, such as the OMDb request, to the provider interface.
+    """
+
+    def __init__(self, fn):
+        """
+        Args:
+            fn (callable): Takes a title and returns the details or None.
+        """
+        self.fn = fn
+
+    def lookup(self, title):
+        """
+        Looks up a movie by calling the function.
+        """
+        return self.fn(title)
+
+
+class FallbackProvider(MetadataProvider):
+    """
+    Asks its providers in order and returns the first hit, so cheap local sources
+    answer most lookups and remote ones are only called on a miss.
+    """
+
+    def __init__(self, providers):
+        """
+        Args:
+            providers (list): MetadataProvider instances, cheapest first.
+        """
+        self.providers = list(providers)
+
+    def lookup(self, title):
+        """
+        Looks up a movie with each provider until one knows it.
+        """
+        for provider in self.providers:
+            details = provider.lookup(title)
+            if details:
+                return details
+        return None
@@ -0,0 +1,188 @@
+"""
+This module builds the recommendation prompt sent to RapidAPI and parses the reply.
+
+Instead of listing every favorite, the prompt names a bounded, representative subset
+that fits a token budget: picks alternate between the most recently added, the best
+rated and the ones adding the most genres not covered yet. The reply is parsed into
+(title, year) suggestions, which are then checked against the local catalog.
+"""
+
+import re
+from collections import namedtuple
+
+# Rough token count of Latin-script text for the usual BPE tokenizers; no tokenizer is
+# shipped, and the budget only has to bound the prompt, not match it exactly
+CHARS_PER_TOKEN = 4
+
+# Default token budget of the whole prompt, and the number of movies asked for
+DEFAULT_TOKEN_BUDGET = 500
+RECOMMENDATION_COUNT = 5
+
+PROMPT = ("Basierend auf diesen Lieblingsfilmen: {favorites}, schlage {count} weitere Filme vor, "
+          "die dem Benutzer gefallen könnten. Antworte nur mit einer nummerierten Liste, "
+          "ein Film pro Zeile im Format: Titel (Jahr)")
+SEPARATOR = '; '
+
+# One suggested movie; year is None when the reply did not give one
+Suggestion = namedtuple('Suggestion', ['title', 'year'])
+
+_LIST_ITEM = re.compile(r'^\s*(?:\d{1,2}\s*[.):]|[-*•])\s*(?P<item>.+)$')
+_TITLE_YEAR = re.compile(r'^(?P<title>.+?)\s*\((?P<year>\d{4})(?:\s*[-–]\s*\d{0,4})?\)')
+_EXPLANATION = re.compile(r'\s+[-–—]\s+')
+_QUOTES = ' \t"\'„“”«»*_'
+
+
+def estimate_tokens(text):
+    """
+    Returns an estimate of the number of tokens in a text.
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def movie_line(name, year):
+    """
+    Returns a movie as the prompt and the recommendation list show it: "Title (Year)".
+    """
+    return f"{name} ({year})" if isinstance(year, int) and not isinstance(year, bool) else name
+
+
+def _rating_score(favorite):
+    """
+    Returns the rating a favorite is ranked by: the user's own review (1-5, scaled to
+    OMDb's 0-10) if there is one, else the OMDb rating; unrated favorites come last.
+    """
+    if favorite.user_rating is not None:
+        return favorite.user_rating * 2
+    if isinstance(favorite.rating, (int, float)) and not isinstance(favorite.rating, bool):
+        return favorite.rating
+    return float('-inf')
+
+
+def select_favorites(favorites, token_budget):
+    """
+    Picks the favorites to name in the prompt.
+
+    Picks alternate between three rankings: most recently added, best rated, and most
+    genres not yet covered by the picks so far. Picking stops at the first favorite
+    whose line does not fit the budget, so the picks stay in priority order.
+
+    Args:
+        favorites (list): FavoriteRow tuples, most recently added first.
+        token_budget (int): Tokens available for the favorites list.
+
+    Returns:
+        list: The picked FavoriteRow tuples, in pick order.
+    """
+    covered = set()
+    picked = {}
+
+    def genre_diverse():
+        remaining = list(favorites)
+        while remaining:
+            remaining = [favorite for favorite in remaining if favorite.id not in picked]
+            if not remaining:
+                return
+            # max() keeps the first of equals, i.e. the most recently added
+            yield max(remaining, key=lambda favorite: len(set(favorite.genres) - covered))
+
+    rankings = [iter(favorites), iter(sorted(favorites, key=_rating_score, reverse=True)), genre_diverse()]
+    used = 0
+    while rankings:
+        for ranking in list(rankings):
+            favorite = next((favorite for favorite in ranking if favorite.id not in picked), None)
+            if favorite is None:
+                rankings.remove(ranking)
+                continue
+            cost = estimate_tokens(movie_line(favorite.name, favorite.year) + SEPARATOR)
+            if used + cost > token_budget:
+                return list(picked.values())
+            used += cost
+            picked[favorite.id] = favorite
+            covered.update(favorite.genres)
+    return list(picked.values())
+
+
+def build_prompt(favorites, token_budget=DEFAULT_TOKEN_BUDGET, count=RECOMMENDATION_COUNT):
+    """
+    Builds the recommendation prompt for a user's favorites within a token budget.
+
+    Args:
+        favorites (list): FavoriteRow tuples, most recently added first.
+        token_budget (int, optional): Token budget of the whole prompt. Defaults to DEFAULT_TOKEN_BUDGET.
+        count (int, optional): The number of movies to ask for. Defaults to RECOMMENDATION_COUNT.
+
+    Returns:
+        str: The prompt.
+    """
+    # Reserve room for the instructions and the "und N weitere" note
+    fixed = estimate_tokens(PROMPT.format(favorites=f" und {len(favorites)} weitere", count=count))
+    picked = select_favorites(favorites, token_budget - fixed)
+    listing = SEPARATOR.join(movie_line(favorite.name, favorite.year) for favorite in picked)
+    if len(picked) < len(favorites):
+        listing += f" und {len(favorites) - len(picked)} weitere"
+    return PROMPT.format(favorites=listing, count=count)
+
+
+def parse_suggestions(reply, limit=RECOMMENDATION_COUNT):
+    """
+    Parses the upstream's reply into movie suggestions.
+
+    If the reply contains a list, only its items are read, so an introduction or a
+    closing remark is not taken for a title. Markdown emphasis, quotes and trailing
+    explanations ("Title (Year) - because ...") are removed; repeats are dropped.
+
+    Args:
+        reply (str): The upstream's answer.
+        limit (int, optional): The maximum number of suggestions. Defaults to RECOMMENDATION_COUNT.
+
+    Returns:
+        list: Suggestion tuples in the order of the reply.
+    """
+    lines = [line.strip() for line in (reply or '').splitlines() if line.strip()]
+    items = [match.group('item') for match in map(_LIST_ITEM.match, lines) if match]
+    suggestions = {}
+    for item in items or lines:
+        item = item.replace('**', '').replace('__', '')
+        match = _TITLE_YEAR.match(item)
+        if match:
+            title, year = match.group('title'), int(match.group('year'))
+        else:
+            title, year = _EXPLANATION.split(item, 1)[0], None
+        title = title.strip(_QUOTES)
+        if title and title.casefold() not in suggestions:
+            suggestions[title.casefold()] = Suggestion(title, year)
+            if len(suggestions) == limit:
+                break
+    return list(suggestions.values())
+
+
+def resolve_suggestions(suggestions, catalog_movies, favorite_ids):
+    """
+    Checks suggestions against the local catalog.
+
+    Suggestions that are already among the user's favorites are dropped. Ones the
+    catalog knows are shown with its spelling and year. Unknown titles are kept, since
+    suggesting films that are new to the app is the point.
+
+    Args:
+        suggestions (list): Suggestion tuples from parse_suggestions.
+        catalog_movies (list): The catalog's movies named like any suggestion, from one
+            get_movies_by_names call.
+        favorite_ids (set): The IDs of the user's favorite movies.
+
+    Returns:
+        list: The recommendations as "Title (Year)" lines.
+    """
+    by_name = {}
+    for movie in catalog_movies:
+        by_name.setdefault(movie.name.lower(), []).append(movie)
+    lines = []
+    for suggestion in suggestions:
+        matches = by_name.get(suggestion.title.lower(), [])
+        if suggestion.year is not None:
+            matches = [movie for movie in matches if movie.year == suggestion.year]  # Not a remake
+        if any(movie.id in favorite_ids for movie in matches):
+            continue
+        movie = matches[0] if matches else None
+        lines.append(movie_line(movie.name, movie.year) if movie else movie_line(*suggestion))
+    return lines
@@ -0,0 +1,193 @@
+"""
+This module builds a local movie title index from IMDb's TSV dumps (title.basics,
+title.ratings, title.crew and optionally name.basics) and answers title lookups
+from it, so most movies can be added without an OMDb call.
+
+The index is a dedicated, read-only SQLite file: one row per title with its year,
+genres, rating and director names, plus a (normalized title, votes) key table, so
+a lookup is a single index seek.
+"""
+
+import csv
+import gzip
+import os
+import sqlite3
+import threading
+from datamanager.prefix_index import normalize
+from upstream.metadata import MetadataProvider
+
+# Title types kept from title.basics (episodes, video games etc. are left out)
+TITLE_TYPES = ('movie', 'tvMovie', 'tvSeries', 'tvMiniSeries', 'short', 'video')
+
+# Rows per executemany batch while ingesting
+BATCH_SIZE = 50_000
+
+SCHEMA = """
+CREATE TABLE title (
+    tconst TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    year INTEGER,
+    genres TEXT,
+    rating REAL,
+    votes INTEGER NOT NULL DEFAULT 0,
+    directors TEXT
+) WITHOUT ROWID;
+CREATE TABLE title_key (
+    key TEXT NOT NULL,
+    votes INTEGER NOT NULL,
+    tconst TEXT NOT NULL,
+    PRIMARY KEY (key, votes, tconst)
+) WITHOUT ROWID;
+"""
+
+
+def _read_tsv(path):
+    """
+    Yields the rows of an IMDb TSV file (optionally gzipped) as dicts, with the
+    dumps' \\N placeholders turned into None.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        for row in csv.DictReader(file, delimiter='\t', quoting=csv.QUOTE_NONE):
+            yield {key: (None if value == '\\N' else value) for key, value in row.items()}
+
+
+def _batches(rows):
+    """
+    Groups an iterable into lists of BATCH_SIZE.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_title_index(output, basics, ratings, crew, names=None, title_types=TITLE_TYPES):
+    """
+    Ingests IMDb TSV dumps into a title index file.
+
+    The index is written next to output and moved into place when complete, so
+    running lookups keep using the old file until then.
+
+    Args:
+        output (str): The index file to create or replace.
+        basics (str): Path of title.basics.tsv(.gz).
+        ratings (str): Path of title.ratings.tsv(.gz).
+        crew (str): Path of title.crew.tsv(.gz).
+        names (str, optional): Path of name.basics.tsv(.gz); without it directors are unknown.
+        title_types (tuple, optional): The titleType values to keep.
+
+    Returns:
+        int: The number of titles in the index.
+    """
+    staging = f"{output}.building"
+    if os.path.exists(staging):
+        os.remove(staging)
+    connection = sqlite3.connect(staging)
+    try:
+        connection.executescript("PRAGMA journal_mode=OFF; PRAGMA synchronous=OFF;" + SCHEMA + """
+            CREATE TEMP TABLE crew (tconst TEXT PRIMARY KEY, directors TEXT) WITHOUT ROWID;
+        """)
+        kept_types = set(title_types)
+        for batch in _batches(
+            (row['tconst'], row['primaryTitle'], row['startYear'], row['genres'])
+            for row in _read_tsv(basics)
+            if row['titleType'] in kept_types and row['isAdult'] != '1' and row['primaryTitle']
+        ):
+            connection.executemany("INSERT INTO title (tconst, name, year, genres) VALUES (?, ?, ?, ?)", batch)
+
+        for batch in _batches((row['averageRating'], row['numVotes'], row['tconst']) for row in _read_tsv(ratings)):
+            connection.executemany("UPDATE title SET rating = ?, votes = ? WHERE tconst = ?", batch)
+
+        for batch in _batches((row['tconst'], row['directors']) for row in _read_tsv(crew) if row['directors']):
+            connection.executemany(
+                "INSERT INTO crew SELECT ?1, ?2 WHERE EXISTS (SELECT 1 FROM title WHERE tconst = ?1)", batch)
+
+        # Resolve director IDs to names, keeping only the people the index refers to
+        director_names = {}
+        if names:
+            wanted = {nconst for directors, in connection.execute("SELECT directors FROM crew")
+                      for nconst in directors.split(',')}
+            director_names = {row['nconst']: row['primaryName'] for row in _read_tsv(names)
+                              if row['nconst'] in wanted}
+        for batch in _batches(
+            (', '.join(director_names[nconst] for nconst in directors.split(',') if nconst in director_names)
+             or None, tconst)
+            for tconst, directors in connection.execute("SELECT tconst, directors FROM crew").fetchall()
+        ):
+            connection.executemany("UPDATE title SET directors = ? WHERE tconst = ?", batch)
+
+        connection.create_function('normalize', 1, normalize, deterministic=True)
+        connection.execute("INSERT INTO title_key SELECT normalize(name), votes, tconst FROM title")
+        connection.commit()
+        connection.execute("VACUUM")
+        count = connection.execute("SELECT count(*) FROM title").fetchone()[0]
+    finally:
+        connection.close()
+    os.replace(staging, output)
+    return count
+
+
+class OfflineMetadataProvider(MetadataProvider):
+    """
+    Looks titles up in a local index built by build_title_index.
+
+    Each thread opens its own read-only connection on first use; if the index file
+    does not exist (yet), every lookup is a miss.
+    """
+
+    def __init__(self, index_file):
+        """
+        Args:
+            index_file (str): The index file.
+        """
+        self.index_file = index_file
+        self._local = threading.local()
+
+    def _connection(self):
+        """
+        Returns the calling thread's connection, or None if there is no index.
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if not os.path.exists(self.index_file):
+                return None
+            connection = sqlite3.connect(f"file:{self.index_file}?mode=ro", uri=True, check_same_thread=False)
+            self._local.connection = connection
+        return connection
+
+    def lookup(self, title):
+        """
+        Looks up a title; among titles with the same name the one with most votes wins.
+
+        Args:
+            title (str): The title as entered by the user.
+
+        Returns:
+            dict or None: The movie details, or None if the title is not in the index.
+        """
+        connection = self._connection()
+        if connection is None:
+            return None
+        row = connection.execute("""
+            SELECT t.tconst, t.name, t.year, t.genres, t.rating, t.directors
+            FROM title_key k JOIN title t ON t.tconst = k.tconst
+            WHERE k.key = ? ORDER BY k.votes DESC LIMIT 1
+        """, (normalize(title),)).fetchone()
+        if row is None:
+            return None
+        tconst, name, year, genres, rating, directors = row
+        return {
+            "title": name,
+            "year": year,
+            "director": directors,
+            "rating": rating,
+            "imdb_id": tconst,
+            "plot": None,
+            "poster": None,
+            "genre": genres.split(',') if genres else []
+        }